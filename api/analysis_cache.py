@@ -0,0 +1,200 @@
+"""
+Content-addressed cache for `analyze_intake` results.
+
+The key is a SHA-256 over the normalized fields that feed the analysis prompt,
+so resubmissions (and the /api/intakes/analyze preview followed by
+POST /api/intakes) reuse one agent run. Analyses carrying time-sensitive
+warnings (SOL, notice deadlines) get a shorter TTL because their dates drift.
+
+Configuration (environment variables):
+    ANALYSIS_CACHE_BACKEND              memory | postgres | none (default memory)
+    ANALYSIS_CACHE_MAX_ENTRIES          In-process LRU size (default 512)
+    ANALYSIS_CACHE_TTL_SECONDS          Default TTL (default 7 days)
+    ANALYSIS_CACHE_WARNING_TTL_SECONDS  TTL when the analysis has warnings (default 1 day)
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from psycopg.types.json import Jsonb
+
+from .chat_agents.registry import agent_registry
+from .db import connection
+from .knowledge_pack import knowledge_pack
+
+logger = logging.getLogger(__name__)
+
+# Bump when the analysis prompt changes so stale results miss. Edits to the
+# intake-analyst instructions and knowledge-pack rebuilds change the key too.
+PROMPT_VERSION = "2"
+
+# Fields interpolated into the analysis prompt.
+KEY_FIELDS = ("name", "location", "matterType", "incidentDate", "description")
+
+
+def _normalize(value: Any) -> str:
+    return re.sub(r"\s+", " ", str(value or "")).strip().lower()
+
+
+def analysis_cache_key(intake_data: Dict[str, Any]) -> str:
+    payload = {field: _normalize(intake_data.get(field)) for field in KEY_FIELDS}
+    payload["_v"] = PROMPT_VERSION
+    payload["_i"] = agent_registry.versions.get("intake_analyst")
+    knowledge_pack.refresh()
+    payload["_k"] = knowledge_pack.version
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class MemoryAnalysisCache:
+    """In-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        self._entries[key] = (time.time() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class PostgresAnalysisCache:
+    """Shared cache in the `intake_analysis_cache` table (survives restarts, shared by workers)."""
+
+    # Purge expired rows every N writes instead of on a timer.
+    PURGE_EVERY = 100
+
+    def __init__(self):
+        self._writes = 0
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        async with connection() as conn:
+            cursor = await conn.execute(
+                'SELECT analysis FROM intake_analysis_cache WHERE key = %s AND "expiresAt" > NOW()',
+                (key,),
+            )
+            row = await cursor.fetchone()
+        return row["analysis"] if row else None
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        async with connection() as conn:
+            await conn.execute('''
+                INSERT INTO intake_analysis_cache (key, analysis, "createdAt", "expiresAt")
+                VALUES (%s, %s, NOW(), NOW() + make_interval(secs => %s))
+                ON CONFLICT (key) DO UPDATE
+                SET analysis = EXCLUDED.analysis, "createdAt" = EXCLUDED."createdAt", "expiresAt" = EXCLUDED."expiresAt"
+            ''', (key, Jsonb(value), ttl))
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                await conn.execute('DELETE FROM intake_analysis_cache WHERE "expiresAt" <= NOW()')
+
+
+class AnalysisCache:
+    """Cache front-end: key derivation, TTL policy, single-flight and hit/miss metrics."""
+
+    def __init__(self, backend: Any, ttl_seconds: float, warning_ttl_seconds: float):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.warning_ttl_seconds = warning_ttl_seconds
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+        self._inflight: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+
+    @classmethod
+    def from_env(cls) -> Optional["AnalysisCache"]:
+        kind = os.environ.get("ANALYSIS_CACHE_BACKEND", "memory").lower()
+        if kind == "none":
+            return None
+        if kind == "postgres":
+            backend: Any = PostgresAnalysisCache()
+        else:
+            backend = MemoryAnalysisCache(int(os.environ.get("ANALYSIS_CACHE_MAX_ENTRIES", "512")))
+        return cls(
+            backend,
+            ttl_seconds=float(os.environ.get("ANALYSIS_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+            warning_ttl_seconds=float(os.environ.get("ANALYSIS_CACHE_WARNING_TTL_SECONDS", str(24 * 3600))),
+        )
+
+    def ttl_for(self, analysis: Dict[str, Any]) -> float:
+        # Time-sensitive warnings (SOL countdowns) go stale faster than the scoring.
+        return self.warning_ttl_seconds if analysis.get("warnings") else self.ttl_seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "backend": type(self.backend).__name__,
+            "hitRate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+    async def get_or_compute(
+        self,
+        intake_data: Dict[str, Any],
+        compute: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        key = analysis_cache_key(intake_data)
+
+        try:
+            cached = await self.backend.get(key)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error("Analysis cache read failed: %s", str(e), exc_info=True)
+            cached = None
+        if cached is not None:
+            self.stats["hits"] += 1
+            logger.info("🎯 Analysis cache hit | key=%s", key[:12])
+            return cached
+
+        # Identical analyses already running (e.g. preview + submit) share one run.
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(inflight)
+
+        self.stats["misses"] += 1
+        future: "asyncio.Future[Dict[str, Any]]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            analysis = await compute(intake_data)
+            future.set_result(analysis)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an un-awaited future does not log a warning.
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        # Failed runs are reported in-band; never cache them.
+        if "error" not in analysis:
+            try:
+                await self.backend.set(key, analysis, self.ttl_for(analysis))
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error("Analysis cache write failed: %s", str(e), exc_info=True)
+        return analysis
+
+
+analysis_cache = AnalysisCache.from_env()
@@ -0,0 +1,174 @@
+"""
+Background intake analysis queue.
+
+`POST /api/intakes` stores the intake with analysisStatus "pending" and
+enqueues its id here; a fixed pool of worker tasks runs `analyze_intake` and
+writes the ai* columns back. Status lives in the `intakes` table, so it can be
+polled from any process and pending work is recovered on startup.
+
+Configuration (environment variables):
+    ANALYSIS_CONCURRENCY         Worker tasks, i.e. max concurrent agent runs (default 2)
+    ANALYSIS_MAX_ATTEMPTS        Attempts before an intake is marked "failed" (default 3)
+    ANALYSIS_RETRY_BASE_SECONDS  First retry delay; doubles per attempt (default 5)
+    ANALYSIS_STALE_SECONDS       Age after which a "running" row is considered orphaned (default 900)
+"""
+
+import asyncio
+import logging
+import os
+import random
+from typing import Any, Dict, List, Optional
+
+from . import db
+from .intake_analysis import analyze_intake
+from .intake_store import claim_analysis, fetch_unfinished_analysis_ids, release_analysis, save_analysis
+
+logger = logging.getLogger(__name__)
+
+
+def analysis_input(form: Dict[str, Any]) -> Dict[str, Any]:
+    """Map an intake form (or raw `intakes` row) to the `analyze_intake` payload."""
+    return {
+        "name": form.get("fullName"),
+        "email": form.get("email"),
+        "phone": form.get("phone"),
+        "matterType": form.get("matterType"),
+        "description": f"{form.get('summary') or ''}\n\nGoals: {form.get('goals') or ''}\n\nUrgency: {form.get('urgency') or ''}",
+        "location": form.get("jurisdiction"),
+        "incidentDate": form.get("incidentDate"),
+    }
+
+
+class AnalysisQueue:
+    """Bounded worker pool draining an in-process queue of intake ids."""
+
+    def __init__(
+        self,
+        concurrency: int = 2,
+        max_attempts: int = 3,
+        retry_base_seconds: float = 5.0,
+        stale_seconds: int = 900,
+    ):
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.stale_seconds = stale_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._retry_handles: List[asyncio.TimerHandle] = []
+        # Set by stop(); tells a worker's CancelledError apart from a cancelled
+        # shared (coalesced) analysis that the worker merely awaited.
+        self._stopping = False
+
+    @classmethod
+    def from_env(cls) -> "AnalysisQueue":
+        return cls(
+            concurrency=int(os.environ.get("ANALYSIS_CONCURRENCY", "2")),
+            max_attempts=int(os.environ.get("ANALYSIS_MAX_ATTEMPTS", "3")),
+            retry_base_seconds=float(os.environ.get("ANALYSIS_RETRY_BASE_SECONDS", "5")),
+            stale_seconds=int(os.environ.get("ANALYSIS_STALE_SECONDS", "900")),
+        )
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(self) -> None:
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._stopping = False
+        self._workers = [
+            asyncio.create_task(self._worker(n), name=f"intake-analysis-{n}")
+            for n in range(self.concurrency)
+        ]
+        logger.info("🧵 Analysis queue started | workers=%d max_attempts=%d", self.concurrency, self.max_attempts)
+
+        if db.is_configured():
+            try:
+                recovered = await fetch_unfinished_analysis_ids(self.stale_seconds)
+                for intake_id in recovered:
+                    self.enqueue(intake_id)
+                if recovered:
+                    logger.info("♻️  Re-queued %d unfinished intake analyses", len(recovered))
+            except Exception as e:
+                logger.error("Failed to recover pending analyses: %s", str(e), exc_info=True)
+
+    async def stop(self) -> None:
+        self._stopping = True
+        for handle in self._retry_handles:
+            handle.cancel()
+        self._retry_handles.clear()
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        logger.info("🧵 Analysis queue stopped")
+
+    def enqueue(self, intake_id: str) -> None:
+        if self._queue is None:
+            raise RuntimeError("Analysis queue is not running")
+        self._queue.put_nowait(intake_id)
+
+    def enqueue_many(self, intake_ids: List[str]) -> None:
+        for intake_id in intake_ids:
+            self.enqueue(intake_id)
+
+    def _schedule_retry(self, intake_id: str, attempt: int) -> float:
+        delay = self.retry_base_seconds * (2 ** (attempt - 1))
+        delay += random.uniform(0, delay / 2)
+        loop = asyncio.get_running_loop()
+        # Re-enqueue later instead of sleeping so the worker slot is freed.
+        self._retry_handles = [h for h in self._retry_handles if not h.cancelled()]
+        self._retry_handles.append(loop.call_later(delay, self.enqueue, intake_id))
+        return delay
+
+    async def _worker(self, n: int) -> None:
+        assert self._queue is not None
+        while True:
+            intake_id = await self._queue.get()
+            try:
+                await self._process(intake_id)
+            except Exception as e:
+                logger.error("Analysis worker %d crashed on %s: %s", n, intake_id, str(e), exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, intake_id: str) -> None:
+        intake = await claim_analysis(intake_id)
+        if intake is None:
+            logger.info("Intake %s already claimed or finished - skipping", intake_id)
+            return
+
+        attempt = intake["analysisAttempts"]
+        logger.info("🔍 Analysing intake %s (attempt %d/%d)", intake_id, attempt, self.max_attempts)
+
+        try:
+            analysis = await analyze_intake(analysis_input(intake))
+            # analyze_intake reports failures in-band instead of raising.
+            error = analysis.get("error")
+        except asyncio.CancelledError:
+            if self._stopping:
+                raise
+            # A coalesced analysis we were waiting on was cancelled by its owner;
+            # count it as a failed attempt and keep this worker alive.
+            analysis, error = None, "analysis cancelled"
+        except Exception as e:
+            analysis, error = None, str(e)
+
+        if not error:
+            await save_analysis(intake_id, analysis)
+            logger.info("✅ Intake %s analysed | score=%s", intake_id, analysis.get("score"))
+            return
+
+        final = attempt >= self.max_attempts
+        await release_analysis(intake_id, error, final=final)
+        if final:
+            logger.error("❌ Intake %s analysis failed after %d attempts: %s", intake_id, attempt, error)
+        else:
+            delay = self._schedule_retry(intake_id, attempt)
+            logger.warning("Intake %s analysis failed (%s) - retrying in %.1fs", intake_id, error, delay)
+
+
+analysis_queue = AnalysisQueue.from_env()
@@ -0,0 +1,122 @@
+"""
+Okapi BM25 over ingested attachment chunks, plus reciprocal-rank fusion.
+
+Dense retrieval is weak on exact identifiers - statute numbers ("1102.5",
+"12940(h)"), case numbers and party names - so `search_store` queries this
+lexical index alongside the vector backend and fuses the two rankings.
+"""
+
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+# Keep dotted/hyphenated identifiers ("1102.5", "12940-h", "u.s.c") as one token.
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were "
+    "will with what when where which who how i my me we our you your do does did can".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class BM25Index:
+    """
+    In-memory inverted index: term -> {doc position: term frequency}.
+
+    Searches and updates may come from several worker threads; `_lock`
+    keeps an update from interleaving with another update or a search.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self.doc_lengths: List[int] = []
+        self.doc_ids: List[str] = []
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def _add(self, doc_id: str, text: str) -> None:
+        position = len(self.doc_ids)
+        terms = Counter(tokenize(text))
+        for term, tf in terms.items():
+            self.postings[term][position] = tf
+        length = sum(terms.values())
+        self.doc_ids.append(doc_id)
+        self.doc_lengths.append(length)
+        self._total_length += length
+
+    def add(self, doc_id: str, text: str) -> None:
+        with self._lock:
+            self._add(doc_id, text)
+
+    def add_many(self, docs: Iterable[Tuple[str, str]]) -> None:
+        with self._lock:
+            for doc_id, text in docs:
+                self._add(doc_id, text)
+
+    def extend_to(self, items: Sequence[Any], text=lambda item: item) -> None:
+        """
+        Index items[len(self):] of an append-only sequence, with each item's
+        position as its doc id. Concurrent callers never index an item twice.
+        """
+        with self._lock:
+            for position in range(len(self.doc_ids), len(items)):
+                self._add(str(position), text(items[position]))
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Top-k (doc_id, score), scoring only documents that share a query term."""
+        with self._lock:
+            return self._search(query, k)
+
+    def _search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        n = len(self.doc_ids)
+        if n == 0:
+            return []
+        avgdl = self._total_length / n or 1.0
+
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[position] / avgdl)
+                scores[position] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.doc_ids[position], score) for position, score in ranked]
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Any]],
+    key=lambda item: item,
+    k: int = 60,
+    limit: int = 10,
+) -> List[Tuple[Any, float]]:
+    """
+    Fuse several ranked lists: score(d) = sum over lists of 1 / (k + rank(d)).
+
+    Items are matched across lists with `key`; the first occurrence of each
+    key is the representative returned. Returns (item, fused score) pairs.
+    """
+    fused: Dict[Any, float] = defaultdict(float)
+    representative: Dict[Any, Any] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            item_key = key(item)
+            fused[item_key] += 1.0 / (k + rank)
+            representative.setdefault(item_key, item)
+
+    ordered = sorted(fused.items(), key=lambda entry: entry[1], reverse=True)[:limit]
+    return [(representative[item_key], score) for item_key, score in ordered]
@@ -0,0 +1,171 @@
+"""
+Rolling-summary compaction of long chat histories.
+
+Once the agent input crosses a token threshold, everything before the last
+N user turns is replaced by a summary. Summaries are computed in a
+background task, never on the request path: a turn that finds no summary
+ready goes out uncompacted (or with an older summary) and schedules one for
+the next turn.
+
+Summaries are keyed by a hash chain over the summarized messages, so they
+are per chat without needing a chat id, and an edited history simply stops
+matching. Each summary extends the previous one ("rolling"): the model is
+given the last summary plus only the messages since it.
+
+Configuration (environment variables):
+    COMPACTION_TOKEN_THRESHOLD   Compact when the history exceeds this many tokens (default 24000)
+    COMPACTION_KEEP_TURNS        User turns kept verbatim at the end (default 4)
+    COMPACTION_MODEL             Summarizer model (default gpt-4.1-mini)
+    COMPACTION_MAX_SUMMARIES     Summaries kept in memory (default 2000)
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from agents import Agent, Runner
+
+from ..context_assembler import count_tokens
+
+logger = logging.getLogger(__name__)
+
+COMPACTION_TOKEN_THRESHOLD = int(os.environ.get("COMPACTION_TOKEN_THRESHOLD", "24000"))
+COMPACTION_KEEP_TURNS = int(os.environ.get("COMPACTION_KEEP_TURNS", "4"))
+COMPACTION_MODEL = os.environ.get("COMPACTION_MODEL", "gpt-4.1-mini")
+COMPACTION_MAX_SUMMARIES = int(os.environ.get("COMPACTION_MAX_SUMMARIES", "2000"))
+
+SUMMARY_HEADER = "[CONVERSATION SUMMARY]"
+
+summarizer_instructions = """
+You maintain a running summary of a legal-assistant conversation so older turns can be dropped.
+You receive the previous summary (possibly empty) and the messages that followed it.
+Write an updated summary that preserves, concisely:
+- who the user is (potential plaintiff or lawyer), jurisdiction, and the matter type
+- key facts, dates, parties and amounts
+- attached documents by name and what they established
+- legal issues, statutes and deadlines discussed, with any cited sources
+- conclusions, scores or recommendations already given, and open questions
+Use short bullet points. Do not invent facts. Output only the summary.
+""".strip()
+
+
+def _chain(previous: str, message: Dict[str, Any]) -> str:
+    digest = hashlib.sha256(previous.encode())
+    digest.update(str(message.get("role")).encode())
+    digest.update(b"\0")
+    digest.update(str(message.get("content")).encode("utf-8", errors="replace"))
+    return digest.hexdigest()
+
+
+def _prefix_hashes(messages: List[Dict[str, Any]]) -> List[str]:
+    """hashes[k] identifies messages[:k] (hashes[0] is the empty prefix)."""
+    hashes = [""]
+    for message in messages:
+        hashes.append(_chain(hashes[-1], message))
+    return hashes
+
+
+def _keep_boundary(messages: List[Dict[str, Any]], keep_turns: int) -> int:
+    """Index of the first message of the last `keep_turns` user turns."""
+    seen = 0
+    for i in range(len(messages) - 1, -1, -1):
+        if messages[i].get("role") == "user":
+            seen += 1
+            if seen == keep_turns:
+                return i
+    return 0
+
+
+def _render(messages: List[Dict[str, Any]]) -> str:
+    return "\n\n".join(f"{m.get('role', 'user').upper()}: {m.get('content', '')}" for m in messages)
+
+
+class HistoryCompactor:
+    """Replaces older turns with cached rolling summaries computed off the request path."""
+
+    def __init__(
+        self,
+        threshold: int = COMPACTION_TOKEN_THRESHOLD,
+        keep_turns: int = COMPACTION_KEEP_TURNS,
+        model: str = COMPACTION_MODEL,
+        max_summaries: int = COMPACTION_MAX_SUMMARIES,
+    ):
+        self.threshold = threshold
+        self.keep_turns = keep_turns
+        self.max_summaries = max_summaries
+        self.agent = Agent(name="history-summarizer", model=model, instructions=summarizer_instructions)
+        # prefix hash -> (messages covered, summary text)
+        self._summaries: "OrderedDict[str, Tuple[int, str]]" = OrderedDict()
+        self._pending: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _lookup(self, hashes: List[str], upto: int) -> Tuple[int, Optional[str]]:
+        """Longest summarized prefix of at most `upto` messages."""
+        for k in range(upto, 0, -1):
+            entry = self._summaries.get(hashes[k])
+            if entry is not None:
+                self._summaries.move_to_end(hashes[k])
+                return k, entry[1]
+        return 0, None
+
+    def _store(self, prefix_hash: str, covered: int, summary: str) -> None:
+        self._summaries[prefix_hash] = (covered, summary)
+        self._summaries.move_to_end(prefix_hash)
+        while len(self._summaries) > self.max_summaries:
+            self._summaries.popitem(last=False)
+
+    def compact(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Agent input with older turns summarized, when over the token threshold.
+
+        Args:
+            messages: Agent-format messages (role/content/type dicts)
+
+        Returns:
+            `messages` unchanged, or a summary developer message followed by
+            the messages it does not cover
+        """
+        if count_tokens("".join(str(m.get("content", "")) for m in messages)) <= self.threshold:
+            return messages
+        boundary = _keep_boundary(messages, self.keep_turns)
+        if boundary == 0:
+            return messages
+
+        hashes = _prefix_hashes(messages[:boundary])
+        covered, summary = self._lookup(hashes, boundary)
+        if covered < boundary:
+            self._schedule(messages[:boundary], hashes, covered, summary)
+        if summary is None:
+            return messages
+
+        logger.info("🗜️ History compacted | summarized=%d kept=%d", covered, len(messages) - covered)
+        summary_message = {"content": f"{SUMMARY_HEADER}\n{summary}", "role": "developer", "type": "message"}
+        return [summary_message] + messages[covered:]
+
+    def _schedule(self, messages: List[Dict[str, Any]], hashes: List[str], covered: int, summary: Optional[str]) -> None:
+        target = hashes[len(messages)]
+        if target in self._pending:
+            return
+        self._pending.add(target)
+        task = asyncio.create_task(self._summarize(messages[covered:], summary, target, len(messages)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _summarize(self, new_messages: List[Dict[str, Any]], previous: Optional[str], target: str, covered: int) -> None:
+        prompt = f"PREVIOUS SUMMARY:\n{previous or '(none)'}\n\nNEW MESSAGES:\n{_render(new_messages)}"
+        try:
+            result = await Runner.run(starting_agent=self.agent, input=prompt)
+            summary = str(result.final_output).strip()
+            if summary:
+                self._store(target, covered, summary)
+                logger.info("🗜️ History summary ready | covers=%d messages | %d tokens", covered, count_tokens(summary))
+        except Exception as e:
+            logger.error("❌ History summarization failed: %s", e)
+        finally:
+            self._pending.discard(target)
+
+
+history_compactor = HistoryCompactor()
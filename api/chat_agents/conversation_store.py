@@ -0,0 +1,151 @@
+"""
+Server-side conversation history with memoized agent-message conversion.
+
+`to_agent_messages` expands every attachment in every message, so converting
+the whole history on each turn costs O(history) per request - O(n^2) over a
+chat. The store keeps each chat's formatted messages together with their
+converted agent messages, keyed by position and a hash of the message, so a
+turn only converts what was appended (or edited) since the last one.
+
+Clients that send `chatId` may also send only the new messages
+(`data.historyMode = "delta"`); the server appends them to the stored history
+and records the assistant's streamed reply itself. The store is per process:
+a delta for a chat this worker does not know is rejected so the client can
+resend the full history.
+
+Configuration (environment variables):
+    CONVERSATION_STORE_MAX_CHATS   Chats kept per process (default 1000)
+    CONVERSATION_TTL_SECONDS       Idle time before a chat is dropped (default 3600)
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (agent message, cacheable) for one formatted message.
+Converter = Callable[[Dict[str, Any]], Awaitable[Tuple[Dict[str, Any], bool]]]
+
+
+class UnknownConversationError(KeyError):
+    """A delta was sent for a chat this process has no history for."""
+
+
+def message_hash(message: Dict[str, Any]) -> str:
+    payload = json.dumps(
+        [message.get("role"), message.get("content"), message.get("attachments") or []],
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class Conversation:
+    messages: List[Dict[str, Any]] = field(default_factory=list)
+    # (message hash, converted agent message) per position in `messages`.
+    converted: List[Tuple[str, Dict[str, Any]]] = field(default_factory=list)
+    updated_at: float = field(default_factory=time.monotonic)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class ConversationStore:
+    """Bounded LRU of conversations, expiring idle chats."""
+
+    def __init__(self, max_chats: int = 1000, ttl_seconds: float = 3600):
+        self.max_chats = max_chats
+        self.ttl_seconds = ttl_seconds
+        self._chats: "OrderedDict[str, Conversation]" = OrderedDict()
+        self.stats = {"converted": 0, "reused": 0}
+
+    @classmethod
+    def from_env(cls) -> "ConversationStore":
+        return cls(
+            max_chats=int(os.environ.get("CONVERSATION_STORE_MAX_CHATS", "1000")),
+            ttl_seconds=float(os.environ.get("CONVERSATION_TTL_SECONDS", "3600")),
+        )
+
+    def get(self, chat_id: str) -> Optional[Conversation]:
+        conversation = self._chats.get(chat_id)
+        if conversation is None:
+            return None
+        if time.monotonic() - conversation.updated_at > self.ttl_seconds:
+            del self._chats[chat_id]
+            return None
+        self._chats.move_to_end(chat_id)
+        return conversation
+
+    def _get_or_create(self, chat_id: str) -> Conversation:
+        conversation = self.get(chat_id)
+        if conversation is None:
+            conversation = Conversation()
+            self._chats[chat_id] = conversation
+            while len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+        return conversation
+
+    def replace(self, chat_id: str, messages: List[Dict[str, Any]]) -> Conversation:
+        """Set a chat's history from a full client transcript. Conversions of unchanged messages are kept."""
+        conversation = self._get_or_create(chat_id)
+        conversation.messages = list(messages)
+        conversation.updated_at = time.monotonic()
+        return conversation
+
+    def extend(self, chat_id: str, messages: List[Dict[str, Any]]) -> Conversation:
+        """Append a delta to a known chat; raises UnknownConversationError otherwise."""
+        conversation = self.get(chat_id)
+        if conversation is None:
+            raise UnknownConversationError(chat_id)
+        conversation.messages.extend(messages)
+        conversation.updated_at = time.monotonic()
+        return conversation
+
+    def append_reply(self, chat_id: str, text: str) -> None:
+        """Record the assistant reply streamed for a chat's latest turn."""
+        conversation = self.get(chat_id)
+        if conversation is not None and text:
+            conversation.messages.append({"role": "assistant", "content": text, "attachments": []})
+
+    async def agent_messages(self, conversation: Conversation, convert: Converter) -> List[Dict[str, Any]]:
+        """
+        Agent-format messages for the whole conversation, converting only
+        messages that are new or changed since the last call.
+
+        Args:
+            conversation: Conversation from `replace`/`extend`
+            convert: Converter for one formatted message (orchestrator.convert_message);
+                conversions it flags as not cacheable are redone on the next call
+
+        Returns:
+            A new list; callers may append to it without touching the memo
+        """
+        async with conversation.lock:
+            converted = conversation.converted
+            messages = conversation.messages
+            for i, message in enumerate(messages):
+                digest = message_hash(message)
+                if i < len(converted) and converted[i][0] == digest:
+                    self.stats["reused"] += 1
+                    continue
+                agent_message, cacheable = await convert(message)
+                self.stats["converted"] += 1
+                # An empty digest never matches, so partial/failed attachments are retried.
+                if not cacheable:
+                    digest = ""
+                if i < len(converted):
+                    converted[i] = (digest, agent_message)
+                else:
+                    converted.append((digest, agent_message))
+            # History was edited shorter (e.g. a regenerated reply).
+            del converted[len(messages):]
+            return [agent_message for _, agent_message in converted]
+
+
+conversation_store = ConversationStore.from_env()
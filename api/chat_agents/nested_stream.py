@@ -0,0 +1,120 @@
+"""
+Nested streaming of sub-agent output into the chat stream.
+
+`stream_chat_py` activates a `StreamMux` while it starts the orchestrator
+run; the run's task (and every tool call inside it) inherits the mux through
+a context variable. `run_subagent` streams the sub-agent and writes its text
+deltas to the mux, which `stream_chat_py` drains alongside the orchestrator's
+own events - so routed answers reach the client token by token instead of
+after the tool returns.
+
+When sub-agents run in parallel, the first to produce text streams live and
+the others are buffered, then flushed in call order, so answers never
+interleave mid-sentence.
+"""
+
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from agents import Agent, Runner
+
+logger = logging.getLogger(__name__)
+
+_current_mux: ContextVar[Optional["StreamMux"]] = ContextVar("subagent_stream_mux", default=None)
+
+SEPARATOR = "\n\n"
+
+
+class StreamMux:
+    """Single queue of ("event", stream event) / ("delta", text) / ("done", None) items."""
+
+    def __init__(self):
+        self.queue: "asyncio.Queue[tuple[str, Any]]" = asyncio.Queue()
+        self._channels: List[int] = []
+        self._buffers: Dict[int, List[str]] = {}
+        self._closed: Set[int] = set()
+        self._owner: Optional[int] = None
+        self._emitted = False
+
+    def put_event(self, event: Any) -> None:
+        self.queue.put_nowait(("event", event))
+
+    def finish(self) -> None:
+        self.queue.put_nowait(("done", None))
+
+    def _emit(self, text: str) -> None:
+        self._emitted = True
+        self.queue.put_nowait(("delta", text))
+
+    def open(self) -> int:
+        channel = len(self._channels)
+        self._channels.append(channel)
+        self._buffers[channel] = []
+        return channel
+
+    def write(self, channel: int, text: str) -> None:
+        if self._owner is None:
+            self._owner = channel
+            if self._emitted:
+                self._emit(SEPARATOR)
+        if channel == self._owner:
+            self._emit(text)
+        else:
+            self._buffers[channel].append(text)
+
+    def close(self, channel: int) -> None:
+        self._closed.add(channel)
+        if self._owner not in (None, channel):
+            return
+        self._owner = None
+        # Hand the stream to the next channel with text, flushing finished ones whole.
+        for waiting in self._channels:
+            buffered = self._buffers.get(waiting)
+            if waiting == channel or not buffered:
+                continue
+            self._emit(SEPARATOR)
+            for text in buffered:
+                self._emit(text)
+            buffered.clear()
+            if waiting not in self._closed:
+                self._owner = waiting
+                return
+
+
+@contextmanager
+def activate(mux: StreamMux) -> Iterator[None]:
+    """Make `mux` visible to tasks created inside the block (e.g. Runner.run_streamed's run task)."""
+    token = _current_mux.set(mux)
+    try:
+        yield
+    finally:
+        _current_mux.reset(token)
+
+
+async def run_subagent(agent: Agent, query: str) -> str:
+    """
+    Run a sub-agent and return its final output text, streaming its text
+    deltas into the active chat stream if there is one.
+    """
+    mux = _current_mux.get()
+    if mux is None:
+        result = await Runner.run(starting_agent=agent, input=query)
+        return str(result.final_output)
+
+    streamed = Runner.run_streamed(agent, input=query)
+    channel = mux.open()
+    try:
+        async for event in streamed.stream_events():
+            if getattr(event, "type", "") != "raw_response_event":
+                continue
+            data = getattr(event, "data", None)
+            if data is not None and "ResponseTextDeltaEvent" in str(data.__class__):
+                delta = getattr(data, "delta", "")
+                if delta:
+                    mux.write(channel, delta)
+    finally:
+        mux.close(channel)
+    return str(streamed.final_output)
@@ -1,30 +1,65 @@
+import asyncio
 import json 
 import time
 import logging 
 import os
-import re
-import requests
 import base64
-from io import BytesIO, StringIO
-from typing import List, Any, Dict, AsyncIterator
+from contextvars import ContextVar
+from typing import List, Any, Dict, AsyncIterator, Optional, Tuple
 from dotenv import load_dotenv
-from agents import Agent, Runner, WebSearchTool, CodeInterpreterTool
-from pypdf import PdfReader 
+from agents import Runner
 
 
-# subagent
-from .plaintiff_agent import plaintiffAgent
-from .lawyer_agent import lawyerAgent
+# agents
+from .registry import agent_registry
+from .conversation_store import Conversation, conversation_store
+from .compaction import history_compactor
+from .nested_stream import StreamMux, activate as activate_nested_stream
+from .router import INTAKE_DB, route_turn
+from .response_cache import replay_frames, response_cache
 
-# tools 
-from ..utils.tools import stored_intake_retrieval_tool
+from ..utils.attachment import split_file_markers
+from ..utils.tools import retrieve_intakes_from_db
+from ..utils.document_cache import document_cache
+from ..utils.pdf_extract import SpooledFile, extract_pdf_text, spool_base64, spool_url
+from ..context_assembler import assemble_context
+from ..rag_chunks import SearchHit
 
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
-def extract_pdf_text_from_url(url: str, max_chars: int = 50000) -> str:
+# Return plaintiffAgent/lawyerAgent output as the answer (already streamed to
+# the client) instead of having the orchestrator re-generate it.
+SUBAGENT_VERBATIM = os.environ.get("SUBAGENT_VERBATIM", "1") == "1"
+
+# Set by `convert_message` to collect attachments whose text is partial or an
+# error, so the conversion is not memoized and a later turn retries it.
+_incomplete_attachments: ContextVar[Optional[List[str]]] = ContextVar("incomplete_attachments", default=None)
+
+
+def _mark_incomplete(reason: str) -> None:
+    incomplete = _incomplete_attachments.get()
+    if incomplete is not None:
+        incomplete.append(reason)
+
+
+async def _extract_spooled_cached(spooled: SpooledFile, max_chars: int) -> str:
+    """Extract text from a spooled PDF, reusing a previous parse of identical bytes."""
+    cached = document_cache.get(spooled.sha256, max_chars)
+    if cached is not None:
+        return cached
+    text, complete = await extract_pdf_text(spooled.path, max_chars)
+    # Partial text from a time/memory limit is not cached, so a later turn can retry.
+    if complete:
+        document_cache.put(spooled.sha256, max_chars, text)
+    else:
+        _mark_incomplete("partial pdf")
+    return text
+
+
+async def extract_pdf_text_from_url(url: str, max_chars: int = 50000) -> str:
     """Extract text from PDF file from URL using pypdf
     
     Args:
@@ -32,167 +67,116 @@ def extract_pdf_text_from_url(url: str, max_chars: int = 50000) -> str:
         max_chars: Maximum characters to extract (default 50000 ~ 12-15k tokens)
     """
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        
-        pdf_file = BytesIO(response.content)
-        pdf_reader = PdfReader(pdf_file)
-        
-        total_pages = len(pdf_reader.pages)
-        text = ""
-        truncated = False
-        
-        for i, page in enumerate(pdf_reader.pages, 1):
-            if len(text) >= max_chars:
-                truncated = True
-                break
-                
-            page_text = page.extract_text()
-            if page_text:  # Guard against None
-                # Check if adding this page would exceed limit
-                if len(text) + len(page_text) > max_chars:
-                    remaining = max_chars - len(text)
-                    text += page_text[:remaining] + f"\n\n[Content truncated at {remaining} characters on page {i}]"
-                    truncated = True
-                    break
-                else:
-                    text += f"\n--- Page {i} ---\n{page_text}"
-        
-        result = text.strip()
-        
-        if truncated:
-            result += f"\n\n[Note: PDF has {total_pages} pages. Content was truncated to fit context limits. Only the first {len(result)} characters are shown.]"
-        else:
-            result = f"[PDF contains {total_pages} pages, {len(result)} characters]\n\n{result}"
-            
+        # Served from cache without a download when this URL was seen before.
+        entry = document_cache.url_entry(url)
+        headers = {}
+        if entry is not None:
+            sha, etag = entry
+            cached = document_cache.get(sha, max_chars)
+            if cached is not None:
+                if not (document_cache.revalidate and etag):
+                    return cached
+                headers["If-None-Match"] = etag
+
+        spooled = await spool_url(url, headers)
+        if spooled is None:  # 304 Not Modified
+            return cached
+        try:
+            result = await _extract_spooled_cached(spooled, max_chars)
+        finally:
+            spooled.remove()
+        document_cache.link_url(url, spooled.sha256, spooled.etag)
         return result
     except Exception as e:
         logger.error(f"Error extracting PDF text from URL: {e}")
+        _mark_incomplete("pdf error")
         return f"[Error reading PDF: {str(e)}]"
 
-def extract_pdf_text_from_base64(base64_data: str, max_chars: int = 50000) -> str:
+async def extract_pdf_text_from_base64(base64_data: str, max_chars: int = 50000) -> str:
     """Extract text from PDF file from base64 data URL using pypdf
     
     Args:
-        base64_data: Base64 encoded PDF data
+        base64_data: Base64 encoded PDF data, optionally with a "data:...;base64," prefix
         max_chars: Maximum characters to extract (default 50000 ~ 12-15k tokens)
     """
     try:
-        # Remove the data URL prefix if present (e.g., "data:application/pdf;base64,")
-        if "base64," in base64_data:
-            base64_data = base64_data.split("base64,")[1]
-        
-        # Decode base64 to bytes
-        pdf_bytes = base64.b64decode(base64_data)
-        
-        # Create BytesIO object and read PDF
-        pdf_file = BytesIO(pdf_bytes)
-        pdf_reader = PdfReader(pdf_file)
-        
-        total_pages = len(pdf_reader.pages)
-        text = ""
-        truncated = False
-        
-        for i, page in enumerate(pdf_reader.pages, 1):
-            if len(text) >= max_chars:
-                truncated = True
-                break
-                
-            page_text = page.extract_text()
-            if page_text:  # Guard against None
-                # Check if adding this page would exceed limit
-                if len(text) + len(page_text) > max_chars:
-                    remaining = max_chars - len(text)
-                    text += page_text[:remaining] + f"\n\n[Content truncated at {remaining} characters on page {i}]"
-                    truncated = True
-                    break
-                else:
-                    text += f"\n--- Page {i} ---\n{page_text}"
-        
-        result = text.strip()
-        
-        if truncated:
-            result += f"\n\n[Note: PDF has {total_pages} pages. Content was truncated to fit context limits. Only the first {len(result)} characters are shown.]"
-        else:
-            result = f"[PDF contains {total_pages} pages, {len(result)} characters]\n\n{result}"
-        
-        return result
+        # Decoded in chunks straight to disk rather than into one bytes object.
+        spooled = await spool_base64(base64_data)
+        try:
+            return await _extract_spooled_cached(spooled, max_chars)
+        finally:
+            spooled.remove()
     except Exception as e:
         logger.error(f"Error extracting PDF text from base64: {e}")
+        _mark_incomplete("pdf error")
         return f"[Error reading PDF: {str(e)}]"
 
 
 
-def process_file_content(content: str) -> str:
-    """Process message content and extract file contents"""
-    # Pattern for URL-based files: [File: filename (mediaType) - URL: url]
-    url_file_pattern = r'\[File: ([^(]+) \(([^)]+)\) - URL: ([^\]]+)\]'
-    
-    # Pattern for base64 content: [File: filename (mediaType) - Content: base64data]
+async def render_attachment(attachment: Dict[str, str]) -> str:
+    """Expand one structured attachment into the text the agent sees."""
+    filename = (attachment.get("name") or "file").strip()
+    media_type = (attachment.get("type") or "").strip()
+    max_text_chars = 30000  # Limit for text files
 
-    content_file_pattern = re.compile(
-        r'\[File:\s*(.+?)\s*\(([^)]+)\)\s*-\s*Content:\s*(.+?)\]',
-        flags=re.DOTALL
-    )    
-    
-    def replace_url_file_ref(match):
-        filename = match.group(1).strip()
-        media_type = match.group(2).strip()
-        url = match.group(3).strip()
-        
+    if attachment.get("url"):
         if media_type == 'application/pdf':
-            file_content = extract_pdf_text_from_url(url)
+            file_content = await extract_pdf_text_from_url(attachment["url"])
             return f"[PDF File: {filename}]\n{file_content}\n[End of PDF]"
         else:
             return f"[File: {filename} ({media_type}) - Content not processed]"
-    
-    def replace_content_file_ref(match):
-        filename = match.group(1).strip()
-        media_type = match.group(2).strip()
-        base64_content = match.group(3).strip()
-        max_text_chars = 30000  # Limit for text files
-        
-        if media_type == 'application/pdf':
-            file_content = extract_pdf_text_from_base64(base64_content)
-            return f"\n\n[PDF File: {filename}]\n{file_content}\n[End of PDF]\n\n"
-        elif media_type in ['text/plain', 'text/csv']:
-            # Decode text files directly
-            try:
-                if "base64," in base64_content:
-                    base64_content = base64_content.split("base64,")[1]
-                text_content = base64.b64decode(base64_content).decode('utf-8')
-                
-                # Truncate if too long
-                if len(text_content) > max_text_chars:
-                    truncated = text_content[:max_text_chars]
-                    return f"\n\n[Text File: {filename}]\n{truncated}\n\n[Content truncated. Showing first {max_text_chars} of {len(text_content)} characters]\n[End of File]\n\n"
-                else:
-                    return f"\n\n[Text File: {filename}]\n{text_content}\n[End of File]\n\n"
-            except Exception as e:
-                logger.error(f"Error decoding text file: {e}")
-                return f"[File: {filename} - Error decoding: {str(e)}]"
-        elif media_type in ['application/vnd.ms-excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet']:
-            # For Excel/CSV files, just note that it's attached
-            return f"\n\n[Excel/CSV File: {filename} - Data file attached]\n\n"
-        else:
-            return f"[File: {filename} ({media_type}) - Content not processed]"
-    
-    # Process both patterns
-    processed = re.sub(url_file_pattern, replace_url_file_ref, content)
-    processed = re.sub(content_file_pattern, replace_content_file_ref, processed)
-    
-    return processed
 
+    base64_content = attachment.get("content") or ""
+    if media_type == 'application/pdf':
+        file_content = await extract_pdf_text_from_base64(base64_content)
+        return f"\n\n[PDF File: {filename}]\n{file_content}\n[End of PDF]\n\n"
+    elif media_type in ['text/plain', 'text/csv']:
+        # Decode text files directly
+        try:
+            if "base64," in base64_content:
+                base64_content = base64_content.split("base64,", 1)[1]
+            text_content = base64.b64decode(base64_content).decode('utf-8')
+            
+            # Truncate if too long
+            if len(text_content) > max_text_chars:
+                truncated = text_content[:max_text_chars]
+                return f"\n\n[Text File: {filename}]\n{truncated}\n\n[Content truncated. Showing first {max_text_chars} of {len(text_content)} characters]\n[End of File]\n\n"
+            else:
+                return f"\n\n[Text File: {filename}]\n{text_content}\n[End of File]\n\n"
+        except Exception as e:
+            logger.error(f"Error decoding text file: {e}")
+            return f"[File: {filename} - Error decoding: {str(e)}]"
+    elif media_type in ['application/vnd.ms-excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet']:
+        # For Excel/CSV files, just note that it's attached
+        return f"\n\n[Excel/CSV File: {filename} - Data file attached]\n\n"
+    else:
+        return f"[File: {filename} ({media_type}) - Content not processed]"
+
+
+async def process_file_content(content: str, attachments: Optional[List[Dict[str, str]]] = None) -> str:
+    """
+    Expand a message's attachments into text.
+
+    Legacy [File: ...] markers in `content` are expanded in place; structured
+    `attachments` are appended after the text, one per line.
+    """
+    parts = []
+    for segment in split_file_markers(content):
+        parts.append(segment if isinstance(segment, str) else await render_attachment(segment))
+    for attachment in attachments or []:
+        parts.append("\n" + await render_attachment(attachment))
+    return "".join(parts)
 
 
-def to_agent_messages(history: List[Dict[str, Any]]):
+
+async def to_agent_messages(history: List[Dict[str, Any]]):
     msgs = []
     for m in history:
         role = m.get("role", "user").lower()
         text = str(m.get("content", ""))
         
         # Process file content if present
-        processed_text = process_file_content(text)
+        processed_text = await process_file_content(text, m.get("attachments"))
 
         if role == "system":
             msgs.append({"content": processed_text, "role": "developer", "type": "message"})
@@ -203,9 +187,28 @@ def to_agent_messages(history: List[Dict[str, Any]]):
 
     return msgs
 
+
+async def convert_message(message: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+    """
+    Convert one formatted message; the flag is False when an attachment was
+    only partly read or failed, so the result must not be memoized.
+    """
+    incomplete: List[str] = []
+    token = _incomplete_attachments.set(incomplete)
+    try:
+        agent_message = (await to_agent_messages([message]))[0]
+    finally:
+        _incomplete_attachments.reset(token)
+    return agent_message, not incomplete
+
+
 async def stream_chat_py(
     messages: List[Dict[str, Any]],
     selected_chat_mode: str,
+    retrieved: Optional[List[SearchHit]] = None,
+    context_token_budget: Optional[int] = None,
+    conversation: Optional[Conversation] = None,
+    subagent_verbatim: Optional[bool] = None,
 ) -> AsyncIterator[str]:
 
     start_time = time.time()
@@ -224,168 +227,100 @@ async def stream_chat_py(
 
 
     
-    # Adjust instructions based on mode
-    mode_context = ""
-    if selected_chat_mode == "lawyer":
-        mode_context = """
-    IMPORTANT: The user has identified as a LAWYER. Always route to the lawyerAgent.
-    The user has access to intake rankings and wants to research cases, analyze intakes, and get insights.
-    Use the stored_intake_retrieval_tool to access intake data when asked about intakes.
-    """
-    
-    instructions = f"""
-    You are part of a full-stack demo built by AI Engineer **Yasser Ali** (Next.js frontend, FastAPI+Python backend). 
-    This project showcases two legal AI agents (for plaintiffs and for lawyers) under a single orchestrator, plus a Q&A 
-    about Yasser's background. The company audience is **Eve**, a startup building AI to help lawyers work faster.
-
-    {mode_context}
-
-    ──────────────────────────────────────────────────────────────────────────────
-    SYSTEM GOALS
-    - Give Eve a hands-on demo of a dual-agent legal assistant:
-    1) plaintiffAgent — helps potential plaintiffs understand their case and prepare for counsel.
-    2) lawyerAgent — helps lawyers triage, research, and memo a case quickly.
-    - Also answer questions about **Yasser** (skills, projects, philosophy) to support hiring decisions.
-    - Always be honest, source-driven, and explicit about uncertainty.
-
-    ──────────────────────────────────────────────────────────────────────────────
-    ROUTING / MODES
-    - If the user appears to be a **potential plaintiff**, route to **plaintiffAgent**.
-    - If the user self-identifies as a **lawyer** or frames the question in counsel terms, route to **lawyerAgent**.
-    - If unclear: ask one targeted question ("Are you seeking guidance as a potential plaintiff, or analysis as counsel?").
-    - Both sub-agents must use the web search tool for statutes, deadlines, and firm recommendations and **cite sources**.
-
-    Agents: 
-    1. plaintiffAgent
-    2. lawyerAgent
-    3. stored_intake_retrieval - When the user asks to access the database of intakes. 
-
-    Research Protocol (both agents)
-    - Use web search for legal specifics and firm recs; prefer primary sources (.gov, court sites, official codes).
-    - Provide 2–5 reputable citations for any legal rule, deadline, or recommendation.
-    - Summarize disagreements/splits if authorities conflict; surface uncertainty explicitly.
-
-    Multi-Intake & Ranking
-    - When given multiple intake emails/PDFs/texts, extract structured fields, score each case, and produce:
-    - A ranking table (CaseID, Theory, Jurisdiction, SOL risk, Strength 0–100, Top 3 Risks, Evidence Highlights).
-    - A one-paragraph rationale per case.
-    - Offer a draft outbound intake letter for the **top 1–2** cases.
-
-    Attachments / Files
-    - Accept short text or PDFs (intake forms). If multiple, batch analyze and rank as above.
-    - If unable to read a file, ask for text or a readable PDF copy.
-
-    ──────────────────────────────────────────────────────────────────────────────
-    ABOUT YASSER (use for "Why hire Yasser?" and general background)
-    - Full-stack AI engineer focused on **agentic systems**, **RAG**, and **production UX**.
-    - Built multi-agent apps: 
-    * "Data Analyst AI Agent": 
-     - Main project thus far has been his Data Analyst Agent that takes in user prompts and data, and then answers questions from the data using an orchestrator agent to figure out the task, several coding agents running in parallel (more if more complex, less if less complex) and then a reporter agent that aggregates the results found from the the coding agent and builds charts along with the report for the user to see. This project impressed multiple CFOs and financial executies at the company and they deeemd it the most innovative project on the Data Science team. 
-    • "Atlas" — Next.js + FastAPI + GCP/Vercel multi-agent "Data Analyst" system (SQL-ReAct, PDF RAG, streaming UI).  
-    • "Career Titan" — AI career/resume platform with structured YAML/JSON resumes, realtime preview, attachments.  
-    - Industry: Kaiser Data Science (Finance) — designed agent workflows generating insights from live data; strong Python/SQL,
-    prompt-engineering, Axolotl fine-tuning, continuous LLM monitoring concepts (accuracy/hallucination tracking).
-    - Background: Applied Mathematics (UCSB). Comfortable with ML (CNNs/transfer learning), orchestration (Next.js/React/TS),
-    backend APIs (FastAPI), and evaluation pipelines.
-    - Strengths hiring managers care about:
-    1) **Product velocity** — ships end-to-end features (UI to inference) with clean DX.  
-    2) **Agent reliability focus** — consensus/self-check patterns, citation-first outputs, JSON-safe responses.  
-    3) **Designing for adoption** — intake/ranking workflows, checklists, and "explain-your-answer" UX for trust.  
-    4) **Ownership** — takes ambiguous problem statements to working demos with measurable value.
-
-    ──────────────────────────────────────────────────────────────────────────────
-    FAQ BUTTON HANDLERS (answer these crisply if user clicks/asks)
-
-    1) "What are some ideas to further improve Eve?"
-    - Expand scope beyond lawyers to **potential plaintiffs** (consumer-facing pre-intake). The agent can:
-    • Pre-screen claims; score strength; flag SOL/notice rules with citations.
-    • Auto-draft a polished **intake letter** from user facts.
-    • Recommend suitable firms (neutral criteria + disclosure).  
-    - Dual benefit / business model: offer a transparent **Premium Placement** to firms (clearly labeled "Sponsored") that 
-    prioritizes their listing within reason and jurisdiction/practice-area fit—creating a lead-gen channel for Eve.
-    - Reliability upgrades: enforce **cite-every-claim**, structured outputs, automatic uncertainty flags, and human-in-the-loop
-    checkpoints for low-confidence or high-variance answers.
-    - Ops integrations: CRM push (create matter/leads), SOL calculators, conflict check prompts, templated demand letters,
-    pattern-jury-instructions linking, and deposition/ROGs boilerplates with placeholders.
-
-    2) "How could we reduce hallucinations in AI Agents?"
-    - **Citations by default**: every legal proposition or deadline must have a source (statute/case/court/agency page).
-    - **Parallel consensus**: run multiple sub-agents (different prompts/tools) in parallel; compare outputs.  
-    If they converge → higher confidence; if they diverge → expose differences to user and elevate to **human-review**.
-    - **Adjudicator pass**: a final reviewer agent checks claims vs. citations (regex/semantic matches) and enforces schema.
-    - **RAG + retrieval guards**: restrict legal answers to retrieved, jurisdiction-matched passages; highlight quoted spans.
-    - **Evaluation & logs**: track disagreement rate, missing-citation rate, and edit distance vs. ground truth in regression tests.
-
-    3) "How could I use this chatbot?"
-    - Ask about **Yasser** (projects, decisions, stack choices) or request a **live demo** of plaintiff/lawyer flows.
-    - Upload one or more **intake forms** (short PDFs or text) and have the system **analyze & rank** case strength.
-    - For lawyers: paste a fact pattern; get an **issue-spotted memo** with controlling authority and a take/decline call.
-    - For potential plaintiffs: describe your situation; receive a **case snapshot**, **strength score**, **next steps**, and a 
-    **draft letter** to send to law firms—plus **firm recommendations** with citations.
-    - Ask for "**JSON output**" to integrate directly with your pipeline/CRM.
-
-    4) "Why hire Yasser?"
-    - Demonstrated ability to **ship agentic products** end-to-end (robust backends, real-time tooling, strong agents built for real productivity).
-    - Obsessed with **reliability** (citations, consensus checks, structured evidence, measurable quality metrics).
-    - Versatile stack: **Next.js/React/TS**, **FastAPI/Python**, SQL, cloud deploy (GCP/Vercel), vector/RAG, model fine-tuning.
-    - Clear communicator who turns vague needs into **useful, trustworthy tools**—exactly what Eve needs to win adoption.
-
-    ──────────────────────────────────────────────────────────────────────────────
-    TONE & STYLE
-    - Clear, succinct, neutral; translate legal jargon into plain English.
-    - Surface uncertainty; avoid overclaiming. Use bullets, tables, and checklists.
-    - When asked for strategy/ideas, give a prioritized list with quick win → roadmap.
-
-    EXAMPLES / PROMPTS USERS CAN TRY
-    - "Here are 3 intake emails—rank them and write a one-page memo for the strongest case."  
-    - "Analyze this employment termination timeline for retaliation; cite CA authority and give a take/decline call."  
-    - "Draft a neutral intake letter from these facts for an NYC wage case and list 5 suitable firms with citations."  
-    - "Show how Eve could monetize plaintiff pre-intake without harming trust."  
-    - "Why should Eve trust your legal answers? Explain your consensus + citation approach."  
-
-    OUTPUT MODES
-    - Markdown by default. Offer an optional **JSON block** with fields:
-    mode, jurisdiction, facts_snapshot, claims, elements_map, case_strength_score, risks, deadlines, recommendation, sources.
-
-    REMINDERS
-    - Never present legal specifics without citations. 
-    - If laws vary by state or are unsettled, describe the split and recommend attorney review.
-    - If given multiple files, produce a **ranking table** first, then per-case summaries.
-
-    END OF SYSTEM INSTRUCTIONS
-    """.strip() 
-    
-
-
-    agent = Agent(
-        name="agent",
-        model="gpt-4.1",
-        instructions=instructions,
-        tools=[
-            WebSearchTool(),
-            plaintiffAgent,
-            lawyerAgent,
-            stored_intake_retrieval_tool
-        ]
-    )
-
-    agent_input = to_agent_messages(messages)
+    # Route before any model call: deterministic routes and clear classifier
+    # results go straight to a sub-agent, skipping the orchestrator hop.
+    route = route_turn(messages, selected_chat_mode)
+    logger.info("🧭 Route | target=%s | %s", route.target, route.reason)
+
+    # Shared, prebuilt agents (instructions hot-reload from
+    # chat_agents/instructions/; see registry.py).
+    if subagent_verbatim is None:
+        subagent_verbatim = SUBAGENT_VERBATIM
+    if route.agent_name:
+        agent = agent_registry.get(route.agent_name)
+    else:
+        agent = agent_registry.orchestrator(selected_chat_mode, verbatim=subagent_verbatim)
+
+    # FAQ openers replay a cached answer (keyed by the instruction version the
+    # registry just checked) without a model call.
+    instruction_version = agent_registry.version
+    cache_key = response_cache.key_for(route, messages, selected_chat_mode)
+    if cache_key is not None:
+        cached_answer = response_cache.get(cache_key, instruction_version)
+        if cached_answer is not None:
+            logger.info("⚡ FAQ cache hit | prompt=%r", cache_key[0])
+            for frame in replay_frames(cached_answer):
+                yield frame
+            return
+
+    # Only messages new since the last turn are converted when the chat's
+    # history is held server-side.
+    if conversation is not None:
+        agent_input = await conversation_store.agent_messages(conversation, convert_message)
+    else:
+        agent_input = await to_agent_messages(messages)
+
+    # Older turns are replaced by a rolling summary once the history is long;
+    # summaries are built in the background for the next turn.
+    agent_input = history_compactor.compact(agent_input)
+
+    if route.target == INTAKE_DB:
+        intakes = await retrieve_intakes_from_db(route.category)
+        agent_input.append({"content": f"[STORED INTAKES]\n{intakes}", "role": "developer", "type": "message"})
+
+    # Pack retrieved chunks after attachments are inlined, so chunks the model
+    # already sees in full are not sent twice.
+    if retrieved:
+        context, context_report = assemble_context(
+            retrieved,
+            inlined_texts=[m["content"] for m in agent_input if m["role"] == "user"],
+            budget=context_token_budget,
+        )
+        if context:
+            agent_input.append({"content": f"[RETRIEVED CONTEXT]\n{context}", "role": "developer", "type": "message"})
     logger.debug("agent_input_preview=%s", json.dumps(agent_input[-3:], ensure_ascii=False))
 
-    logger.info("📋 Orchestrator Agent Configuration:")
-    logger.info("  - Model: %s", getattr(agent, "model", "unknown"))
-    logger.info("  - Available tools: WebSearchTool, plaintiffAgent, lawyerAgent")
+    logger.info("📋 Agent Configuration:")
+    logger.info("  - Agent: %s | Model: %s | instructions=%s", agent.name, getattr(agent, "model", "unknown"), agent_registry.version)
+    logger.info("  - Available tools: %s", ", ".join(tool.name for tool in agent.tools))
     logger.info("  - Message history length: %d", len(agent_input))
 
     start_time = time.time()
+    pump: Optional[asyncio.Task] = None
+    answer: List[str] = []
 
     try:
         logger.info("▶️  Starting Runner.run_streamed...")
 
-        streamed = Runner.run_streamed(agent, input=agent_input)
+        # Sub-agent tools inherit the mux from the run task and write their
+        # text deltas to it; orchestrator events are pumped into the same queue.
+        mux = StreamMux()
+        with activate_nested_stream(mux):
+            streamed = Runner.run_streamed(agent, input=agent_input)
         logger.info("✅ Runner.run_streamed stream established")
 
-        async for ev in streamed.stream_events():
+        async def pump_events() -> None:
+            try:
+                async for event in streamed.stream_events():
+                    mux.put_event(event)
+            except Exception as e:
+                mux.queue.put_nowait(("error", e))
+            finally:
+                mux.finish()
+
+        pump = asyncio.create_task(pump_events())
+
+        while True:
+            kind, ev = await mux.queue.get()
+            if kind == "done":
+                break
+            if kind == "error":
+                raise ev
+            if kind == "delta":
+                answer.append(ev)
+                yield f"0:{json.dumps(ev)}\n"
+                continue
+
             et = getattr(ev, "type", "")
             
             # Log all event types for debugging
@@ -401,11 +336,13 @@ async def stream_chat_py(
                 if data and hasattr(data, "__class__") and "ResponseTextDeltaEvent" in str(data.__class__):
                     delta = getattr(data, "delta", "")
                     if delta:
+                        answer.append(delta)
                         yield f"0:{json.dumps(delta)}\n"
 
             elif et in ("text.delta", "response.text.delta", "agent.output_text.delta"):
                 chunk = getattr(ev, "delta", None) or getattr(ev, "text", "")
                 if chunk:
+                    answer.append(chunk)
                     yield f"0:{json.dumps(chunk)}\n"
 
             elif et in ("error", "agent.error", "run.error"):
@@ -425,6 +362,8 @@ async def stream_chat_py(
             "usage": {"promptTokens": 0, "completionTokens": 0},
             "isContinued": False,
         }
+        if cache_key is not None:
+            response_cache.put(cache_key, instruction_version, "".join(answer))
         yield f"e:{json.dumps(finish_payload)}\n"
 
     except Exception as e:
@@ -438,6 +377,9 @@ async def stream_chat_py(
         yield f"e:{json.dumps(error_payload)}\n"
 
     finally:
+        if pump is not None and not pump.done():
+            pump.cancel()
+            streamed.cancel()
         duration = time.time() - start_time
         logger.info("=" * 100)
         logger.info("🏁 ORCHESTRATOR FINISHED | duration=%d ms", int(duration * 1000))
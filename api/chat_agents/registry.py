@@ -0,0 +1,164 @@
+"""
+Registry of the shared Agent instances.
+
+Agent configurations are built once - the orchestrator in both chat modes
+(default and lawyer, each also in a "verbatim" variant that ends the run with
+the sub-agent's answer), the plaintiff and lawyer sub-agents, and the intake
+analyst - and handed out to every request instead of being rebuilt per call.
+Treat the returned agents as read-only; use `agent.clone(...)` for a variant.
+
+Instruction text lives in `instructions/*.md` next to this module. The
+registry re-reads it when a file changes (checked at most every
+AGENT_RELOAD_CHECK_SECONDS), so prompts can be edited without a restart;
+requests already running keep the agents they started with. `version` (all
+files) and `versions[stem]` (one file) are short hashes of the instruction
+text, for cache keys and logs.
+
+Configuration (environment variables):
+    AGENT_INSTRUCTIONS_DIR       Instruction directory (default: instructions/ next to this file)
+    AGENT_RELOAD_CHECK_SECONDS   Minimum seconds between change checks; 0 disables hot reload (default 5)
+    AGENT_MODEL                  Model for all registry agents (default gpt-4.1)
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from agents import Agent, ModelSettings, StopAtTools
+
+from .plaintiff_agent import plaintiffAgent
+from .lawyer_agent import lawyerAgent
+from ..utils.tools import stored_intake_retrieval_tool
+from ..knowledge_pack import legal_knowledge_lookup
+from ..web_search import agent_search_tool
+
+logger = logging.getLogger(__name__)
+
+AGENT_INSTRUCTIONS_DIR = os.environ.get(
+    "AGENT_INSTRUCTIONS_DIR", os.path.join(os.path.dirname(__file__), "instructions")
+)
+AGENT_RELOAD_CHECK_SECONDS = float(os.environ.get("AGENT_RELOAD_CHECK_SECONDS", "5"))
+AGENT_MODEL = os.environ.get("AGENT_MODEL", "gpt-4.1")
+
+CHAT_MODES = ("default", "lawyer")
+SUBAGENT_TOOL_NAMES = ("plaintiffAgent", "lawyerAgent")
+
+# Instruction files, by stem.
+INSTRUCTION_FILES = ("orchestrator", "orchestrator_lawyer_mode", "plaintiff", "lawyer", "intake_analyst")
+
+
+def _short_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+
+def render_orchestrator_instructions(texts: Dict[str, str], mode: str) -> str:
+    mode_context = texts["orchestrator_lawyer_mode"] if mode == "lawyer" else ""
+    return texts["orchestrator"].replace("{mode_context}", mode_context).strip()
+
+
+class AgentRegistry:
+    def __init__(self, instructions_dir: str = AGENT_INSTRUCTIONS_DIR, reload_check_seconds: float = AGENT_RELOAD_CHECK_SECONDS):
+        self.instructions_dir = instructions_dir
+        self.reload_check_seconds = reload_check_seconds
+        self._lock = threading.Lock()
+        self._agents: Dict[str, Agent] = {}
+        self._mtimes: Tuple[float, ...] = ()
+        self._checked_at = 0.0
+        self.version = ""
+        self.versions: Dict[str, str] = {}
+        self.reload(force=True)
+
+    def _path(self, stem: str) -> str:
+        return os.path.join(self.instructions_dir, f"{stem}.md")
+
+    def _current_mtimes(self) -> Tuple[float, ...]:
+        return tuple(os.path.getmtime(self._path(stem)) for stem in INSTRUCTION_FILES)
+
+    def _build(self, texts: Dict[str, str]) -> Dict[str, Agent]:
+        # One cached search layer shared by every agent (see api/web_search.py).
+        web_search = agent_search_tool()
+        agents: Dict[str, Agent] = {
+            "plaintiff": Agent(
+                name="plaintiff-agent",
+                model=AGENT_MODEL,
+                instructions=texts["plaintiff"],
+                tools=[legal_knowledge_lookup, web_search],
+            ),
+            "lawyer": Agent(
+                name="lawyer-agent",
+                model=AGENT_MODEL,
+                instructions=texts["lawyer"],
+                tools=[legal_knowledge_lookup, web_search],
+            ),
+            "intake_analyst": Agent(
+                name="intake-analyst",
+                model=AGENT_MODEL,
+                instructions=texts["intake_analyst"],
+                tools=[legal_knowledge_lookup, web_search],
+            ),
+        }
+        for mode in CHAT_MODES:
+            orchestrator = Agent(
+                name="agent",
+                model=AGENT_MODEL,
+                instructions=render_orchestrator_instructions(texts, mode),
+                # Sub-agent tools are async, so calls issued in one turn run concurrently.
+                model_settings=ModelSettings(parallel_tool_calls=True),
+                tools=[
+                    legal_knowledge_lookup,
+                    web_search,
+                    plaintiffAgent,
+                    lawyerAgent,
+                    stored_intake_retrieval_tool,
+                ],
+            )
+            agents[f"orchestrator:{mode}"] = orchestrator
+            # The sub-agent's (streamed) answer is the final answer; no second generation.
+            agents[f"orchestrator:{mode}:verbatim"] = orchestrator.clone(
+                tool_use_behavior=StopAtTools(stop_at_tool_names=list(SUBAGENT_TOOL_NAMES)),
+            )
+        return agents
+
+    def reload(self, force: bool = False) -> bool:
+        """Rebuild the agents if an instruction file changed. Returns True when rebuilt."""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            mtimes = self._current_mtimes()
+            if not force and mtimes == self._mtimes:
+                return False
+            texts = {}
+            for stem in INSTRUCTION_FILES:
+                with open(self._path(stem), encoding="utf-8") as f:
+                    texts[stem] = f.read().strip()
+            agents = self._build(texts)
+            versions = {stem: _short_hash(texts[stem]) for stem in INSTRUCTION_FILES}
+            # Swap in one assignment so readers see either the old or the new set.
+            self._agents, self._mtimes, self.versions = agents, mtimes, versions
+            self.version = _short_hash("\0".join(texts[stem] for stem in INSTRUCTION_FILES))
+        logger.info("🧩 Agent registry built | instructions=%s", self.version)
+        return True
+
+    def _maybe_reload(self) -> None:
+        if self.reload_check_seconds <= 0:
+            return
+        if time.monotonic() - self._checked_at < self.reload_check_seconds:
+            return
+        try:
+            self.reload()
+        except Exception as e:
+            # Keep serving the last good agents if an edit is mid-write or broken.
+            logger.error("❌ Agent instruction reload failed: %s", e)
+
+    def get(self, name: str) -> Agent:
+        self._maybe_reload()
+        return self._agents[name]
+
+    def orchestrator(self, mode: Optional[str], verbatim: bool = False) -> Agent:
+        name = f"orchestrator:{mode if mode in CHAT_MODES else 'default'}"
+        return self.get(f"{name}:verbatim" if verbatim else name)
+
+
+agent_registry = AgentRegistry()
@@ -0,0 +1,95 @@
+"""
+Response cache for FAQ and suggested-prompt answers.
+
+FAQ buttons start a chat with the same question over and over, and each click
+used to regenerate the answer with a full orchestrator run. Answers to
+first-turn FAQ routes (see `router.match_faq`, which folds rephrasings onto
+the canonical prompt) are cached per (prompt, chat mode, instruction
+version) and replayed as a Vercel data stream without a model call.
+
+The instruction version comes from the agent registry, so editing any
+instruction file changes the key; entries cached under an older version are
+dropped when next looked up.
+
+Configuration (environment variables):
+    RESPONSE_CACHE_ENABLED       "0" disables the cache (default 1)
+    RESPONSE_CACHE_TTL_SECONDS   Entry lifetime (default 86400)
+    RESPONSE_CACHE_MAX_ENTRIES   Entries kept in memory (default 256)
+"""
+
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .router import FAQ, Route
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "1") == "1"
+RESPONSE_CACHE_TTL_SECONDS = float(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", "86400"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+
+# Characters per replayed 0: frame.
+REPLAY_CHUNK_CHARS = 256
+
+
+def replay_frames(text: str) -> Iterator[str]:
+    """A cached answer as `0:` text frames followed by the `e:` finish frame."""
+    for start in range(0, len(text), REPLAY_CHUNK_CHARS):
+        yield f"0:{json.dumps(text[start:start + REPLAY_CHUNK_CHARS])}\n"
+    finish_payload = {
+        "finishReason": "stop",
+        "usage": {"promptTokens": 0, "completionTokens": 0},
+        "isContinued": False,
+    }
+    yield f"e:{json.dumps(finish_payload)}\n"
+
+
+class ResponseCache:
+    """In-memory LRU of answer text keyed by (FAQ prompt, chat mode)."""
+
+    def __init__(self, ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # (prompt, mode) -> (instruction version, stored at, answer text)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, float, str]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "invalidated": 0}
+
+    @staticmethod
+    def key_for(route: Route, messages: List[Dict[str, Any]], chat_mode: str) -> Optional[Tuple[str, str]]:
+        """Cache key for a turn, or None when its answer may depend on more than the prompt."""
+        if not RESPONSE_CACHE_ENABLED or route.target != FAQ or not route.faq:
+            return None
+        # Only the opening question of a chat, with nothing attached.
+        if len(messages) != 1 or messages[0].get("attachments"):
+            return None
+        return route.faq, chat_mode or "default"
+
+    def get(self, key: Tuple[str, str], version: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        entry_version, stored_at, text = entry
+        if entry_version != version or time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            self.stats["invalidated" if entry_version != version else "misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return text
+
+    def put(self, key: Tuple[str, str], version: str, text: str) -> None:
+        if not text.strip():
+            return
+        self._entries[key] = (version, time.monotonic(), text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        logger.info("💾 Cached FAQ answer | prompt=%r mode=%s version=%s", key[0], key[1], version)
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,214 @@
+"""
+Route-first dispatch for /api/chat turns.
+
+Most turns do not need the gpt-4.1 orchestrator to decide where they go, so
+each turn is routed before any model call:
+
+1. Deterministic rules - FAQ/suggested-prompt buttons, and in
+   `chat_mode=lawyer` (whose instructions already say "always route to the
+   lawyerAgent") intake-database questions and everything else that is not
+   about the demo, attached files, or other intake questions.
+2. A local keyword classifier scoring plaintiff vs. lawyer phrasing; a clear
+   winner is dispatched straight to that sub-agent.
+3. Anything else (ambiguous, about Yasser, multi-intake ranking with
+   attachments) goes to the orchestrator as before.
+
+Intake-database routes fetch the intakes up front and hand them to the
+lawyer agent as context, so no model call is spent choosing the tool.
+
+Configuration (environment variables):
+    ROUTER_ENABLED      "0" sends every turn to the orchestrator (default 1)
+    ROUTER_MIN_SCORE    Classifier score needed to dispatch directly (default 2)
+    ROUTER_MIN_MARGIN   Lead over the other side needed to dispatch (default 2)
+    FAQ_MATCH_THRESHOLD Word overlap for a typed question to count as an FAQ (default 0.8);
+                        negations and question words must also match exactly
+"""
+
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ROUTER_ENABLED = os.environ.get("ROUTER_ENABLED", "1") == "1"
+ROUTER_MIN_SCORE = int(os.environ.get("ROUTER_MIN_SCORE", "2"))
+ROUTER_MIN_MARGIN = int(os.environ.get("ROUTER_MIN_MARGIN", "2"))
+FAQ_MATCH_THRESHOLD = float(os.environ.get("FAQ_MATCH_THRESHOLD", "0.8"))
+
+# Routes
+ORCHESTRATOR = "orchestrator"
+PLAINTIFF = "plaintiff"
+LAWYER = "lawyer"
+INTAKE_DB = "intake_db"
+FAQ = "faq"
+
+
+def normalize_prompt(text: str) -> str:
+    """Lowercase, collapse whitespace and drop punctuation, for exact-match lookups."""
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", text.lower())).strip()
+
+
+# Suggested-prompt buttons (components/chat.tsx) and the FAQ handlers in the
+# orchestrator instructions; answered from the orchestrator's own text.
+FAQ_PROMPTS = frozenset(normalize_prompt(p) for p in (
+    "Tell me about Yasser",
+    "How can I use this chatbot?",
+    "How could I use this chatbot?",
+    "How do you determine how strong a case is?",
+    "How can I reduce hallucinations?",
+    "How could we reduce hallucinations in AI Agents?",
+    "What are some ideas to further improve Eve?",
+    "Why hire Yasser?",
+))
+
+_FAQ_STOPWORDS = frozenset("a an the i we you can could do how what is are to in of some this".split())
+_FAQ_TOKENS = {prompt: frozenset(prompt.split()) - _FAQ_STOPWORDS for prompt in FAQ_PROMPTS}
+# Words that change what is being asked: a fuzzy match must agree on all of
+# them ("why not hire yasser" is not "why hire yasser"). "t" is the tail of
+# a contraction split by normalize_prompt ("don't" -> "don t").
+_FAQ_GUARD_WORDS = frozenset(
+    "not no never nor without cannot t dont doesnt didnt isnt arent wont cant shouldnt "
+    "how why what who when where which whether".split()
+)
+
+
+def _faq_guards(normalized: str) -> frozenset:
+    return frozenset(normalized.split()) & _FAQ_GUARD_WORDS
+
+
+def match_faq(text: str) -> Optional[str]:
+    """
+    Canonical FAQ prompt for `text`: an exact normalized match, or the FAQ
+    whose content words overlap it by at least FAQ_MATCH_THRESHOLD (Jaccard)
+    and that has exactly the same negations and question words.
+    """
+    normalized = normalize_prompt(text)
+    if normalized in FAQ_PROMPTS:
+        return normalized
+    tokens = frozenset(normalized.split()) - _FAQ_STOPWORDS
+    if not tokens or len(tokens) > 12:
+        return None
+    guards = _faq_guards(normalized)
+    best, best_score = None, 0.0
+    for prompt, faq_tokens in _FAQ_TOKENS.items():
+        if _faq_guards(prompt) != guards:
+            continue
+        score = len(tokens & faq_tokens) / len(tokens | faq_tokens)
+        if score > best_score:
+            best, best_score = prompt, score
+    return best if best_score >= FAQ_MATCH_THRESHOLD else None
+
+
+_INTAKE_DB_RE = re.compile(
+    r"\b(intakes|stored intakes?|intake (database|db|rankings?|scores?|submissions?)|"
+    r"highest[- ]scoring|(distribution|list|show|rank)\b.{0,40}\bintakes?)\b"
+)
+
+_MATTER_TYPES = {
+    "employment": ("employment", "wrongful termination", "wage", "discrimination", "retaliation"),
+    "personal injury": ("personal injury", "accident", "injury", "injured"),
+    "mass tort/class action": ("mass tort", "class action"),
+    "family law": ("family law", "divorce", "custody", "child support"),
+    "immigration law": ("immigration", "visa", "deportation", "asylum"),
+}
+
+# First-person pronouns only add to a plaintiff score other cues have already
+# started; on their own they match chit-chat ("thanks, that helps me").
+_FIRST_PERSON_RE = re.compile(r"\b(i|i'm|i am|i was|i've|i have|my|me)\b")
+
+# Intake questions _INTAKE_DB_RE does not resolve are left to the orchestrator,
+# which has the retrieval tool; the lawyer agent does not.
+_INTAKE_MENTION_RE = re.compile(r"\b(intakes?|database|db)\b")
+
+_PLAINTIFF_CUES = (
+    (re.compile(r"\b(can i sue|do i have a case|should i (sue|get a lawyer)|find (me )?a lawyer|"
+                r"recommend (a )?(law )?firm|what are my (rights|options))\b"), 3),
+    (re.compile(r"\b(my (boss|employer|landlord|manager|ex|spouse)|i got (fired|hurt|injured)|was (fired|injured|hurt))\b"), 2),
+)
+
+_LAWYER_CUES = (
+    (re.compile(r"\b(my client|our client|the client|opposing counsel|counsel)\b"), 3),
+    (re.compile(r"\b(memo|take or decline|take/decline|issue[- ]spot|elements|motion|discovery|"
+                r"deposition|demurrer|summary judgment|brief|precedent|case law)\b"), 2),
+    (re.compile(r"\b(firm|matter|caseload|triage|retainer)\b"), 1),
+)
+
+_ORCHESTRATOR_RE = re.compile(r"\b(yasser|eve|hire|this (demo|chatbot|project))\b")
+
+
+@dataclass
+class Route:
+    target: str
+    reason: str
+    category: Optional[str] = None  # matter type filter for INTAKE_DB
+    faq: Optional[str] = None  # canonical FAQ prompt for FAQ
+
+    @property
+    def agent_name(self) -> Optional[str]:
+        """Registry agent to dispatch to directly, or None for the orchestrator."""
+        if self.target in (PLAINTIFF, LAWYER):
+            return self.target
+        if self.target == INTAKE_DB:
+            return LAWYER
+        return None
+
+
+def _score(text: str, cues) -> int:
+    return sum(weight * len(pattern.findall(text)) for pattern, weight in cues)
+
+
+def detect_matter_type(text: str) -> Optional[str]:
+    """First `MatterType` whose keywords appear in lowercased `text`, if any."""
+    for matter_type, keywords in _MATTER_TYPES.items():
+        if any(keyword in text for keyword in keywords):
+            return matter_type
+    return None
+
+
+def route_turn(messages: List[Dict[str, Any]], chat_mode: str) -> Route:
+    """
+    Pick a route for the latest turn without calling a model.
+
+    Args:
+        messages: Formatted chat messages (role/content/attachments)
+        chat_mode: "lawyer" or "default"
+
+    Returns:
+        Route for the turn; target ORCHESTRATOR when nothing is confident
+    """
+    if not ROUTER_ENABLED or not messages or messages[-1].get("role") != "user":
+        return Route(ORCHESTRATOR, "disabled" if not ROUTER_ENABLED else "no user turn")
+
+    last = messages[-1]
+    raw = str(last.get("content", ""))
+    text = raw.lower()
+
+    faq = match_faq(raw)
+    if faq is not None:
+        return Route(FAQ, "faq prompt", faq=faq)
+
+    # Batch intake ranking and questions about the demo itself are covered by
+    # the orchestrator's own instructions, in either chat mode.
+    if last.get("attachments") or _ORCHESTRATOR_RE.search(text):
+        return Route(ORCHESTRATOR, "attachments" if last.get("attachments") else "about the demo")
+
+    if chat_mode == "lawyer":
+        # The intake database is a lawyer-side feature; elsewhere the
+        # orchestrator keeps deciding whether to call the retrieval tool.
+        if _INTAKE_DB_RE.search(text):
+            return Route(INTAKE_DB, "intake database query", category=detect_matter_type(text))
+        if _INTAKE_MENTION_RE.search(text):
+            return Route(ORCHESTRATOR, "intake question")
+        return Route(LAWYER, "lawyer mode")
+
+    plaintiff = _score(text, _PLAINTIFF_CUES)
+    if plaintiff:
+        plaintiff += len(_FIRST_PERSON_RE.findall(text))
+    lawyer = _score(text, _LAWYER_CUES)
+    if plaintiff >= ROUTER_MIN_SCORE and plaintiff - lawyer >= ROUTER_MIN_MARGIN:
+        return Route(PLAINTIFF, f"classifier plaintiff={plaintiff} lawyer={lawyer}")
+    if lawyer >= ROUTER_MIN_SCORE and lawyer - plaintiff >= ROUTER_MIN_MARGIN:
+        return Route(LAWYER, f"classifier plaintiff={plaintiff} lawyer={lawyer}")
+    return Route(ORCHESTRATOR, f"ambiguous plaintiff={plaintiff} lawyer={lawyer}")
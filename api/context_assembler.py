@@ -0,0 +1,155 @@
+"""
+Token-budgeted assembly of the [RETRIEVED CONTEXT] block.
+
+Retrieved chunks are ranked by score, dropped when they duplicate text that is
+already inlined in the conversation (attachments expanded by
+`process_file_content`), truncated at sentence boundaries to fit, and packed
+until the per-request token budget is spent. The returned report records how
+many tokens each source used.
+"""
+
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .rag_chunks import SearchHit
+
+logger = logging.getLogger(__name__)
+
+RAG_CONTEXT_TOKEN_BUDGET = int(os.environ.get("RAG_CONTEXT_TOKEN_BUDGET", "2000"))
+# Ceiling for a per-request budget override (contextTokenBudget on /api/chat).
+RAG_CONTEXT_TOKEN_BUDGET_MAX = int(os.environ.get("RAG_CONTEXT_TOKEN_BUDGET_MAX", "8000"))
+# Fraction of a chunk's shingles already inlined above which it is a duplicate.
+DUPLICATE_OVERLAP = float(os.environ.get("RAG_DUPLICATE_OVERLAP", "0.6"))
+SHINGLE_WORDS = 8
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+_WORD_RE = re.compile(r"\w+")
+
+_encoder = None
+
+
+def count_tokens(text: str) -> int:
+    """Token count with the gpt-4.1 tokenizer (o200k_base)."""
+    global _encoder
+    if _encoder is None:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            # tiktoken fetches its BPE file on first use; degrade to an estimate offline.
+            logger.warning("tiktoken unavailable (%s) - estimating tokens as chars/4", e)
+            _encoder = False
+    if _encoder is False:
+        return (len(text) + 3) // 4
+    return len(_encoder.encode(text, disallowed_special=()))
+
+
+def _shingles(text: str) -> Set[int]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        return {hash(" ".join(words))} if words else set()
+    return {hash(" ".join(words[i:i + SHINGLE_WORDS])) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def _truncate_to_sentences(text: str, max_tokens: int) -> Optional[str]:
+    """Longest prefix of whole sentences within `max_tokens`, or None if not even one fits."""
+    kept: List[str] = []
+    used = 0
+    for sentence in _SENTENCE_END_RE.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        cost = count_tokens(sentence) + 1
+        if used + cost > max_tokens:
+            break
+        kept.append(sentence)
+        used += cost
+    return " ".join(kept) if kept else None
+
+
+@dataclass
+class ContextReport:
+    budget: int
+    used: int = 0
+    inlined_tokens: int = 0
+    by_source: Dict[str, int] = field(default_factory=dict)
+    included: int = 0
+    truncated: int = 0
+    duplicates: int = 0
+    over_budget: int = 0
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "budget": self.budget,
+            "used": self.used,
+            "inlinedTokens": self.inlined_tokens,
+            "bySource": self.by_source,
+            "included": self.included,
+            "truncated": self.truncated,
+            "duplicates": self.duplicates,
+            "overBudget": self.over_budget,
+        }
+
+
+def assemble_context(
+    hits: Iterable[SearchHit],
+    inlined_texts: Iterable[str] = (),
+    budget: Optional[int] = None,
+) -> Tuple[str, ContextReport]:
+    """
+    Pack retrieved chunks into a prompt block within `budget` tokens.
+
+    Args:
+        hits: Retrieved chunks (any order; ranked here by score)
+        inlined_texts: Message texts already sent to the model, used to drop
+            chunks the model will see anyway
+        budget: Token budget for the block (default RAG_CONTEXT_TOKEN_BUDGET)
+
+    Returns:
+        (formatted block or "", report)
+    """
+    report = ContextReport(budget=budget if budget is not None else RAG_CONTEXT_TOKEN_BUDGET)
+
+    inlined: Set[int] = set()
+    for text in inlined_texts:
+        inlined |= _shingles(text)
+        report.inlined_tokens += count_tokens(text)
+
+    parts: List[str] = []
+    seen: Set[str] = set()
+    for hit in sorted(hits, key=lambda h: h.score, reverse=True):
+        text = hit.text.strip()
+        if not text or text in seen:
+            continue
+        seen.add(text)
+
+        shingles = _shingles(text)
+        if shingles and inlined and len(shingles & inlined) / len(shingles) >= DUPLICATE_OVERLAP:
+            report.duplicates += 1
+            continue
+
+        header = f"### {hit.filename} (score: {hit.score:.3f})"
+        remaining = report.budget - report.used - count_tokens(header) - 2
+        if remaining <= 0:
+            report.over_budget += 1
+            continue
+        cost = count_tokens(text)
+        if cost > remaining:
+            text = _truncate_to_sentences(text, remaining)
+            if text is None:
+                report.over_budget += 1
+                continue
+            report.truncated += 1
+
+        block = f"{header}\n{text}"
+        block_tokens = count_tokens(block) + 2
+        parts.append(block)
+        report.used += block_tokens
+        report.by_source[hit.filename] = report.by_source.get(hit.filename, 0) + block_tokens
+        report.included += 1
+
+    logger.info("🧮 Context budget | %s", report.as_dict())
+    return "\n\n".join(parts), report
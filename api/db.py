@@ -0,0 +1,106 @@
+"""
+Shared async Postgres connection pool.
+
+The pool is opened once in the FastAPI lifespan (see `api/index.py`) and every
+intake read/write borrows a connection from it instead of calling
+`psycopg2.connect` per request.
+
+Configuration (environment variables):
+    DATABASE_URL              Postgres connection string (required for DB access)
+    DB_POOL_MIN_SIZE          Connections kept open at all times (default 1)
+    DB_POOL_MAX_SIZE          Upper bound on concurrent connections (default 10)
+    DB_POOL_TIMEOUT           Seconds to wait for a free connection (default 10)
+    DB_POOL_MAX_IDLE          Seconds before an idle extra connection is closed (default 300)
+    DB_STATEMENT_TIMEOUT_MS   Server-side statement_timeout per connection (default 15000)
+"""
+
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from psycopg import AsyncConnection
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+logger = logging.getLogger(__name__)
+
+_POOL: Optional[AsyncConnectionPool] = None
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def is_configured() -> bool:
+    """True when a DATABASE_URL is available for the pool."""
+    return bool(os.environ.get("DATABASE_URL"))
+
+
+async def open_pool() -> Optional[AsyncConnectionPool]:
+    """Create and open the shared pool. Safe to call more than once."""
+    global _POOL
+    if _POOL is not None:
+        return _POOL
+
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        logger.warning("DATABASE_URL not set - intake database endpoints are disabled")
+        return None
+
+    statement_timeout = _env_int("DB_STATEMENT_TIMEOUT_MS", 15000)
+    pool = AsyncConnectionPool(
+        conninfo=database_url,
+        min_size=_env_int("DB_POOL_MIN_SIZE", 1),
+        max_size=_env_int("DB_POOL_MAX_SIZE", 10),
+        timeout=float(_env_int("DB_POOL_TIMEOUT", 10)),
+        max_idle=float(_env_int("DB_POOL_MAX_IDLE", 300)),
+        kwargs={
+            "row_factory": dict_row,
+            "options": f"-c statement_timeout={statement_timeout}",
+        },
+        # Validate connections on checkout so a dropped server connection
+        # surfaces as a reconnect rather than a failed request.
+        check=AsyncConnectionPool.check_connection,
+        open=False,
+        name="intakes",
+    )
+    await pool.open()
+    _POOL = pool
+    logger.info(
+        "🗄️  Postgres pool opened | min=%d max=%d statement_timeout=%dms",
+        pool.min_size, pool.max_size, statement_timeout,
+    )
+    return _POOL
+
+
+async def close_pool() -> None:
+    """Close the shared pool (called on app shutdown)."""
+    global _POOL
+    if _POOL is None:
+        return
+    await _POOL.close()
+    _POOL = None
+    logger.info("🗄️  Postgres pool closed")
+
+
+async def get_pool() -> AsyncConnectionPool:
+    """Return the shared pool, opening it lazily if the lifespan did not."""
+    pool = _POOL or await open_pool()
+    if pool is None:
+        raise ValueError("DATABASE_URL environment variable not set")
+    return pool
+
+
+@asynccontextmanager
+async def connection() -> AsyncIterator[AsyncConnection]:
+    """
+    Borrow a pooled connection.
+
+    The block runs inside a transaction that is committed on success and
+    rolled back if an exception escapes.
+    """
+    pool = await get_pool()
+    async with pool.connection() as conn:
+        yield conn
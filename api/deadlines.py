@@ -0,0 +1,252 @@
+"""
+Rule-based statute-of-limitations and filing-deadline engine.
+
+Deadline rules come from the legal knowledge pack (`api/knowledge_pack.py`):
+each rule is a period (years/months/days) counted from a trigger, with its
+citation. Rules triggered by the incident are turned into calendar dates from
+`incidentDate`; rules with any other trigger (a right-to-sue notice, a final
+order, discovery) are returned without a date so they are still surfaced.
+
+`analyze_intake` puts the computed deadlines into its prompt instead of asking
+the model to work them out, and GET /api/intakes/deadlines sweeps every
+stored intake for deadlines that are approaching or already passed.
+
+Rules are compiled once per (pack version, jurisdiction, matter type), so a
+computation is a handful of date additions.
+
+Configuration (environment variables):
+    DEADLINE_URGENT_DAYS        Days left at which a deadline is "urgent" (default 30)
+    DEADLINE_APPROACHING_DAYS   Days left at which a deadline is "approaching" (default 90)
+"""
+
+import calendar
+import logging
+import os
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .knowledge_pack import format_period, knowledge_pack
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_URGENT_DAYS = int(os.environ.get("DEADLINE_URGENT_DAYS", "30"))
+DEADLINE_APPROACHING_DAYS = int(os.environ.get("DEADLINE_APPROACHING_DAYS", "90"))
+
+INCIDENT_TRIGGER = "incident"
+
+# Deadline statuses
+EXPIRED = "expired"
+URGENT = "urgent"
+APPROACHING = "approaching"
+OPEN = "open"
+PENDING_TRIGGER = "pending_trigger"
+
+_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%B %d, %Y", "%b %d, %Y")
+
+
+def parse_date(value: Any) -> Optional[date]:
+    """Date from a date/datetime or an ISO, US (MM/DD/YYYY) or "March 5, 2025" string; None if unparseable."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if not isinstance(value, str) or not value.strip():
+        return None
+    text = value.strip()
+    try:
+        return datetime.fromisoformat(text).date()
+    except ValueError:
+        pass
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def add_period(start: date, years: int = 0, months: int = 0, days: int = 0) -> date:
+    """Calendar addition; a day past the end of the target month clamps to its last day (Feb 29 -> Feb 28)."""
+    total_months = start.month - 1 + months + 12 * years
+    year, month = start.year + total_months // 12, total_months % 12 + 1
+    day = min(start.day, calendar.monthrange(year, month)[1])
+    return date.fromordinal(date(year, month, day).toordinal() + days)
+
+
+@dataclass(frozen=True)
+class DeadlineRule:
+    id: str
+    label: str
+    kind: str
+    citation: str
+    trigger: str
+    years: int = 0
+    months: int = 0
+    days: int = 0
+    condition: Optional[str] = None
+    note: Optional[str] = None
+
+    @classmethod
+    def from_pack(cls, raw: Dict[str, Any]) -> "DeadlineRule":
+        period = raw.get("period") or {}
+        return cls(
+            id=raw["id"],
+            label=raw["label"],
+            kind=raw.get("kind", "limitations"),
+            citation=raw["citation"],
+            trigger=raw.get("trigger", INCIDENT_TRIGGER),
+            years=int(period.get("years", 0)),
+            months=int(period.get("months", 0)),
+            days=int(period.get("days", 0)),
+            condition=raw.get("condition"),
+            note=raw.get("note"),
+        )
+
+
+@dataclass(frozen=True)
+class Deadline:
+    rule: DeadlineRule
+    due: Optional[date]
+    days_remaining: Optional[int]
+    status: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.rule.id,
+            "label": self.rule.label,
+            "kind": self.rule.kind,
+            "citation": self.rule.citation,
+            "trigger": self.rule.trigger,
+            "condition": self.rule.condition,
+            "note": self.rule.note,
+            "due": self.due.isoformat() if self.due else None,
+            "daysRemaining": self.days_remaining,
+            "status": self.status,
+        }
+
+
+# (pack version, jurisdiction text, matter type) -> compiled rules
+_rule_cache: Dict[Tuple[str, str, str], Tuple[DeadlineRule, ...]] = {}
+
+
+def rules_for(jurisdiction: Optional[str], matter_type: Optional[str]) -> Tuple[DeadlineRule, ...]:
+    """Compiled deadline rules for a jurisdiction and matter type (empty when the pack has none)."""
+    knowledge_pack.refresh()
+    key = (knowledge_pack.version, (jurisdiction or "").strip().lower(), (matter_type or "").strip().lower())
+    rules = _rule_cache.get(key)
+    if rules is None:
+        if len(_rule_cache) > 4096:
+            _rule_cache.clear()
+        entry = knowledge_pack.lookup(jurisdiction, matter_type)
+        rules = tuple(DeadlineRule.from_pack(raw) for raw in (entry or {}).get("deadlines", []))
+        _rule_cache[key] = rules
+    return rules
+
+
+def _status(days_remaining: int) -> str:
+    if days_remaining < 0:
+        return EXPIRED
+    if days_remaining <= DEADLINE_URGENT_DAYS:
+        return URGENT
+    if days_remaining <= DEADLINE_APPROACHING_DAYS:
+        return APPROACHING
+    return OPEN
+
+
+def compute_deadlines(
+    incident_date: Any,
+    jurisdiction: Optional[str],
+    matter_type: Optional[str],
+    today: Optional[date] = None,
+) -> List[Deadline]:
+    """
+    Deadlines for one matter, soonest first.
+
+    Args:
+        incident_date: Date of the incident (date or parseable string); None skips dated rules
+        jurisdiction: State name/code or location text
+        matter_type: One of the `MatterType` values
+        today: Reference date for days remaining (default: today)
+
+    Returns:
+        Dated deadlines sorted by due date, then rules with a non-incident trigger
+    """
+    start = parse_date(incident_date)
+    today = today or date.today()
+    dated: List[Deadline] = []
+    pending: List[Deadline] = []
+    for rule in rules_for(jurisdiction, matter_type):
+        if rule.trigger != INCIDENT_TRIGGER or start is None:
+            pending.append(Deadline(rule, None, None, PENDING_TRIGGER))
+            continue
+        due = add_period(start, rule.years, rule.months, rule.days)
+        remaining = (due - today).days
+        dated.append(Deadline(rule, due, remaining, _status(remaining)))
+    dated.sort(key=lambda d: d.due)
+    return dated + pending
+
+
+def format_deadlines(deadlines: List[Deadline]) -> str:
+    """Computed deadlines as prompt text, one line each."""
+    lines = []
+    for d in deadlines:
+        rule = d.rule
+        if d.due is None:
+            period = format_period({"years": rule.years, "months": rule.months, "days": rule.days})
+            line = f"- {rule.label}: {period} from {rule.trigger.replace('_', ' ')} ({rule.citation})"
+        elif d.status == EXPIRED:
+            line = f"- {rule.label}: EXPIRED {d.due.isoformat()} ({-d.days_remaining} days ago) ({rule.citation}) - check tolling/discovery rules"
+        else:
+            line = f"- {rule.label}: {d.due.isoformat()} ({d.days_remaining} days left, {d.status}) ({rule.citation})"
+        if rule.condition:
+            line += f" [only if {rule.condition}]"
+        if rule.note:
+            line += f" - {rule.note}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def sweep_deadlines(
+    intakes: Iterable[Dict[str, Any]],
+    within_days: int = DEADLINE_APPROACHING_DAYS,
+    include_expired: bool = False,
+    today: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Intakes with a dated deadline due within `within_days` (optionally also
+    already expired ones), most urgent first.
+
+    Rules with a `condition` (e.g. a government-entity claim) only apply to
+    some matters, so they never flag an intake on their own; for flagged
+    intakes they are listed separately under "conditionalDeadlines".
+
+    Args:
+        intakes: Raw `intakes` rows (need id, jurisdiction, matterType, incidentDate)
+        within_days: Window of days remaining to report
+        include_expired: Also report deadlines that have passed
+        today: Reference date (default: today)
+    """
+    today = today or date.today()
+    flagged = []
+    for intake in intakes:
+        if intake.get("incidentDate") is None:
+            continue
+        due = [
+            d for d in compute_deadlines(intake["incidentDate"], intake.get("jurisdiction"), intake.get("matterType"), today)
+            if d.due is not None and d.days_remaining <= within_days and (include_expired or d.days_remaining >= 0)
+        ]
+        hits = [d for d in due if not d.rule.condition]
+        if hits:
+            flagged.append({
+                "id": intake["id"],
+                "fullName": intake.get("fullName"),
+                "jurisdiction": intake.get("jurisdiction"),
+                "matterType": intake.get("matterType"),
+                "incidentDate": parse_date(intake["incidentDate"]).isoformat(),
+                "nextDue": hits[0].due.isoformat(),
+                "deadlines": [d.to_dict() for d in hits],
+                "conditionalDeadlines": [d.to_dict() for d in due if d.rule.condition],
+            })
+    flagged.sort(key=lambda item: item["nextDue"])
+    return flagged
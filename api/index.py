@@ -1,28 +1,77 @@
 from typing import AsyncIterator, Dict, List, Optional, Any
+from contextlib import asynccontextmanager
+import json
 import logging
-import psycopg2
-import psycopg2.extras
+import os
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Query, Response, Request as HttpRequest
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-from cuid import cuid
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
 
+from . import db
 from .chat_agents.orchestrator import stream_chat_py
 from .utils.prompt import ClientMessage
-from .rag_store import ensure_vector_store, upload_blobs, search_store, format_results_for_prompt
+from .utils.attachment import from_client_attachment
+from .chat_agents.conversation_store import Conversation, UnknownConversationError, conversation_store
+from .utils.pdf_extract import shutdown_pool as shutdown_pdf_pool
+from .rag_chunks import SearchHit
+from .context_assembler import RAG_CONTEXT_TOKEN_BUDGET_MAX
+from .rag_store import (
+    ensure_vector_store,
+    upload_blobs,
+    search_store,
+    start_vector_store_reaper,
+    stop_vector_store_reaper,
+)
 from .utils.tools import stored_intake_retrieval_tool
 from .intake_analysis import analyze_intake
-from openai import OpenAI
+from .analysis_jobs import analysis_input, analysis_queue
+from .analysis_cache import analysis_cache
+from .deadlines import DEADLINE_APPROACHING_DAYS, sweep_deadlines
+from .web_search import web_search_client
+from .intake_store import (
+    ANALYSIS_COMPLETED,
+    InvalidQueryError,
+    MAX_PAGE_SIZE,
+    insert_intake,
+    bulk_insert_intakes,
+    delete_intake as remove_intake,
+    get_intake,
+    iter_intake_pages,
+    list_intakes,
+    parse_fields,
+    stream_intakes,
+    transform_intake,
+    validate_form,
+)
+from .intake_export import EXPORT_FORMATS, encode_csv, encode_ndjson
 
 load_dotenv(".env")
 
 logger = logging.getLogger(__name__)
-client = OpenAI()
 
-app = FastAPI()
+# Retrieved chunks injected per chat turn (after hybrid fusion)
+RAG_MAX_RESULTS = int(os.environ.get("RAG_MAX_RESULTS", "6"))
+
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await db.open_pool()
+    await analysis_queue.start()
+    start_vector_store_reaper()
+    try:
+        yield
+    finally:
+        await stop_vector_store_reaper()
+        await analysis_queue.stop()
+        await db.close_pool()
+        shutdown_pdf_pool()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -31,6 +80,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -48,64 +98,59 @@ class Request(BaseModel):
 def _format_messages_for_agent(
     messages: List[ClientMessage],
     attachments: Optional[List[Dict[str, str]]] = None
-) -> List[Dict[str, str]]:
-    formatted: List[Dict[str, str]] = []
+) -> List[Dict[str, Any]]:
+    formatted: List[Dict[str, Any]] = []
 
     for i, message in enumerate(messages):
         content = message.content or ""
+        message_attachments: List[Dict[str, str]] = []
 
-        # Debug: Print all messages and their structure
-        print(f"DEBUG: Processing message {i}: role={message.role}, content='{content[:100]}...'")
-        print(f"DEBUG: Message has attachments: {bool(attachments)}")
-
-        # Attach extra info to the *last* user message
+        # Attach this turn's uploads to the *last* user message. They travel as
+        # structured attachments, never spliced into the text.
         if i == len(messages) - 1 and message.role == "user" and attachments:
-            print(f"DEBUG: Found {len(attachments)} attachments")
-            for j, attachment in enumerate(attachments):
-                print(f"DEBUG: Attachment {j}: {attachment}")
-                if "content" in attachment:
-                    # Inline content (old flow)
-                    content += (
-                        f"\n[File: {attachment['name']} ({attachment['type']}) - Content: {attachment['content']}]"
-                    )
-                    print(f"DEBUG: Added inline content for {attachment['name']}")
-                elif "url" in attachment:
-                    # Blob URL (new flow)
-                    content += (
-                        f"\n[File: {attachment['name']} ({attachment['type']}) - URL: {attachment['url']}]"
-                    )
-                    print(f"DEBUG: Added blob URL for {attachment['name']}: {attachment['url']}")
-                else:
-                    print(f"DEBUG: Attachment {j} has no content or url: {list(attachment.keys())}")
+            message_attachments.extend(a for a in attachments if "content" in a or "url" in a)
 
         # Handle experimental_attachments if present
         if getattr(message, "experimental_attachments", None):
-            print(f"DEBUG: Found experimental_attachments: {message.experimental_attachments}")
-            for attachment in message.experimental_attachments:
-                content += (
-                    f"\n[File: {attachment.name} ({attachment.contentType}) - URL: {attachment.url}]"
-                )
-                print(f"DEBUG: Added experimental attachment: {attachment.name}")
-
-        print(f"DEBUG: Final content for message {i}: '{content[:200]}...'")
+            message_attachments.extend(from_client_attachment(a) for a in message.experimental_attachments)
 
         formatted.append({
             "role": message.role,
             "content": content,
+            "attachments": message_attachments,
         })
 
     return formatted
 
 
+_TRUE_STRINGS = frozenset({"true", "1", "yes", "on"})
+_FALSE_STRINGS = frozenset({"false", "0", "no", "off"})
+
+
+def _parse_bool(value: Any) -> bool:
+    """JSON boolean, or an explicit true/false string ("false" and "0" are False); ValueError otherwise."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in _TRUE_STRINGS | _FALSE_STRINGS:
+        return value.strip().lower() in _TRUE_STRINGS
+    raise ValueError(f"expected a boolean, got {value!r}")
+
+
 def _stream_agent_response(
-    messages: List[ClientMessage],
+    messages: List[Dict[str, Any]],
     selected_chat_mode: str,
-    attachments: Optional[List[Dict[str, str]]] = None,
+    retrieved: Optional[List[SearchHit]] = None,
+    context_token_budget: Optional[int] = None,
+    conversation: Optional[Conversation] = None,
+    subagent_verbatim: Optional[bool] = None,
 ) -> AsyncIterator[str]:
-    orchestrator_messages = _format_messages_for_agent(messages, attachments)
     return stream_chat_py(
-        messages=orchestrator_messages,
+        messages=conversation.messages if conversation is not None else messages,
         selected_chat_mode=selected_chat_mode,
+        retrieved=retrieved,
+        context_token_budget=context_token_budget,
+        conversation=conversation,
+        subagent_verbatim=subagent_verbatim,
     )
 
 @app.post("/api/chat")
@@ -117,39 +162,81 @@ async def handle_chat_data(
     # attachments + chatId from the frontend
     attachments = None
     chat_id = "default"
+    history_mode = "full"
     if request.data:
         attachments = request.data.get("attachments")
         chat_id = request.data.get("chatId", "default")
+        history_mode = request.data.get("historyMode", "full")
+
+    # Per-request RAG context budget, capped server-side.
+    context_token_budget = None
+    if request.data and request.data.get("contextTokenBudget") is not None:
+        raw_budget = request.data["contextTokenBudget"]
+        try:
+            if isinstance(raw_budget, bool) or not isinstance(raw_budget, (int, str)):
+                raise ValueError
+            context_token_budget = int(raw_budget)
+        except ValueError:
+            return JSONResponse({"error": "contextTokenBudget must be a non-negative integer"}, status_code=400)
+        if context_token_budget < 0:
+            return JSONResponse({"error": "contextTokenBudget must be a non-negative integer"}, status_code=400)
+        context_token_budget = min(context_token_budget, RAG_CONTEXT_TOKEN_BUDGET_MAX)
+
+    # Per-request override of SUBAGENT_VERBATIM.
+    subagent_verbatim = None
+    if request.data and request.data.get("subagentVerbatim") is not None:
+        try:
+            subagent_verbatim = _parse_bool(request.data["subagentVerbatim"])
+        except ValueError as e:
+            return JSONResponse({"error": f"Invalid subagentVerbatim: {e}"}, status_code=400)
+
+    # 0) Server-side history: with an explicit chatId, conversions are memoized
+    # per chat and the client may send only the new messages.
+    formatted = _format_messages_for_agent(request.messages, attachments)
+    conversation: Optional[Conversation] = None
+    if request.data and request.data.get("chatId"):
+        if history_mode == "delta":
+            try:
+                conversation = conversation_store.extend(chat_id, formatted)
+            except UnknownConversationError:
+                return JSONResponse(
+                    {"error": "Unknown chatId on this server; resend the full message history"},
+                    status_code=409,
+                )
+        else:
+            conversation = conversation_store.replace(chat_id, formatted)
 
     # 1) RAG ingest (only if new attachments present)
-    vector_store_id = ensure_vector_store(chat_id)
+    vector_store_id = await ensure_vector_store(chat_id)
     if attachments:
-        upload_blobs(vector_store_id, attachments)
+        await upload_blobs(vector_store_id, attachments)
 
-    # 2) OPTIONAL: semantic search now, and inject into the last user message
+    # 2) Semantic search now; the orchestrator packs the hits into a
+    # token-budgeted [RETRIEVED CONTEXT] block once attachments are inlined.
     # Grab the last user message text
     last_user_text = ""
     for m in reversed(request.messages):
         if m.role == "user":
             last_user_text = m.content or ""
             break
+    retrieved: List[SearchHit] = []
     if last_user_text:
-        search_results = client.vector_stores.search(
-            vector_store_id=vector_store_id,
-            query=last_user_text,
-            rewrite_query=True
+        retrieved = await search_store(
+            vector_store_id,
+            last_user_text,
+            max_results=RAG_MAX_RESULTS,
         )
-        retrieved = format_results_for_prompt(search_results)
-        if retrieved:
-            # append a synthetic system/dev note with retrieved snippets
-            # (or append to the last user message—either is fine; I prefer a short system block)
-            request.messages.append(
-                ClientMessage(role="system", content=f"[RETRIEVED CONTEXT]\n{retrieved}")
-            )
-
     async def event_stream() -> AsyncIterator[str]:
-        async for chunk in _stream_agent_response(request.messages, chat_mode, attachments):
+        reply: List[str] = []
+        async for chunk in _stream_agent_response(
+            formatted, chat_mode, retrieved, context_token_budget, conversation, subagent_verbatim
+        ):
+            if conversation is not None and chunk.startswith("0:"):
+                reply.append(json.loads(chunk[2:]))
             yield chunk
+        # Delta clients do not send the assistant turn back, so keep it here.
+        if conversation is not None:
+            conversation_store.append_reply(chat_id, "".join(reply))
 
     response = StreamingResponse(event_stream())
     response.headers["x-vercel-ai-data-stream"] = "v1"
@@ -164,6 +251,8 @@ class IntakeAnalysisRequest(BaseModel):
     description: str
     location: Optional[str] = None
     incidentDate: Optional[str] = None
+    goals: Optional[str] = None
+    urgency: Optional[str] = None
 
 
 @app.post("/api/intakes/analyze")
@@ -171,18 +260,24 @@ async def analyze_intake_submission(request: IntakeAnalysisRequest):
     """
     Analyze an intake submission using AI to assess case strength,
     provide scoring, and recommend law firms.
+
+    `description` is the form's summary; the prompt payload is built with
+    the same `analysis_input` as stored intakes, so a preview and the later
+    submission of the same form share an analysis cache entry.
     """
     logger.info("📋 Intake analysis requested for matter type: %s", request.matterType)
     
-    intake_data = {
-        "name": request.name,
+    intake_data = analysis_input({
+        "fullName": request.name,
         "email": request.email,
         "phone": request.phone,
         "matterType": request.matterType,
-        "description": request.description,
-        "location": request.location,
+        "summary": request.description,
+        "goals": request.goals,
+        "urgency": request.urgency,
+        "jurisdiction": request.location,
         "incidentDate": request.incidentDate,
-    }
+    })
     
     # Run AI analysis (await the async function)
     analysis = await analyze_intake(intake_data)
@@ -195,14 +290,18 @@ async def analyze_intake_submission(request: IntakeAnalysisRequest):
     }
 
 
-# Database connection helper
-def get_db_connection():
-    """Get a database connection using the DATABASE_URL environment variable"""
-    import os
-    DATABASE_URL = os.environ.get("DATABASE_URL")
-    if not DATABASE_URL:
-        raise ValueError("DATABASE_URL environment variable not set")
-    return psycopg2.connect(DATABASE_URL)
+@app.get("/api/intakes/analysis-cache")
+async def get_analysis_cache_stats():
+    """Hit/miss metrics for the analyze_intake result cache."""
+    if analysis_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **analysis_cache.snapshot()}
+
+
+@app.get("/api/web-search/cache")
+async def get_web_search_cache_stats():
+    """Hit/miss metrics for the shared agent web-search cache."""
+    return web_search_client.snapshot()
 
 
 class IntakeCreateRequest(BaseModel):
@@ -211,172 +310,263 @@ class IntakeCreateRequest(BaseModel):
 
 
 @app.get("/api/intakes")
-async def get_intakes():
-    """Get all intakes from database"""
+async def get_intakes(
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated response fields, e.g. id,submittedAt,form,aiScore"),
+    matterType: Optional[str] = Query(None),
+    jurisdiction: Optional[str] = Query(None),
+    minScore: Optional[int] = Query(None, ge=0, le=100),
+    maxScore: Optional[int] = Query(None, ge=0, le=100),
+):
+    """
+    Get a page of intakes, newest first.
+
+    The cursor for the next page is returned in the `X-Next-Cursor` header
+    (absent on the last page) so the body stays a plain list.
+    """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        
-        cursor.execute('SELECT * FROM intakes ORDER BY "submittedAt" DESC')
-        intakes = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
-        
+        projection = parse_fields(fields)
+        intakes, next_cursor = await list_intakes(
+            limit=limit,
+            cursor=cursor,
+            fields=projection,
+            matter_type=matterType,
+            jurisdiction=jurisdiction,
+            min_score=minScore,
+            max_score=maxScore,
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+
         # Transform to match frontend expectations
-        transformed_intakes = []
-        for intake in intakes:
-            transformed = {
-                "id": intake["id"],
-                "submittedAt": intake["submittedAt"].isoformat() if intake.get("submittedAt") else None,
-                "shareWithMarketplace": intake.get("shareWithMarketplace", False),
-                "form": {
-                    "fullName": intake.get("fullName"),
-                    "email": intake.get("email"),
-                    "phone": intake.get("phone"),
-                    "jurisdiction": intake.get("jurisdiction"),
-                    "matterType": intake.get("matterType"),
-                    "summary": intake.get("summary"),
-                    "goals": intake.get("goals"),
-                    "urgency": intake.get("urgency"),
-                },
-                "aiSummary": intake.get("aiSummary"),
-                "aiScore": intake.get("aiScore"),
-                "aiScoreBreakdown": intake.get("aiScoreBreakdown"),
-                "aiReasoning": intake.get("aiReasoning"),
-                "aiWarnings": intake.get("aiWarnings"),
-                "recommendedFirms": intake.get("recommendedFirms"),
-                "applicableLaws": intake.get("applicableLaws"),
-            }
-            transformed_intakes.append(transformed)
-        
-        return transformed_intakes
-        
+        return [transform_intake(intake, projection) for intake in intakes]
+
+    except InvalidQueryError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
     except Exception as e:
         logger.error("Error fetching intakes: %s", str(e), exc_info=True)
         return {"error": "Failed to fetch intakes"}, 500
 
 
+@app.get("/api/intakes/export")
+async def export_intakes(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    fields: Optional[str] = Query(None),
+    matterType: Optional[str] = Query(None),
+    jurisdiction: Optional[str] = Query(None),
+    minScore: Optional[int] = Query(None, ge=0, le=100),
+    maxScore: Optional[int] = Query(None, ge=0, le=100),
+):
+    """
+    Stream every matching intake as NDJSON or CSV.
+
+    Rows are read from a server-side cursor in batches of EXPORT_BATCH_SIZE
+    (default 1000), so memory stays flat regardless of table size.
+    """
+    try:
+        projection = parse_fields(fields)
+    except InvalidQueryError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    batches = stream_intakes(
+        batch_size=int(os.environ.get("EXPORT_BATCH_SIZE", "1000")),
+        fields=projection,
+        matter_type=matterType,
+        jurisdiction=jurisdiction,
+        min_score=minScore,
+        max_score=maxScore,
+    )
+    encoder = encode_csv if format == "csv" else encode_ndjson
+
+    logger.info("📤 Intake export started | format=%s", format)
+    return StreamingResponse(
+        encoder(batches, projection),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="intakes.{format}"'},
+    )
+
+
+@app.get("/api/intakes/deadlines")
+async def get_intake_deadlines(
+    withinDays: int = Query(DEADLINE_APPROACHING_DAYS, ge=0, le=3650),
+    includeExpired: bool = Query(False),
+    matterType: Optional[str] = Query(None),
+    jurisdiction: Optional[str] = Query(None),
+):
+    """
+    Sweep stored intakes for limitation and filing deadlines due within
+    `withinDays` (rule-based, no model calls), most urgent first.
+
+    Intakes with an incident date are read in keyset pages, releasing the
+    pooled connection between pages.
+    """
+    flagged: List[Dict[str, Any]] = []
+    scanned = 0
+    try:
+        async for batch in iter_intake_pages(
+            fields=parse_fields("form"),
+            matter_type=matterType,
+            jurisdiction=jurisdiction,
+            with_incident_date=True,
+        ):
+            scanned += len(batch)
+            flagged.extend(sweep_deadlines(batch, within_days=withinDays, include_expired=includeExpired))
+    except Exception as e:
+        logger.error("Deadline sweep failed: %s", str(e), exc_info=True)
+        return JSONResponse({"error": "Failed to sweep deadlines"}, status_code=500)
+
+    flagged.sort(key=lambda item: item["nextDue"])
+    logger.info("⏰ Deadline sweep | scanned=%d flagged=%d within_days=%d", scanned, len(flagged), withinDays)
+    return {"scanned": scanned, "flagged": len(flagged), "withinDays": withinDays, "intakes": flagged}
+
+
 @app.post("/api/intakes")
 async def create_intake(request: IntakeCreateRequest):
-    """Create a new intake with AI analysis"""
+    """
+    Create a new intake and queue its AI analysis.
+
+    The row is stored immediately with analysisStatus "pending"; poll
+    GET /api/intakes/{id}/analysis for progress.
+    """
     try:
-        form = request.form
+        intake = await insert_intake(request.form, request.shareWithMarketplace)
+        analysis_queue.enqueue(intake["id"])
+        logger.info("📥 Intake %s stored, analysis queued (queue depth %d)", intake["id"], analysis_queue.depth)
+
+        return transform_intake(intake)
         
-        # Run AI analysis
-        analysis = None
+    except Exception as e:
+        logger.error("Error creating intake: %s", str(e), exc_info=True)
+        return {"error": "Failed to create intake"}, 500
+
+
+class TooManyRowsError(ValueError):
+    """Raised when a bulk body has more rows than BULK_MAX_ROWS."""
+
+
+async def _read_bulk_items(http_request: HttpRequest, max_rows: int) -> List[Any]:
+    """
+    Parse a bulk body: a JSON array, or NDJSON (one intake object per line).
+
+    NDJSON is parsed as it streams in and reading stops as soon as the body
+    goes past `max_rows`, so an oversized import is rejected without being
+    buffered.
+    """
+    content_type = http_request.headers.get("content-type", "")
+    if "ndjson" not in content_type:
+        body = await http_request.json()
+        if not isinstance(body, list):
+            raise ValueError("Expected a JSON array of intakes")
+        if len(body) > max_rows:
+            raise TooManyRowsError(f"Too many rows (max {max_rows})")
+        return body
+
+    items: List[Any] = []
+    buffer = b""
+    async for chunk in http_request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        items.extend(json.loads(line) for line in lines if line.strip())
+        if len(items) > max_rows:
+            raise TooManyRowsError(f"Too many rows (max {max_rows})")
+    if buffer.strip():
+        items.append(json.loads(buffer))
+    if len(items) > max_rows:
+        raise TooManyRowsError(f"Too many rows (max {max_rows})")
+    return items
+
+
+@app.post("/api/intakes/bulk")
+async def create_intakes_bulk(http_request: HttpRequest):
+    """
+    Create many intakes at once (partner marketplace imports).
+
+    Accepts a JSON array or an `application/x-ndjson` stream of
+    `{"shareWithMarketplace": bool, "form": {...}}` objects. Valid rows are
+    inserted with a single COPY in one transaction and their analyses are
+    queued on the shared bounded worker pool. Returns one result per input
+    row; inserted rows have status "pending", like analysisStatus.
+    """
+    max_rows = int(os.environ.get("BULK_MAX_ROWS", "5000"))
+    try:
+        items = await _read_bulk_items(http_request, max_rows)
+    except TooManyRowsError as e:
+        return JSONResponse({"error": str(e)}, status_code=413)
+    except ValueError as e:
+        return JSONResponse({"error": f"Invalid body: {e}"}, status_code=400)
+
+    results: List[Dict[str, Any]] = [{"index": i} for i in range(len(items))]
+    valid: List[Any] = []
+    valid_indexes: List[int] = []
+    for i, item in enumerate(items):
         try:
-            logger.info("Running AI analysis for intake...")
-            analysis = await analyze_intake({
-                "name": form.get("fullName"),
-                "email": form.get("email"),
-                "phone": form.get("phone"),
-                "matterType": form.get("matterType"),
-                "description": f"{form.get('summary', '')}\n\nGoals: {form.get('goals', '')}\n\nUrgency: {form.get('urgency', '')}",
-                "location": form.get("jurisdiction"),
-                "incidentDate": None,
-            })
-            logger.info("AI analysis completed, score: %s", analysis.get("score") if analysis else "N/A")
-        except Exception as e:
-            logger.error("AI analysis failed: %s", str(e), exc_info=True)
-        
-        # Insert into database
-        conn = get_db_connection()
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        
-        # Generate ID before insert
-        intake_id = cuid()
-        
-        cursor.execute('''
-            INSERT INTO intakes (
-                id, "shareWithMarketplace", "fullName", email, phone, jurisdiction, 
-                "matterType", summary, goals, urgency,
-                "submittedAt", "createdAt", "updatedAt",
-                "aiSummary", "aiScore", "aiScoreBreakdown", "aiReasoning",
-                "aiWarnings", "recommendedFirms", "applicableLaws"
-            ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW(), NOW(), %s, %s, %s, %s, %s, %s, %s
-            ) RETURNING *
-        ''', (
-            intake_id,
-            request.shareWithMarketplace,
-            form.get("fullName"),
-            form.get("email"),
-            form.get("phone"),
-            form.get("jurisdiction"),
-            form.get("matterType"),
-            form.get("summary"),
-            form.get("goals"),
-            form.get("urgency"),
-            analysis.get("summary") if analysis else None,
-            analysis.get("score") if analysis else None,
-            psycopg2.extras.Json(analysis.get("scoreBreakdown")) if analysis and analysis.get("scoreBreakdown") else None,
-            analysis.get("reasoning") if analysis else None,
-            psycopg2.extras.Json(analysis.get("warnings")) if analysis and analysis.get("warnings") else None,
-            psycopg2.extras.Json(analysis.get("recommendedFirms")) if analysis and analysis.get("recommendedFirms") else None,
-            psycopg2.extras.Json(analysis.get("applicableLaws")) if analysis and analysis.get("applicableLaws") else None,
-        ))
-        
-        intake = cursor.fetchone()
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
-        # Transform response
-        transformed = {
+            parsed = IntakeCreateRequest.model_validate(item)
+        except ValidationError as e:
+            results[i].update(status="invalid", error=str(e))
+            continue
+        error = validate_form(parsed.form)
+        if error:
+            results[i].update(status="invalid", error=error)
+            continue
+        valid.append((parsed.form, parsed.shareWithMarketplace))
+        valid_indexes.append(i)
+
+    try:
+        ids = await bulk_insert_intakes(valid) if valid else []
+    except Exception as e:
+        logger.error("Bulk intake insert failed: %s", str(e), exc_info=True)
+        return JSONResponse({"error": "Failed to insert intakes"}, status_code=500)
+
+    analysis_queue.enqueue_many(ids)
+    for i, intake_id in zip(valid_indexes, ids):
+        results[i].update(id=intake_id, status="pending")
+
+    logger.info(
+        "📦 Bulk intake import | received=%d inserted=%d queue_depth=%d",
+        len(items), len(ids), analysis_queue.depth,
+    )
+    return {
+        "inserted": len(ids),
+        "invalid": len(items) - len(ids),
+        "results": results,
+    }
+
+
+@app.get("/api/intakes/{intake_id}/analysis")
+async def get_intake_analysis_status(intake_id: str):
+    """Poll the analysis status of an intake; includes the result once completed."""
+    try:
+        intake = await get_intake(intake_id)
+        if intake is None:
+            return JSONResponse({"error": "Intake not found"}, status_code=404)
+
+        status = {
             "id": intake["id"],
-            "submittedAt": intake["submittedAt"].isoformat() if intake.get("submittedAt") else None,
-            "shareWithMarketplace": intake.get("shareWithMarketplace", False),
-            "form": {
-                "fullName": intake.get("fullName"),
-                "email": intake.get("email"),
-                "phone": intake.get("phone"),
-                "jurisdiction": intake.get("jurisdiction"),
-                "matterType": intake.get("matterType"),
-                "summary": intake.get("summary"),
-                "goals": intake.get("goals"),
-                "urgency": intake.get("urgency"),
-            },
-            "aiSummary": intake.get("aiSummary"),
-            "aiScore": intake.get("aiScore"),
-            "aiScoreBreakdown": intake.get("aiScoreBreakdown"),
-            "aiReasoning": intake.get("aiReasoning"),
-            "aiWarnings": intake.get("aiWarnings"),
-            "recommendedFirms": intake.get("recommendedFirms"),
-            "applicableLaws": intake.get("applicableLaws"),
+            "status": intake.get("analysisStatus"),
+            "attempts": intake.get("analysisAttempts", 0),
+            "error": intake.get("analysisError"),
+            "updatedAt": intake["analysisUpdatedAt"].isoformat() if intake.get("analysisUpdatedAt") else None,
         }
-        
-        return transformed
-        
+        if status["status"] == ANALYSIS_COMPLETED:
+            status["intake"] = transform_intake(intake)
+        return status
+
     except Exception as e:
-        logger.error("Error creating intake: %s", str(e), exc_info=True)
-        return {"error": "Failed to create intake"}, 500
+        logger.error("Error fetching analysis status: %s", str(e), exc_info=True)
+        return JSONResponse({"error": "Failed to fetch analysis status"}, status_code=500)
 
 
 @app.delete("/api/intakes")
 async def delete_intake(id: str = Query(...)):
     """Delete an intake by ID"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check if exists
-        cursor.execute('SELECT id FROM intakes WHERE id = %s', (id,))
-        if not cursor.fetchone():
-            cursor.close()
-            conn.close()
+        if not await remove_intake(id):
             return {"error": "Intake not found"}, 404
-        
-        # Delete
-        cursor.execute('DELETE FROM intakes WHERE id = %s', (id,))
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
+
         return {"success": True}
         
     except Exception as e:
         logger.error("Error deleting intake: %s", str(e), exc_info=True)
         return {"error": "Failed to delete intake"}, 500
-
-
@@ -3,10 +3,18 @@ AI-powered intake analysis using OpenAI Agents SDK.
 Provides standardized case strength scoring, assessment, and firm recommendations.
 """
 
+import json
 import logging
-from typing import Dict, Any, List, Optional
+import re
+from datetime import date
+from typing import Dict, Any
 from dotenv import load_dotenv
-from agents import Agent, Runner, WebSearchTool
+from agents import Runner
+
+from .analysis_cache import analysis_cache
+from .chat_agents.registry import agent_registry
+from .deadlines import compute_deadlines, format_deadlines
+from .knowledge_pack import format_entry, knowledge_pack
 
 load_dotenv()
 
@@ -16,6 +24,9 @@ logger = logging.getLogger(__name__)
 async def analyze_intake(intake_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Analyze an intake submission using AI to assess case strength and recommend firms.
+
+    Results are served from `analysis_cache` when an identical intake (same
+    prompt fields) was analysed recently; see `api/analysis_cache.py`.
     
     Args:
         intake_data: Dictionary containing:
@@ -36,7 +47,13 @@ async def analyze_intake(intake_data: Dict[str, Any]) -> Dict[str, Any]:
             - recommendedFirms: List of potential law firms
             - warnings: List of time-sensitive issues (SOL, deadlines)
     """
-    
+    if analysis_cache is None:
+        return await _run_intake_analysis(intake_data)
+    return await analysis_cache.get_or_compute(intake_data, _run_intake_analysis)
+
+
+async def _run_intake_analysis(intake_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Run the intake-analyst agent (uncached)."""
     logger.info("=" * 80)
     logger.info("🔍 INTAKE ANALYSIS STARTED")
     logger.info("Matter Type: %s | Location: %s", 
@@ -44,6 +61,28 @@ async def analyze_intake(intake_data: Dict[str, Any]) -> Dict[str, Any]:
                 intake_data.get("location", "unknown"))
     logger.info("=" * 80)
     
+    # Statutes come from the knowledge pack and deadlines from the rule engine,
+    # so the agent only researches what neither covers.
+    knowledge = knowledge_pack.lookup(intake_data.get("location"), intake_data.get("matterType"))
+    knowledge_section = (
+        "PRECOMPUTED LEGAL KNOWLEDGE (verified statutes; web search only for gaps):\n"
+        f"{format_entry(knowledge, include_deadlines=False)}\n"
+        if knowledge else ""
+    )
+    deadlines = compute_deadlines(intake_data.get("incidentDate"), intake_data.get("location"), intake_data.get("matterType"))
+    deadline_section = (
+        f"COMPUTED DEADLINES (as of {date.today().isoformat()}; dates run from the incident date - use them as given):\n"
+        f"{format_deadlines(deadlines)}\n"
+        if deadlines else ""
+    )
+    if knowledge and not knowledge.get("covered"):
+        # Only federal rules were found; the state limitations period is still unknown.
+        deadline_section += (
+            "STATE DEADLINES NOT COVERED: the deadlines above are federal only. Research the state statute of "
+            "limitations and any state agency filing or notice deadline for this jurisdiction with web search, "
+            "and report them with citations.\n"
+        )
+
     # Build analysis prompt from intake data
     analysis_prompt = f"""
 Analyze this legal intake submission and provide a standardized assessment:
@@ -57,6 +96,8 @@ CLIENT INFORMATION:
 CASE DESCRIPTION:
 {intake_data.get('description', 'No description provided')}
 
+{knowledge_section}
+{deadline_section}
 INSTRUCTIONS:
 Provide a comprehensive legal case assessment with the following structure:
 
@@ -80,7 +121,8 @@ Provide a comprehensive legal case assessment with the following structure:
    - Missing information that would strengthen analysis
 
 4. TIME-SENSITIVE WARNINGS
-   - Statute of limitations deadlines with specific dates if possible
+   - Statute of limitations deadlines: copy the dates from COMPUTED DEADLINES (do not recalculate);
+     only research deadlines it does not list
    - Filing deadlines or notice requirements
    - Evidence preservation urgency
 
@@ -91,7 +133,7 @@ Provide a comprehensive legal case assessment with the following structure:
    - Cite sources (state bar associations, legal directories)
 
 CRITICAL REQUIREMENTS:
-- Use web search to find actual current statutes, deadlines, and real law firms
+- Start from the precomputed legal knowledge above; use web search for statutes or deadlines it does not cover and to find real law firms
 - Cite all legal sources with jurisdiction
 - Be specific about score criteria - show your math
 - Only recommend real, verifiable law firms with contact information
@@ -134,63 +176,7 @@ FORMAT YOUR RESPONSE AS JSON:
 }}
 """
 
-    # Create specialized intake analysis agent
-    instructions = """
-You are a legal intake analysis specialist. Your role is to:
-
-1. Assess case strength using standardized scoring criteria
-2. Research applicable laws and statutes via web search
-3. Identify time-sensitive deadlines and risks
-4. Recommend appropriate law firms in the client's jurisdiction
-
-SCORING METHODOLOGY:
-- Legal Merit (0-30): How strong are the legal claims?
-  * 25-30: Clear violation, strong precedent, favorable jurisdiction
-  * 15-24: Plausible claims, some precedent, mixed authority
-  * 5-14: Weak claims, unfavorable precedent, unclear law
-  * 0-4: Frivolous or barred by law
-
-- Evidence Quality (0-20): How good is the evidence?
-  * 16-20: Documentary evidence, multiple witnesses, clear documentation
-  * 10-15: Some evidence, potential witnesses, partial documentation
-  * 5-9: Mostly testimonial, limited corroboration
-  * 0-4: Little to no evidence mentioned
-
-- Damages Potential (0-25): How significant are the damages?
-  * 20-25: Severe injury/harm, quantifiable losses >$100k, emotional distress
-  * 12-19: Moderate harm, losses $20k-$100k
-  * 6-11: Minor harm, losses <$20k
-  * 0-5: Minimal or no damages
-
-- Procedural Viability (0-15): Can this case proceed?
-  * 12-15: Well within SOL, proper jurisdiction, no procedural barriers
-  * 7-11: Close to deadlines, some jurisdictional questions
-  * 3-6: Near SOL expiration, jurisdictional issues
-  * 0-2: SOL expired or fatal procedural defects
-
-- Likelihood of Success (0-10): Overall probability
-  * 8-10: Strong case, high probability of favorable outcome
-  * 5-7: Moderate case, uncertain outcome
-  * 2-4: Weak case, low probability
-  * 0-1: Very unlikely to succeed
-
-RESEARCH REQUIREMENTS:
-- ALWAYS use web search to verify statutes, deadlines, and firm recommendations
-- Cite specific statute numbers and sections
-- Calculate actual SOL deadlines based on incident date
-- Only recommend real law firms with verifiable websites
-
-TONE: Professional, objective, balanced. Acknowledge uncertainty where it exists.
-
-OUTPUT: Always return valid JSON matching the requested structure.
-"""
-
-    agent = Agent(
-        name="intake-analyst",
-        model="gpt-4.1",
-        instructions=instructions,
-        tools=[WebSearchTool()],
-    )
+    agent = agent_registry.get("intake_analyst")
 
     try:
         # Run the agent
@@ -198,52 +184,22 @@ OUTPUT: Always return valid JSON matching the requested structure.
         run_result = await Runner.run(starting_agent=agent, input=analysis_prompt)
         logger.info("✅ Intake analysis completed")
         
-        # Extract text from RunResult object
-        # Log what we got to help debug
-        logger.info("RunResult type: %s", type(run_result))
-        logger.info("RunResult attributes: %s", dir(run_result))
-        
-        # Try different ways to extract the result
-        result_text = ""
-        
-        # Method 1: Check if it's just a string (non-async version)
-        if isinstance(run_result, str):
-            result_text = run_result
-        # Method 2: Try .content attribute
-        elif hasattr(run_result, 'content'):
-            result_text = run_result.content
-        # Method 3: Try .messages attribute
-        elif hasattr(run_result, 'messages') and run_result.messages:
-            for msg in reversed(run_result.messages):
-                if hasattr(msg, 'get') and msg.get('role') == 'assistant':
-                    result_text = msg.get('content', '')
-                    break
-                elif hasattr(msg, 'role') and msg.role == 'assistant':
-                    result_text = msg.content if hasattr(msg, 'content') else str(msg)
-                    break
-        # Method 4: Just convert to string
-        else:
-            result_text = str(run_result)
-        
+        result_text = str(run_result.final_output or "")
         logger.info("Extracted result text length: %d", len(result_text))
         logger.debug("Raw result text (first 500 chars): %s", result_text[:500])
-        
-        # Try to parse as JSON, fall back to structured parsing if needed
-        import json
-        import re
 
         # Extract JSON from markdown code blocks if present
         json_match = re.search(r'```(?:json)?\s*(\{.*\})\s*```', result_text, re.DOTALL)
-        if json_match:
-            json_str = json_match.group(1)
-        else:
-            json_str = result_text
+        json_str = json_match.group(1) if json_match else result_text
 
         try:
             analysis = json.loads(json_str)
-        except json.JSONDecodeError:
-            logger.warning("Failed to parse JSON response, using fallback structure")
-            # Fallback structure
+            if not isinstance(analysis, dict):
+                raise ValueError("analysis is not a JSON object")
+        except ValueError as e:
+            logger.warning("Failed to parse JSON response, using fallback structure: %s", e)
+            # Fallback structure. It carries "error" so it is neither cached nor
+            # saved as a completed analysis (the queue retries it instead).
             analysis = {
                 "summary": "Analysis completed. See full reasoning for details.",
                 "score": 50,
@@ -258,7 +214,8 @@ OUTPUT: Always return valid JSON matching the requested structure.
                 "reasoning": result_text,
                 "warnings": [],
                 "recommendedFirms": [],
-                "applicableLaws": []
+                "applicableLaws": [],
+                "error": f"Unparseable analysis response: {e}",
             }
         
         logger.info("📊 Analysis Score: %d/100", analysis.get("score", 0))
@@ -0,0 +1,73 @@
+"""
+Bulk intake export encoders (NDJSON / CSV).
+
+Both encoders consume the batched rows from `intake_store.stream_intakes` and
+emit one chunk per batch, applying the same `transform_intake` shape as
+GET /api/intakes so exports and the API never disagree.
+"""
+
+import csv
+import json
+from io import StringIO
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from .intake_store import FIELD_COLUMNS, transform_intake
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _csv_header(fields: Optional[List[str]]) -> List[str]:
+    header: List[str] = []
+    for field in fields or FIELD_COLUMNS:
+        if field == "form":
+            header.extend(FIELD_COLUMNS["form"])
+        else:
+            header.append(field)
+    return header
+
+
+def _csv_row(intake: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten the nested `form` object and JSON-encode structured columns."""
+    row: Dict[str, Any] = {}
+    for key, value in intake.items():
+        if key == "form":
+            row.update(value)
+        elif isinstance(value, (dict, list)):
+            row[key] = json.dumps(value, ensure_ascii=False)
+        else:
+            row[key] = value
+    return row
+
+
+async def encode_ndjson(
+    batches: AsyncIterator[List[Dict[str, Any]]],
+    fields: Optional[List[str]] = None,
+) -> AsyncIterator[str]:
+    async for rows in batches:
+        yield "".join(
+            json.dumps(transform_intake(row, fields), ensure_ascii=False, default=str) + "\n"
+            for row in rows
+        )
+
+
+async def encode_csv(
+    batches: AsyncIterator[List[Dict[str, Any]]],
+    fields: Optional[List[str]] = None,
+) -> AsyncIterator[str]:
+    buffer = StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=_csv_header(fields), extrasaction="ignore")
+    writer.writeheader()
+
+    async for rows in batches:
+        for row in rows:
+            writer.writerow(_csv_row(transform_intake(row, fields)))
+        yield buffer.getvalue()
+        # Reuse the buffer so memory stays bounded by one batch.
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,448 @@
+"""
+Intake persistence helpers.
+
+All queries go through the shared async pool in `api/db.py`; handlers in
+`api/index.py` and the agent tools in `api/utils/tools.py` call these instead
+of opening their own connections.
+"""
+
+import base64
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from cuid import cuid
+from psycopg import sql
+from psycopg.types.json import Jsonb
+
+from .db import connection
+from .deadlines import parse_date
+
+logger = logging.getLogger(__name__)
+
+
+FORM_COLUMNS = ["fullName", "email", "phone", "jurisdiction", "matterType", "summary", "goals", "urgency"]
+# Nullable form columns; validate_form does not require them.
+OPTIONAL_FORM_COLUMNS = ["incidentDate"]
+
+# Response field -> columns it needs. `fields=` projections are expressed in
+# response field names so list views can skip the heavy text/JSON columns.
+FIELD_COLUMNS: Dict[str, List[str]] = {
+    "id": ["id"],
+    "submittedAt": ["submittedAt"],
+    "shareWithMarketplace": ["shareWithMarketplace"],
+    "form": FORM_COLUMNS + OPTIONAL_FORM_COLUMNS,
+    "aiSummary": ["aiSummary"],
+    "aiScore": ["aiScore"],
+    "aiScoreBreakdown": ["aiScoreBreakdown"],
+    "aiReasoning": ["aiReasoning"],
+    "aiWarnings": ["aiWarnings"],
+    "recommendedFirms": ["recommendedFirms"],
+    "applicableLaws": ["applicableLaws"],
+    "analysisStatus": ["analysisStatus"],
+}
+
+# Always selected: needed to build the keyset cursor.
+_KEY_FIELDS = ("id", "submittedAt")
+
+MAX_PAGE_SIZE = 500
+
+# intakes."analysisStatus" values
+ANALYSIS_PENDING = "pending"
+ANALYSIS_RUNNING = "running"
+ANALYSIS_COMPLETED = "completed"
+ANALYSIS_FAILED = "failed"
+
+
+class InvalidQueryError(ValueError):
+    """Raised for malformed pagination cursors or unknown projection fields."""
+
+
+def _json_or_none(value: Any) -> Optional[Jsonb]:
+    return Jsonb(value) if value else None
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated `fields=` value. None means every field."""
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in FIELD_COLUMNS]
+    if unknown:
+        raise InvalidQueryError(f"Unknown fields: {', '.join(unknown)}")
+    return list(_KEY_FIELDS) + [f for f in requested if f not in _KEY_FIELDS]
+
+
+def encode_cursor(intake: Dict[str, Any]) -> str:
+    """Opaque keyset cursor pointing just after `intake` in (submittedAt, id) DESC order."""
+    raw = json.dumps([intake["submittedAt"].isoformat(), intake["id"]])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        submitted_at, intake_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(submitted_at), str(intake_id)
+    except Exception as e:
+        raise InvalidQueryError("Invalid cursor") from e
+
+
+def transform_intake(intake: Dict[str, Any], fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Reshape a raw `intakes` row into the structure the frontend expects.
+
+    Args:
+        intake: Row from the `intakes` table (dict_row)
+        fields: Optional response fields to keep (see FIELD_COLUMNS)
+    """
+    if fields is not None:
+        full = transform_intake({**{c: None for f in fields for c in FIELD_COLUMNS[f]}, **intake})
+        return {f: full[f] for f in fields}
+
+    return {
+        "id": intake["id"],
+        "submittedAt": intake["submittedAt"].isoformat() if intake.get("submittedAt") else None,
+        "shareWithMarketplace": intake.get("shareWithMarketplace", False),
+        "form": {
+            "fullName": intake.get("fullName"),
+            "email": intake.get("email"),
+            "phone": intake.get("phone"),
+            "jurisdiction": intake.get("jurisdiction"),
+            "matterType": intake.get("matterType"),
+            "summary": intake.get("summary"),
+            "goals": intake.get("goals"),
+            "urgency": intake.get("urgency"),
+            "incidentDate": intake["incidentDate"].isoformat() if intake.get("incidentDate") else None,
+        },
+        "aiSummary": intake.get("aiSummary"),
+        "aiScore": intake.get("aiScore"),
+        "aiScoreBreakdown": intake.get("aiScoreBreakdown"),
+        "aiReasoning": intake.get("aiReasoning"),
+        "aiWarnings": intake.get("aiWarnings"),
+        "recommendedFirms": intake.get("recommendedFirms"),
+        "applicableLaws": intake.get("applicableLaws"),
+        "analysisStatus": intake.get("analysisStatus"),
+    }
+
+
+def _select_columns(fields: Optional[List[str]]) -> sql.Composable:
+    if fields is None:
+        return sql.SQL("*")
+    names = dict.fromkeys(c for f in fields for c in FIELD_COLUMNS[f])
+    return sql.SQL(", ").join(sql.Identifier(c) for c in names)
+
+
+def _build_filters(
+    cursor: Optional[str] = None,
+    matter_type: Optional[str] = None,
+    jurisdiction: Optional[str] = None,
+    min_score: Optional[int] = None,
+    max_score: Optional[int] = None,
+    with_incident_date: bool = False,
+) -> Tuple[sql.Composable, List[Any]]:
+    """Build the WHERE clause (or an empty fragment) shared by listing and export."""
+    conditions: List[sql.Composable] = []
+    params: List[Any] = []
+    if cursor:
+        conditions.append(sql.SQL('("submittedAt", id) < (%s, %s)'))
+        params.extend(decode_cursor(cursor))
+    if matter_type:
+        conditions.append(sql.SQL('"matterType" = %s'))
+        params.append(matter_type)
+    if jurisdiction:
+        conditions.append(sql.SQL("jurisdiction = %s"))
+        params.append(jurisdiction)
+    if min_score is not None:
+        conditions.append(sql.SQL('"aiScore" >= %s'))
+        params.append(min_score)
+    if max_score is not None:
+        conditions.append(sql.SQL('"aiScore" <= %s'))
+        params.append(max_score)
+    if with_incident_date:
+        conditions.append(sql.SQL('"incidentDate" IS NOT NULL'))
+
+    if not conditions:
+        return sql.SQL(""), params
+    return sql.SQL(" WHERE ") + sql.SQL(" AND ").join(conditions), params
+
+
+async def list_intakes(
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    matter_type: Optional[str] = None,
+    jurisdiction: Optional[str] = None,
+    min_score: Optional[int] = None,
+    max_score: Optional[int] = None,
+    with_incident_date: bool = False,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Keyset-paginated intake listing, newest first.
+
+    Args:
+        limit: Page size (capped at MAX_PAGE_SIZE)
+        cursor: Value returned as `next_cursor` by the previous page
+        fields: Response fields to select (None selects every column)
+        matter_type: Exact "matterType" filter
+        jurisdiction: Exact jurisdiction filter
+        min_score / max_score: Inclusive "aiScore" range
+        with_incident_date: Only intakes with an "incidentDate"
+
+    Returns:
+        (raw rows, next_cursor) - next_cursor is None on the last page.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    columns = _select_columns(fields)
+    where, params = _build_filters(
+        cursor=cursor,
+        matter_type=matter_type,
+        jurisdiction=jurisdiction,
+        min_score=min_score,
+        max_score=max_score,
+        with_incident_date=with_incident_date,
+    )
+    query = sql.SQL('SELECT {columns} FROM intakes{where} ORDER BY "submittedAt" DESC, id DESC LIMIT %s').format(
+        columns=columns, where=where,
+    )
+    # Fetch one extra row to learn whether another page exists.
+    params.append(limit + 1)
+
+    async with connection() as conn:
+        result = await conn.execute(query, params)
+        rows = await result.fetchall()
+
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+async def iter_intake_pages(page_size: int = MAX_PAGE_SIZE, **filters: Any) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yield every matching intake in keyset pages (see `list_intakes` for filters).
+
+    Unlike `stream_intakes`, a pooled connection is held only while each page
+    is fetched, so a slow consumer never ties up a pool slot.
+    """
+    cursor: Optional[str] = None
+    while True:
+        rows, cursor = await list_intakes(limit=page_size, cursor=cursor, **filters)
+        if rows:
+            yield rows
+        if cursor is None:
+            return
+
+
+async def stream_intakes(
+    batch_size: int = 1000,
+    fields: Optional[List[str]] = None,
+    matter_type: Optional[str] = None,
+    jurisdiction: Optional[str] = None,
+    min_score: Optional[int] = None,
+    max_score: Optional[int] = None,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yield intake rows in fixed-size batches from a named server-side cursor.
+
+    Only one batch is held in memory at a time, so exports of any size run
+    in constant memory. The pooled connection is held until iteration ends.
+    """
+    columns = _select_columns(fields)
+    where, params = _build_filters(
+        matter_type=matter_type,
+        jurisdiction=jurisdiction,
+        min_score=min_score,
+        max_score=max_score,
+    )
+    query = sql.SQL('SELECT {columns} FROM intakes{where} ORDER BY "submittedAt" DESC, id DESC').format(
+        columns=columns, where=where,
+    )
+
+    async with connection() as conn:
+        # Named cursors live inside the transaction the pooled connection opens.
+        async with conn.cursor(name="intakes_export") as cur:
+            cur.itersize = batch_size
+            await cur.execute(query, params)
+            while True:
+                rows = await cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+
+
+async def insert_intake(
+    form: Dict[str, Any],
+    share_with_marketplace: bool,
+    analysis: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Insert one intake and return the stored row.
+
+    Without `analysis` the row is stored with analysisStatus "pending" and the
+    caller is expected to queue it (see `api/analysis_jobs.py`).
+    """
+    intake_id = cuid()
+    status = ANALYSIS_COMPLETED if analysis else ANALYSIS_PENDING
+    analysis = analysis or {}
+
+    async with connection() as conn:
+        cursor = await conn.execute('''
+            INSERT INTO intakes (
+                id, "shareWithMarketplace", "fullName", email, phone, jurisdiction,
+                "matterType", summary, goals, urgency, "incidentDate",
+                "submittedAt", "createdAt", "updatedAt",
+                "aiSummary", "aiScore", "aiScoreBreakdown", "aiReasoning",
+                "aiWarnings", "recommendedFirms", "applicableLaws", "analysisStatus"
+            ) VALUES (
+                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW(), NOW(), %s, %s, %s, %s, %s, %s, %s, %s
+            ) RETURNING *
+        ''', (
+            intake_id,
+            share_with_marketplace,
+            form.get("fullName"),
+            form.get("email"),
+            form.get("phone"),
+            form.get("jurisdiction"),
+            form.get("matterType"),
+            form.get("summary"),
+            form.get("goals"),
+            form.get("urgency"),
+            parse_date(form.get("incidentDate")),
+            analysis.get("summary"),
+            analysis.get("score"),
+            _json_or_none(analysis.get("scoreBreakdown")),
+            analysis.get("reasoning"),
+            _json_or_none(analysis.get("warnings")),
+            _json_or_none(analysis.get("recommendedFirms")),
+            _json_or_none(analysis.get("applicableLaws")),
+            status,
+        ))
+        return await cursor.fetchone()
+
+
+def validate_form(form: Dict[str, Any]) -> Optional[str]:
+    """Return an error message if a form is missing a NOT NULL column, else None."""
+    missing = [c for c in FORM_COLUMNS if form.get(c) is None]
+    if missing:
+        return f"Missing required fields: {', '.join(missing)}"
+    if form.get("incidentDate") and parse_date(form["incidentDate"]) is None:
+        return "Invalid incidentDate (expected YYYY-MM-DD)"
+    return None
+
+
+async def bulk_insert_intakes(rows: List[Tuple[Dict[str, Any], bool]]) -> List[str]:
+    """
+    Insert many (form, shareWithMarketplace) pairs with a single COPY in one
+    transaction. Every row starts with analysisStatus "pending".
+
+    Returns:
+        Generated intake ids, in input order.
+    """
+    ids = [cuid() for _ in rows]
+    # Prisma stores timestamps as naive UTC.
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    async with connection() as conn:
+        async with conn.cursor() as cur:
+            async with cur.copy('''
+                COPY intakes (
+                    id, "shareWithMarketplace", "fullName", email, phone, jurisdiction,
+                    "matterType", summary, goals, urgency, "incidentDate",
+                    "submittedAt", "createdAt", "updatedAt", "analysisStatus"
+                ) FROM STDIN
+            ''') as copy:
+                for intake_id, (form, share_with_marketplace) in zip(ids, rows):
+                    await copy.write_row((
+                        intake_id,
+                        share_with_marketplace,
+                        *(form.get(c) for c in FORM_COLUMNS),
+                        parse_date(form.get("incidentDate")),
+                        now, now, now,
+                        ANALYSIS_PENDING,
+                    ))
+
+    logger.info("📦 Bulk inserted %d intake(s)", len(ids))
+    return ids
+
+
+async def get_intake(intake_id: str) -> Optional[Dict[str, Any]]:
+    async with connection() as conn:
+        cursor = await conn.execute('SELECT * FROM intakes WHERE id = %s', (intake_id,))
+        return await cursor.fetchone()
+
+
+async def claim_analysis(intake_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Atomically move a pending intake to "running" and return it.
+
+    Returns None if another worker (or process) already claimed it.
+    """
+    async with connection() as conn:
+        cursor = await conn.execute('''
+            UPDATE intakes
+            SET "analysisStatus" = %s, "analysisAttempts" = "analysisAttempts" + 1,
+                "analysisUpdatedAt" = NOW(), "updatedAt" = NOW()
+            WHERE id = %s AND "analysisStatus" = %s
+            RETURNING *
+        ''', (ANALYSIS_RUNNING, intake_id, ANALYSIS_PENDING))
+        return await cursor.fetchone()
+
+
+async def save_analysis(intake_id: str, analysis: Dict[str, Any]) -> None:
+    """Write a finished analysis into the ai* columns."""
+    async with connection() as conn:
+        await conn.execute('''
+            UPDATE intakes
+            SET "aiSummary" = %s, "aiScore" = %s, "aiScoreBreakdown" = %s, "aiReasoning" = %s,
+                "aiWarnings" = %s, "recommendedFirms" = %s, "applicableLaws" = %s,
+                "analysisStatus" = %s, "analysisError" = NULL,
+                "analysisUpdatedAt" = NOW(), "updatedAt" = NOW()
+            WHERE id = %s
+        ''', (
+            analysis.get("summary"),
+            analysis.get("score"),
+            _json_or_none(analysis.get("scoreBreakdown")),
+            analysis.get("reasoning"),
+            _json_or_none(analysis.get("warnings")),
+            _json_or_none(analysis.get("recommendedFirms")),
+            _json_or_none(analysis.get("applicableLaws")),
+            ANALYSIS_COMPLETED,
+            intake_id,
+        ))
+
+
+async def release_analysis(intake_id: str, error: str, final: bool) -> None:
+    """Record a failed attempt: back to "pending" for a retry, or "failed" when out of attempts."""
+    status = ANALYSIS_FAILED if final else ANALYSIS_PENDING
+    async with connection() as conn:
+        await conn.execute('''
+            UPDATE intakes
+            SET "analysisStatus" = %s, "analysisError" = %s,
+                "analysisUpdatedAt" = NOW(), "updatedAt" = NOW()
+            WHERE id = %s
+        ''', (status, error, intake_id))
+
+
+async def fetch_unfinished_analysis_ids(stale_after_seconds: int) -> List[str]:
+    """
+    Ids that still need analysis: pending rows, plus "running" rows whose
+    worker has not reported back within `stale_after_seconds` (crashed process).
+    """
+    async with connection() as conn:
+        await conn.execute('''
+            UPDATE intakes SET "analysisStatus" = %s
+            WHERE "analysisStatus" = %s
+              AND "analysisUpdatedAt" < NOW() - make_interval(secs => %s)
+        ''', (ANALYSIS_PENDING, ANALYSIS_RUNNING, stale_after_seconds))
+        cursor = await conn.execute(
+            'SELECT id FROM intakes WHERE "analysisStatus" = %s ORDER BY "submittedAt"',
+            (ANALYSIS_PENDING,),
+        )
+        return [row["id"] for row in await cursor.fetchall()]
+
+
+async def delete_intake(intake_id: str) -> bool:
+    """Delete an intake by id. Returns False if it did not exist."""
+    async with connection() as conn:
+        cursor = await conn.execute('DELETE FROM intakes WHERE id = %s RETURNING id', (intake_id,))
+        return await cursor.fetchone() is not None
@@ -0,0 +1,64 @@
+"""
+US jurisdiction normalization.
+
+Intake locations and search queries name jurisdictions loosely ("San Diego,
+CA", "california", "N.Y."). Caches and lookups keyed by jurisdiction use the
+two-letter USPS code, or "US" for federal law.
+"""
+
+import re
+from typing import Optional
+
+FEDERAL = "US"
+
+US_STATES = {
+    "alabama": "AL", "alaska": "AK", "arizona": "AZ", "arkansas": "AR", "california": "CA",
+    "colorado": "CO", "connecticut": "CT", "delaware": "DE", "district of columbia": "DC",
+    "florida": "FL", "georgia": "GA", "hawaii": "HI", "idaho": "ID", "illinois": "IL",
+    "indiana": "IN", "iowa": "IA", "kansas": "KS", "kentucky": "KY", "louisiana": "LA",
+    "maine": "ME", "maryland": "MD", "massachusetts": "MA", "michigan": "MI", "minnesota": "MN",
+    "mississippi": "MS", "missouri": "MO", "montana": "MT", "nebraska": "NE", "nevada": "NV",
+    "new hampshire": "NH", "new jersey": "NJ", "new mexico": "NM", "new york": "NY",
+    "north carolina": "NC", "north dakota": "ND", "ohio": "OH", "oklahoma": "OK", "oregon": "OR",
+    "pennsylvania": "PA", "rhode island": "RI", "south carolina": "SC", "south dakota": "SD",
+    "tennessee": "TN", "texas": "TX", "utah": "UT", "vermont": "VT", "virginia": "VA",
+    "washington": "WA", "west virginia": "WV", "wisconsin": "WI", "wyoming": "WY",
+}
+STATE_CODES = frozenset(US_STATES.values())
+
+# Checked before state names: "Washington, D.C." is not Washington state.
+DC_RE = re.compile(r"\b(district of columbia|washington,?\s+d\.?\s?c\b\.?|d\.c\.)")
+_FEDERAL_RE = re.compile(r"\b(federal|u\.?s\.?c\.?|united states|nationwide|eeoc|flsa|title vii)\b")
+# Longest names first so "west virginia" wins over "virginia".
+_STATE_NAME_RE = re.compile(r"\b(" + "|".join(sorted(map(re.escape, US_STATES), key=len, reverse=True)) + r")\b")
+# Codes only as a standalone uppercase token, e.g. "Austin, TX" - "in"/"or"/"me" are words.
+_STATE_CODE_RE = re.compile(r"(?:^|[\s,(])(" + "|".join(sorted(STATE_CODES)) + r")(?=$|[\s,.)\d])")
+
+
+def normalize_jurisdiction(value: Optional[str]) -> Optional[str]:
+    """
+    Two-letter state code (or "US" for federal) named in `value`, if any.
+
+    Args:
+        value: A location, jurisdiction name or free text
+
+    Returns:
+        "CA", "NY", ..., "US", or None when no jurisdiction is recognized
+    """
+    if not value:
+        return None
+    text = value.strip()
+    if text.upper().replace(".", "") in STATE_CODES | {FEDERAL}:
+        return text.upper().replace(".", "")
+    lowered = text.lower()
+    if DC_RE.search(lowered):
+        return "DC"
+    match = _STATE_NAME_RE.search(lowered)
+    if match:
+        return US_STATES[match.group(1)]
+    match = _STATE_CODE_RE.search(text)
+    if match:
+        return match.group(1)
+    if _FEDERAL_RE.search(lowered):
+        return FEDERAL
+    return None
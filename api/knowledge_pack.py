@@ -0,0 +1,289 @@
+"""
+Jurisdiction x matter-type legal knowledge pack.
+
+`api/knowledge/pack.json` holds, per (jurisdiction, matter type), the
+applicable statutes, limitation periods, agency filing and notice deadlines
+(with citations), practice notes and any cached research attached by the
+builder. Agents look it up with the `legal_knowledge_lookup` tool before
+falling back to web search, and `analyze_intake` puts the entry for the
+intake into its prompt, so common research is not repeated per run.
+
+A lookup returns the state entry merged with the federal ("US") entry for the
+same matter type; state deadlines replace federal ones with the same id (e.g.
+the 300-day EEOC charge period in states with a fair-employment agency).
+Jurisdictions the pack does not cover fall back to the federal entry alone.
+
+The file is re-read when it changes on disk. `version` is a hash of its
+entries, stamped by the builder:
+
+    python -m api.knowledge_pack build [--research FILE] [--from-db]
+
+which attaches research from the shared web-search cache (the
+`web_search_cache` table with --from-db, or a JSON export with --research)
+to the matching entries, without making any search calls.
+
+Configuration (environment variables):
+    KNOWLEDGE_PACK_PATH           Pack file (default: api/knowledge/pack.json)
+    KNOWLEDGE_PACK_MAX_RESEARCH   Research items kept per entry by the builder (default 5)
+"""
+
+import argparse
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from agents import function_tool
+
+from .chat_agents.router import detect_matter_type
+from .jurisdictions import FEDERAL, normalize_jurisdiction
+
+logger = logging.getLogger(__name__)
+
+KNOWLEDGE_PACK_PATH = os.environ.get(
+    "KNOWLEDGE_PACK_PATH", os.path.join(os.path.dirname(__file__), "knowledge", "pack.json")
+)
+KNOWLEDGE_PACK_MAX_RESEARCH = int(os.environ.get("KNOWLEDGE_PACK_MAX_RESEARCH", "5"))
+
+# Characters of a cached search answer kept in a research item.
+RESEARCH_SUMMARY_CHARS = 800
+
+
+def _merge(state: Optional[Dict[str, Any]], federal: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    base = copy.deepcopy(state or federal)
+    if state is None or federal is None:
+        return base
+    state_ids = {d.get("id") for d in state.get("deadlines", [])}
+    base["deadlines"] = state.get("deadlines", []) + [
+        d for d in federal.get("deadlines", []) if d.get("id") not in state_ids
+    ]
+    for field in ("statutes", "notes", "research"):
+        base[field] = state.get(field, []) + federal.get(field, [])
+    seen = set()
+    base["sources"] = []
+    for source in state.get("sources", []) + federal.get("sources", []):
+        if source.get("url") not in seen:
+            seen.add(source.get("url"))
+            base["sources"].append(source)
+    return base
+
+
+class KnowledgePack:
+    """Indexed, reload-on-change view of the pack file."""
+
+    def __init__(self, path: str = KNOWLEDGE_PACK_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._index: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._mtime: Optional[float] = None
+        # Matter types with at least one state entry; the rest are federal-only areas.
+        self._state_matters: frozenset = frozenset()
+        self.version = ""
+
+    def refresh(self) -> None:
+        """Re-read the pack file if it changed on disk."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    pack = json.load(f)
+            except (OSError, ValueError) as e:
+                # Keep serving the last good pack if a rebuild is mid-write.
+                logger.error("❌ Knowledge pack load failed: %s", e)
+                return
+            self._index = {
+                (entry["jurisdiction"], entry["matterType"]): entry for entry in pack.get("entries", [])
+            }
+            self._state_matters = frozenset(matter for code, matter in self._index if code != FEDERAL)
+            self._mtime, self.version = mtime, pack.get("version", "")
+        logger.info("📚 Knowledge pack loaded | entries=%d version=%s", len(self._index), self.version)
+
+    def lookup(self, jurisdiction: Optional[str], matter_type: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Pack entry for a jurisdiction and matter type.
+
+        Args:
+            jurisdiction: State name/code, location text or "federal"
+            matter_type: One of the `MatterType` values
+
+        Returns:
+            State entry merged with the federal entry, or None when neither exists
+        """
+        self.refresh()
+        matter = (matter_type or "").strip().lower()
+        code = normalize_jurisdiction(jurisdiction)
+        state = self._index.get((code, matter)) if code and code != FEDERAL else None
+        federal = self._index.get((FEDERAL, matter))
+        if state is None and federal is None:
+            return None
+        entry = _merge(state, federal)
+        entry["jurisdiction"] = code or FEDERAL
+        entry["covered"] = state is not None or code == FEDERAL or matter not in self._state_matters
+        return entry
+
+
+def format_period(period: Dict[str, int]) -> str:
+    parts = []
+    for unit in ("years", "months", "days"):
+        value = period.get(unit)
+        if value:
+            parts.append(f"{value} {unit[:-1] if value == 1 else unit}")
+    return " ".join(parts)
+
+
+def format_entry(entry: Dict[str, Any], include_deadlines: bool = True) -> str:
+    """Pack entry as plain text for a tool result or prompt (deadlines omitted when computed separately)."""
+    lines = [f"Jurisdiction: {entry['jurisdiction']} | Matter type: {entry['matterType']}"]
+    if not entry.get("covered"):
+        lines.append("(No state-specific entry; federal rules only - verify state law with web search.)")
+    if entry.get("statutes"):
+        lines.append("Applicable law:")
+        lines.extend(f"- {s['name']} ({s['citation']})" for s in entry["statutes"])
+    if include_deadlines and entry.get("deadlines"):
+        lines.append("Deadlines:")
+        for d in entry["deadlines"]:
+            detail = f"- {d['label']}: {format_period(d['period'])} from {d['trigger'].replace('_', ' ')} ({d['citation']})"
+            if d.get("condition"):
+                detail += f" [if {d['condition']}]"
+            if d.get("note"):
+                detail += f" - {d['note']}"
+            lines.append(detail)
+    if entry.get("notes"):
+        lines.append("Notes:")
+        lines.extend(f"- {note}" for note in entry["notes"])
+    for item in entry.get("research", []):
+        lines.append(f"Cached research ({item['query']}): {item['summary']}")
+    if entry.get("sources"):
+        lines.append("Sources:")
+        lines.extend(f"- {s.get('title') or s['url']}: {s['url']}" for s in entry["sources"])
+    return "\n".join(lines)
+
+
+knowledge_pack = KnowledgePack()
+
+
+@function_tool
+def legal_knowledge_lookup(jurisdiction: str, matter_type: str) -> str:
+    """
+    Look up precomputed statutes, statutes of limitation, agency filing and
+    notice deadlines (with citations) for a jurisdiction and matter type.
+    Check this before searching the web.
+
+    Args:
+        jurisdiction: US state name or two-letter code (or "federal")
+        matter_type: One of "employment", "personal injury", "mass tort/class action", "family law", "immigration law"
+
+    Returns:
+        The knowledge pack entry as text, or a note that nothing is stored
+    """
+    logger.info("🔧 TOOL: legal_knowledge_lookup | jurisdiction=%s matter_type=%s", jurisdiction, matter_type)
+    entry = knowledge_pack.lookup(jurisdiction, matter_type)
+    if entry is None:
+        return f"No stored knowledge for {jurisdiction} / {matter_type}; use web search."
+    return format_entry(entry)
+
+
+# ----- Builder -----
+
+def build_pack(pack: Dict[str, Any], research: Iterable[Dict[str, Any]], max_research: int = KNOWLEDGE_PACK_MAX_RESEARCH) -> Dict[str, Any]:
+    """
+    Attach cached research to pack entries and stamp a new version.
+
+    Args:
+        pack: Current pack (curated entries are kept as-is)
+        research: Cached searches, each {"jurisdiction", "query", "result": {"answer", "sources"}}
+            plus "originalQuery" (the search as issued) when known; the matter
+            type is detected from it, since `query` is the normalized cache key text
+        max_research: Research items kept per entry
+
+    Returns:
+        The rebuilt pack
+    """
+    entries = {(e["jurisdiction"], e["matterType"]): dict(e, research=[]) for e in pack.get("entries", [])}
+    for item in research:
+        query = item.get("originalQuery") or item.get("query") or ""
+        result = item.get("result") or {}
+        code = normalize_jurisdiction(item.get("jurisdiction")) or normalize_jurisdiction(query)
+        matter = detect_matter_type(query.lower())
+        answer = str(result.get("answer") or "").strip()
+        if not code or not matter or not answer:
+            continue
+        entry = entries.setdefault(
+            (code, matter),
+            {"jurisdiction": code, "matterType": matter, "statutes": [], "deadlines": [], "notes": [], "sources": [], "research": []},
+        )
+        if len(entry["research"]) >= max_research or any(r["query"] == query for r in entry["research"]):
+            continue
+        sources = [s for s in result.get("sources") or [] if s.get("url")]
+        entry["research"].append({"query": query, "summary": answer[:RESEARCH_SUMMARY_CHARS], "sources": sources})
+        known = {s.get("url") for s in entry["sources"]}
+        entry["sources"] = entry["sources"] + [s for s in sources if s["url"] not in known]
+
+    ordered = sorted(entries.values(), key=lambda e: (e["jurisdiction"] != FEDERAL, e["jurisdiction"], e["matterType"]))
+    for entry in ordered:
+        if not entry["research"]:
+            entry.pop("research")
+    raw = json.dumps(ordered, sort_keys=True, ensure_ascii=False)
+    return {
+        "version": hashlib.sha256(raw.encode("utf-8")).hexdigest()[:12],
+        "builtAt": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "entries": ordered,
+    }
+
+
+async def _research_from_db() -> List[Dict[str, Any]]:
+    from . import db
+
+    await db.open_pool()
+    try:
+        async with db.connection() as conn:
+            cursor = await conn.execute(
+                'SELECT jurisdiction, query, "originalQuery", result FROM web_search_cache '
+                'WHERE "expiresAt" > NOW() ORDER BY "createdAt" DESC'
+            )
+            return list(await cursor.fetchall())
+    finally:
+        await db.close_pool()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the legal knowledge pack from cached research.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Attach cached research and stamp a new version")
+    build.add_argument("--research", help="JSON list of {jurisdiction, query, originalQuery?, result} cached searches")
+    build.add_argument("--from-db", action="store_true", help="Read research from the web_search_cache table")
+    build.add_argument("--output", default=KNOWLEDGE_PACK_PATH, help="Where to write the pack")
+    args = parser.parse_args(argv)
+
+    with open(KNOWLEDGE_PACK_PATH, encoding="utf-8") as f:
+        pack = json.load(f)
+    research: List[Dict[str, Any]] = []
+    if args.research:
+        with open(args.research, encoding="utf-8") as f:
+            research.extend(json.load(f))
+    if args.from_db:
+        research.extend(asyncio.run(_research_from_db()))
+
+    rebuilt = build_pack(pack, research)
+    tmp_path = f"{args.output}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(rebuilt, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp_path, args.output)
+    print(f"Wrote {args.output}: {len(rebuilt['entries'])} entries, version {rebuilt['version']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+Local vector index backend for RAG (RAG_BACKEND=local).
+
+Each chat gets a directory under RAG_LOCAL_DIR holding:
+    vectors.f32   row-major float32 matrix of L2-normalized chunk embeddings
+    chunks.jsonl  one metadata record per row (filename, text, source url, sha256)
+    meta.json     {"dim": ..., "count": ...}
+    index.lock    flock(2) target serializing appends across processes
+
+The matrix is memory-mapped for search, so a query is one embedding call plus
+a vectorized dot product - no remote vector store round-trip. Several
+workers may share a directory: appends hold an exclusive flock on index.lock
+and re-read meta.json first, and searches re-read it (under a shared lock)
+so rows appended by other processes are mapped.
+
+Configuration (environment variables):
+    RAG_LOCAL_DIR         Index root (default .rag_index)
+    RAG_EMBEDDER          openai | hashing (default openai; hashing is a
+                          deterministic offline stand-in for tests)
+    RAG_EMBEDDING_MODEL   OpenAI embedding model (default text-embedding-3-small)
+    RAG_CHUNK_CHARS       Target chunk size in characters (default 1200)
+    RAG_CHUNK_OVERLAP     Overlap between consecutive chunks (default 200)
+    RAG_UPLOAD_CONCURRENCY  Files fetched and embedded at once per ingest (default 4)
+"""
+
+import asyncio
+import contextlib
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+from openai import AsyncOpenAI
+
+from .rag_chunks import RAG_LOCAL_DIR, ChunkLog, SearchHit, chunk_records, extract_text, store_dir
+from .rag_store import RAG_UPLOAD_CONCURRENCY, _http
+
+logger = logging.getLogger(__name__)
+
+Embedder = Callable[[List[str]], Awaitable[np.ndarray]]
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+# ---------------------------------------------------------------------------
+# Embedders
+# ---------------------------------------------------------------------------
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def hashing_embedder(dim: int = 384) -> Embedder:
+    """
+    Deterministic bag-of-words feature-hashing embedder.
+
+    No network and stable across processes, so retrieval can be exercised
+    offline. Quality is lexical only - use it for tests, not production.
+    """
+    async def embed(texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in _TOKEN_RE.findall(text.lower()):
+                h = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+                matrix[row, h % dim] += 1.0 if (h >> 63) & 1 else -1.0
+        return _normalize_rows(matrix)
+
+    return embed
+
+
+def openai_embedder(model: str = "text-embedding-3-small", batch_size: int = 128) -> Embedder:
+    client = AsyncOpenAI()
+
+    async def embed(texts: List[str]) -> np.ndarray:
+        rows: List[List[float]] = []
+        for start in range(0, len(texts), batch_size):
+            response = await client.embeddings.create(model=model, input=texts[start:start + batch_size])
+            rows.extend(item.embedding for item in response.data)
+        return _normalize_rows(np.asarray(rows, dtype=np.float32))
+
+    return embed
+
+
+def embedder_from_env() -> Embedder:
+    if os.environ.get("RAG_EMBEDDER", "openai").lower() == "hashing":
+        return hashing_embedder()
+    return openai_embedder(os.environ.get("RAG_EMBEDDING_MODEL", "text-embedding-3-small"))
+
+
+# ---------------------------------------------------------------------------
+# Per-chat index
+# ---------------------------------------------------------------------------
+
+class LocalIndex:
+    """Append-only embedding matrix + chunk metadata for one chat."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.log = ChunkLog(path)
+        self._meta_path = os.path.join(path, "meta.json")
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._lock_path = os.path.join(path, "index.lock")
+        self._matrix: Optional[np.ndarray] = None
+        self.lock = asyncio.Lock()
+
+        self.meta = {"dim": 0, "count": 0}
+        self.refresh()
+
+    @contextlib.contextmanager
+    def _file_lock(self, mode: int) -> Iterator[None]:
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_meta(self) -> None:
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path) as f:
+            meta = json.load(f)
+        if meta != self.meta:
+            # Another process appended; remap with the new row count.
+            self.meta, self._matrix = meta, None
+
+    def refresh(self) -> None:
+        """Pick up rows appended by other processes since the last read."""
+        with self._file_lock(fcntl.LOCK_SH):
+            self._read_meta()
+
+    @property
+    def chunks(self) -> List[Dict[str, Any]]:
+        return self.log.records
+
+    @property
+    def matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            self.refresh()
+            count, dim = self.meta["count"], self.meta["dim"]
+            if count == 0:
+                return np.zeros((0, dim or 1), dtype=np.float32)
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(count, dim))
+        return self._matrix
+
+    def ingested(self) -> Dict[str, set]:
+        return {
+            "urls": {c["url"] for c in self.chunks if c.get("url")},
+            "hashes": {c["sha256"] for c in self.chunks if c.get("sha256")},
+        }
+
+    def append(self, vectors: np.ndarray, records: List[Dict[str, Any]]) -> None:
+        if not records:
+            return
+        dim = vectors.shape[1]
+        with self._file_lock(fcntl.LOCK_EX):
+            # Count from the file, not our copy: another process may have appended.
+            self._read_meta()
+            if self.meta["dim"] and self.meta["dim"] != dim:
+                raise ValueError(f"Embedding dim {dim} does not match index dim {self.meta['dim']}")
+
+            # Drop the mapping before growing the file underneath it.
+            self._matrix = None
+            with open(self._vectors_path, "ab") as f:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            self.log.append(records)
+            self.meta = {"dim": dim, "count": self.meta["count"] + len(records)}
+            tmp_path = f"{self._meta_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.meta, f)
+            os.replace(tmp_path, self._meta_path)
+
+    def top_k(self, query_vector: np.ndarray, k: int) -> List[SearchHit]:
+        matrix = self.matrix
+        if matrix.shape[0] == 0:
+            return []
+        scores = matrix @ query_vector
+        k = min(k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            SearchHit(
+                filename=self.chunks[i].get("filename", "unknown"),
+                score=float(scores[i]),
+                text=self.chunks[i]["text"],
+                chunk_id=self.chunks[i].get("id"),
+            )
+            for i in top
+        ]
+
+
+class LocalVectorIndexBackend:
+    """RAG backend keeping embeddings on local disk (memory-mapped NumPy)."""
+
+    name = "local"
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        embedder: Optional[Embedder] = None,
+        chunk_chars: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+    ):
+        self.root = root or RAG_LOCAL_DIR
+        self.embed = embedder or embedder_from_env()
+        self.chunk_chars = chunk_chars or int(os.environ.get("RAG_CHUNK_CHARS", "1200"))
+        self.chunk_overlap = chunk_overlap or int(os.environ.get("RAG_CHUNK_OVERLAP", "200"))
+        self._indexes: Dict[str, LocalIndex] = {}
+
+    def _index(self, store_id: str) -> LocalIndex:
+        index = self._indexes.get(store_id)
+        if index is None:
+            index = LocalIndex(store_dir(store_id, self.root))
+            self._indexes[store_id] = index
+        return index
+
+    def chunk_log(self, store_id: str) -> ChunkLog:
+        return self._index(store_id).log
+
+    async def ensure_store(self, chat_id: str, name_prefix: str = "uploads-demo") -> str:
+        # Directory-safe, collision-resistant id for the chat.
+        safe = re.sub(r"[^A-Za-z0-9_-]", "_", chat_id)[:64]
+        store_id = f"{safe}-{hashlib.sha256(chat_id.encode()).hexdigest()[:8]}"
+        self._index(store_id)
+        return store_id
+
+    async def add_text(
+        self,
+        store_id: str,
+        text: str,
+        filename: str,
+        url: Optional[str] = None,
+        sha256: Optional[str] = None,
+    ) -> int:
+        """Chunk, embed and append a document's text. Returns the number of chunks added."""
+        records = chunk_records(text, filename, url, sha256, self.chunk_chars, self.chunk_overlap)
+        if not records:
+            return 0
+        vectors = await self.embed([r["text"] for r in records])
+        index = self._index(store_id)
+        async with index.lock:
+            await asyncio.to_thread(index.append, vectors, records)
+        return len(records)
+
+    async def _ingest_one(self, store_id: str, url: str, name: str, known: Dict[str, set], media_type: Optional[str]) -> Optional[str]:
+        http = await _http()
+        resp = await http.get(url)
+        resp.raise_for_status()
+        digest = hashlib.sha256(resp.content).hexdigest()
+        if digest in known["hashes"]:
+            known["urls"].add(url)
+            return None
+        # Claim the hash before awaiting so a concurrent duplicate is skipped.
+        known["hashes"].add(digest)
+        try:
+            text = await asyncio.to_thread(extract_text, resp.content, name, media_type)
+            if not await self.add_text(store_id, text, name, url=url, sha256=digest):
+                known["hashes"].discard(digest)
+                return None
+        except Exception:
+            known["hashes"].discard(digest)
+            raise
+        known["urls"].add(url)
+        return digest
+
+    async def ingest(self, store_id: str, attachments: Iterable[Dict[str, Any]]) -> List[str]:
+        """Fetch, embed and index new attachments, at most RAG_UPLOAD_CONCURRENCY at a time."""
+        index = self._index(store_id)
+        known = index.ingested()
+
+        pending: Dict[str, Dict[str, Any]] = {}
+        for a in attachments:
+            url = a.get("url")
+            if url and url not in known["urls"]:
+                pending.setdefault(url, a)
+        if not pending:
+            return []
+
+        semaphore = asyncio.Semaphore(RAG_UPLOAD_CONCURRENCY)
+
+        async def bounded(url: str, a: Dict[str, Any]) -> Optional[str]:
+            async with semaphore:
+                return await self._ingest_one(store_id, url, a.get("name") or "file", known, a.get("type"))
+
+        results = await asyncio.gather(
+            *(bounded(url, a) for url, a in pending.items()),
+            return_exceptions=True,
+        )
+
+        added: List[str] = []
+        for (url, a), result in zip(pending.items(), results):
+            if isinstance(result, Exception):
+                logger.error("Failed to index %s (%s) locally: %s", a.get("name") or "file", url, result)
+            elif result:
+                added.append(result)
+        return added
+
+    async def search(self, store_id: str, query: str, max_results: int = 5, rewrite: bool = True) -> List[SearchHit]:
+        index = self._index(store_id)
+        await asyncio.to_thread(index.refresh)
+        if index.meta["count"] == 0:
+            return []
+        query_vector = (await self.embed([query]))[0]
+        return index.top_k(query_vector, max_results)
@@ -0,0 +1,130 @@
+"""
+Shared chunk plumbing for the RAG backends.
+
+Both backends record the text chunks they ingest in a per-store chunk log
+(`<RAG_LOCAL_DIR>/<store_id>/chunks.jsonl`). The local vector index keeps its
+embedding rows aligned with this log, and the BM25 retriever builds its
+inverted index from it, so lexical search works whichever backend is active.
+"""
+
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Any, Dict, List, Optional
+
+from pypdf import PdfReader
+
+RAG_LOCAL_DIR = os.environ.get("RAG_LOCAL_DIR", ".rag_index")
+
+
+@dataclass
+class SearchHit:
+    """One retrieved chunk, independent of the backend that produced it."""
+    filename: str
+    score: float
+    text: str
+    chunk_id: Optional[str] = None
+
+
+def store_dir(store_id: str, root: Optional[str] = None) -> str:
+    return os.path.join(root or RAG_LOCAL_DIR, store_id)
+
+
+def extract_text(content: bytes, name: str, media_type: Optional[str] = None) -> str:
+    """Plain text from an attachment's bytes (PDF via pypdf, otherwise UTF-8)."""
+    if media_type == "application/pdf" or name.lower().endswith(".pdf"):
+        reader = PdfReader(BytesIO(content))
+        return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+    return content.decode("utf-8", errors="replace")
+
+
+def chunk_text(text: str, size: int = 1200, overlap: int = 200) -> List[str]:
+    """
+    Split text into ~`size`-character chunks, preferring paragraph and
+    sentence boundaries, with about `overlap` characters carried between chunks.
+    """
+    text = re.sub(r"[ \t]+", " ", text).strip()
+    if not text:
+        return []
+
+    chunks: List[str] = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            window = text[start:end]
+            # Back off to the last paragraph or sentence break in the back half.
+            cut = max(window.rfind("\n\n"), window.rfind(". "), window.rfind("\n"))
+            if cut > size // 2:
+                end = start + cut + 1
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        # Start the overlap on a word boundary so chunks never open mid-word.
+        next_start = max(end - overlap, start + 1)
+        space = text.find(" ", next_start, end)
+        start = space + 1 if space != -1 else next_start
+    return chunks
+
+
+def chunk_records(
+    text: str,
+    filename: str,
+    url: Optional[str] = None,
+    sha256: Optional[str] = None,
+    size: int = 1200,
+    overlap: int = 200,
+) -> List[Dict[str, Any]]:
+    return [
+        {"id": f"{sha256 or filename}:{n}", "filename": filename, "text": chunk, "url": url, "sha256": sha256}
+        for n, chunk in enumerate(chunk_text(text, size, overlap))
+    ]
+
+
+class ChunkLog:
+    """
+    Append-only JSONL of chunk records for one store.
+
+    Readers and writers run on the event loop and in worker threads at the
+    same time; `_lock` makes each catch-up (read, extend, offset move) and
+    each append atomic, so no tail is ever consumed twice and record i stays
+    aligned with embedding row / BM25 document i.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        self.path = os.path.join(path, "chunks.jsonl")
+        self._records: List[Dict[str, Any]] = []
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def _catch_up(self) -> None:
+        if os.path.exists(self.path) and os.path.getsize(self.path) > self._offset:
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                tail = f.read()
+            # Only consume complete lines; a concurrent writer may be mid-line.
+            complete = tail[: tail.rfind(b"\n") + 1]
+            self._records.extend(json.loads(line) for line in complete.splitlines() if line.strip())
+            self._offset += len(complete)
+
+    @property
+    def records(self) -> List[Dict[str, Any]]:
+        """All records, picking up lines appended by other processes since the last read."""
+        with self._lock:
+            self._catch_up()
+            return self._records
+
+    def append(self, records: List[Dict[str, Any]]) -> None:
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+        with self._lock:
+            self._catch_up()  # first, so our own rows are not read back twice
+            with open(self.path, "ab") as f:
+                f.write(data)
+            self._records.extend(records)
+            self._offset += len(data)
@@ -1,73 +1,497 @@
 # api/rag_store.py
 from typing import Iterable, Dict, Any, List, Optional
-from io import BytesIO
-import requests
-from openai import OpenAI
+from collections import OrderedDict
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import httpx
+from openai import AsyncOpenAI, NotFoundError
 from dotenv import load_dotenv
 
+from . import db
+from .bm25 import BM25Index, reciprocal_rank_fusion
+from .rag_chunks import ChunkLog, SearchHit, chunk_records, extract_text, store_dir
+
 load_dotenv() 
 
-client = OpenAI()
+logger = logging.getLogger(__name__)
+
+async_client = AsyncOpenAI()
+
+# chat_id -> vector_store_id mapping.
+# Persisted in the `chat_vector_stores` table so every worker (and restart)
+# reuses the same remote store; this LRU only saves the DB round-trip.
+VECTOR_STORE_CACHE_SIZE = int(os.environ.get("VECTOR_STORE_CACHE_SIZE", "1024"))
+VECTOR_STORE_IDLE_TTL_SECONDS = int(os.environ.get("VECTOR_STORE_IDLE_TTL_SECONDS", str(7 * 24 * 3600)))
+# How often a cache hit refreshes "lastUsedAt" in the DB.
+VECTOR_STORE_TOUCH_INTERVAL_SECONDS = int(os.environ.get("VECTOR_STORE_TOUCH_INTERVAL_SECONDS", "300"))
+VECTOR_STORE_REAP_INTERVAL_SECONDS = int(os.environ.get("VECTOR_STORE_REAP_INTERVAL_SECONDS", "3600"))
+
+# chat_id -> (vector_store_id, last DB touch)
+_VECTOR_STORES: "OrderedDict[str, tuple[str, float]]" = OrderedDict()
+_reaper_task: Optional[asyncio.Task] = None
+
+RAG_UPLOAD_CONCURRENCY = int(os.environ.get("RAG_UPLOAD_CONCURRENCY", "4"))
+
+# vector_store_id -> {"urls": {...}, "hashes": {...}} of ingested files
+_INGESTED: Dict[str, Dict[str, set]] = {}
+_INGESTED_LOCKS: Dict[str, asyncio.Lock] = {}
+_http_client: Optional[httpx.AsyncClient] = None
+
+# Hybrid retrieval: BM25 over the chunk log fused with the vector backend.
+RAG_HYBRID = os.environ.get("RAG_HYBRID", "1") != "0"
+# Candidates each retriever contributes before fusion.
+RAG_FUSION_CANDIDATES = int(os.environ.get("RAG_FUSION_CANDIDATES", "20"))
+RAG_CHUNK_CHARS = int(os.environ.get("RAG_CHUNK_CHARS", "1200"))
+RAG_CHUNK_OVERLAP = int(os.environ.get("RAG_CHUNK_OVERLAP", "200"))
+
+# store_id -> BM25 index built incrementally from the store's chunk log
+_LEXICAL: Dict[str, BM25Index] = {}
+# store_id -> chunk log (one per store, so its read offset survives between searches)
+_CHUNK_LOGS: Dict[str, ChunkLog] = {}
+
+
+def _chunk_log(store_id: str) -> ChunkLog:
+    log = _CHUNK_LOGS.get(store_id)
+    if log is None:
+        log = _CHUNK_LOGS.setdefault(store_id, ChunkLog(store_dir(store_id)))
+    return log
+
+
+def _cache_put(chat_id: str, vector_store_id: str, touched_at: float) -> None:
+    _VECTOR_STORES[chat_id] = (vector_store_id, touched_at)
+    _VECTOR_STORES.move_to_end(chat_id)
+    while len(_VECTOR_STORES) > VECTOR_STORE_CACHE_SIZE:
+        _VECTOR_STORES.popitem(last=False)
+
 
-# naive in-memory cache; swap for Redis/DB in prod
-_VECTOR_STORES: Dict[str, str] = {}
+async def _delete_remote_store(vector_store_id: str) -> None:
+    _INGESTED.pop(vector_store_id, None)
+    _INGESTED_LOCKS.pop(vector_store_id, None)
+    _LEXICAL.pop(vector_store_id, None)
+    _CHUNK_LOGS.pop(vector_store_id, None)
+    try:
+        await async_client.vector_stores.delete(vector_store_id)
+    except NotFoundError:
+        pass  # already expired remotely
+    except Exception as e:
+        logger.warning("Failed to delete vector store %s: %s", vector_store_id, e)
 
-def ensure_vector_store(chat_id: str, name_prefix: str = "uploads-demo") -> str:
-    """Return an existing vector_store_id for this chat, or create one."""
-    if chat_id in _VECTOR_STORES:
-        return _VECTOR_STORES[chat_id]
-    vs = client.vector_stores.create(name=f"{name_prefix}:{chat_id}")
-    _VECTOR_STORES[chat_id] = vs.id
+
+async def _create_remote_store(chat_id: str, name_prefix: str) -> str:
+    vs = await async_client.vector_stores.create(
+        name=f"{name_prefix}:{chat_id}",
+        # Let OpenAI expire abandoned stores even if the reaper never runs.
+        expires_after={"anchor": "last_active_at", "days": max(1, VECTOR_STORE_IDLE_TTL_SECONDS // 86400)},
+    )
+    logger.info("🗂️  Created vector store %s for chat %s", vs.id, chat_id)
     return vs.id
 
-def upload_blobs(vector_store_id: str, attachments: Iterable[Dict[str, Any]]) -> List[str]:
-    """Upload any blob URLs in attachments to the vector store. Returns file_ids."""
-    file_ids: List[str] = []
-    for a in attachments:
-        url = a.get("url")
-        name = a.get("name") or "file"
-        if not url:
-            continue
-        # fetch from Vercel Blob
-        resp = requests.get(url, timeout=60)
-        resp.raise_for_status()
-        bio = BytesIO(resp.content)
-        setattr(bio, "name", name)  # OpenAI SDK reads a .name for filename
-        uploaded = client.vector_stores.files.upload_and_poll(
+
+async def _lookup_persisted(chat_id: str) -> Optional[str]:
+    """Return the live store for a chat (refreshing lastUsedAt), dropping it if idle-expired."""
+    async with db.connection() as conn:
+        cursor = await conn.execute('''
+            UPDATE chat_vector_stores SET "lastUsedAt" = NOW()
+            WHERE "chatId" = %s AND "lastUsedAt" > NOW() - make_interval(secs => %s)
+            RETURNING "vectorStoreId"
+        ''', (chat_id, VECTOR_STORE_IDLE_TTL_SECONDS))
+        row = await cursor.fetchone()
+        if row:
+            return row["vectorStoreId"]
+        cursor = await conn.execute(
+            'DELETE FROM chat_vector_stores WHERE "chatId" = %s RETURNING "vectorStoreId"',
+            (chat_id,),
+        )
+        stale = await cursor.fetchone()
+    if stale:
+        await _delete_remote_store(stale["vectorStoreId"])
+    return None
+
+
+async def _persist_new_store(chat_id: str, vector_store_id: str) -> str:
+    """Record a freshly created store; if another worker won the race, use theirs."""
+    async with db.connection() as conn:
+        cursor = await conn.execute('''
+            INSERT INTO chat_vector_stores ("chatId", "vectorStoreId", "createdAt", "lastUsedAt")
+            VALUES (%s, %s, NOW(), NOW())
+            ON CONFLICT ("chatId") DO NOTHING
+            RETURNING "vectorStoreId"
+        ''', (chat_id, vector_store_id))
+        if await cursor.fetchone():
+            return vector_store_id
+        cursor = await conn.execute(
+            'SELECT "vectorStoreId" FROM chat_vector_stores WHERE "chatId" = %s', (chat_id,)
+        )
+        winner = (await cursor.fetchone())["vectorStoreId"]
+    await _delete_remote_store(vector_store_id)
+    return winner
+
+
+async def _touch(chat_id: str) -> None:
+    async with db.connection() as conn:
+        await conn.execute(
+            'UPDATE chat_vector_stores SET "lastUsedAt" = NOW() WHERE "chatId" = %s', (chat_id,)
+        )
+
+
+async def _ensure_remote_store(chat_id: str, name_prefix: str = "uploads-demo") -> str:
+    """Return an existing OpenAI vector_store_id for this chat, or create one."""
+    now = time.time()
+    cached = _VECTOR_STORES.get(chat_id)
+    if cached is not None and now - cached[1] > VECTOR_STORE_IDLE_TTL_SECONDS:
+        # Idle past the TTL: the reaper (possibly in another worker) may have deleted it.
+        del _VECTOR_STORES[chat_id]
+        cached = None
+    if cached is not None:
+        vector_store_id, touched_at = cached
+        _VECTOR_STORES.move_to_end(chat_id)
+        if db.is_configured() and now - touched_at > VECTOR_STORE_TOUCH_INTERVAL_SECONDS:
+            await _touch(chat_id)
+            _cache_put(chat_id, vector_store_id, now)
+        return vector_store_id
+
+    if not db.is_configured():
+        # No database: fall back to a process-local mapping.
+        vector_store_id = await _create_remote_store(chat_id, name_prefix)
+        _cache_put(chat_id, vector_store_id, now)
+        return vector_store_id
+
+    vector_store_id = await _lookup_persisted(chat_id)
+    if vector_store_id is None:
+        vector_store_id = await _persist_new_store(chat_id, await _create_remote_store(chat_id, name_prefix))
+    _cache_put(chat_id, vector_store_id, now)
+    return vector_store_id
+
+
+async def reap_stale_vector_stores() -> int:
+    """Delete mappings (and their remote stores) idle longer than VECTOR_STORE_IDLE_TTL_SECONDS."""
+    async with db.connection() as conn:
+        cursor = await conn.execute('''
+            DELETE FROM chat_vector_stores
+            WHERE "lastUsedAt" < NOW() - make_interval(secs => %s)
+            RETURNING "chatId", "vectorStoreId"
+        ''', (VECTOR_STORE_IDLE_TTL_SECONDS,))
+        stale = await cursor.fetchall()
+
+    for row in stale:
+        _VECTOR_STORES.pop(row["chatId"], None)
+    await asyncio.gather(*(_delete_remote_store(row["vectorStoreId"]) for row in stale))
+    if stale:
+        logger.info("🧹 Reaped %d idle vector store(s)", len(stale))
+    return len(stale)
+
+
+async def _reaper_loop() -> None:
+    while True:
+        try:
+            await reap_stale_vector_stores()
+        except Exception as e:
+            logger.error("Vector store reaper failed: %s", str(e), exc_info=True)
+        await asyncio.sleep(VECTOR_STORE_REAP_INTERVAL_SECONDS)
+
+
+def start_vector_store_reaper() -> None:
+    global _reaper_task
+    if _reaper_task is None and db.is_configured():
+        _reaper_task = asyncio.create_task(_reaper_loop(), name="vector-store-reaper")
+
+
+async def stop_vector_store_reaper() -> None:
+    global _reaper_task
+    if _reaper_task is None:
+        return
+    _reaper_task.cancel()
+    await asyncio.gather(_reaper_task, return_exceptions=True)
+    _reaper_task = None
+
+async def _http() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(timeout=60, follow_redirects=True)
+    return _http_client
+
+
+async def _list_ingested(vector_store_id: str, index: Dict[str, set]) -> None:
+    async for f in async_client.vector_stores.files.list(vector_store_id=vector_store_id, limit=100):
+        attributes = getattr(f, "attributes", None) or {}
+        if attributes.get("source_url"):
+            index["urls"].add(attributes["source_url"])
+        if attributes.get("sha256"):
+            index["hashes"].add(attributes["sha256"])
+
+
+async def _ingested_index(vector_store_id: str, refresh: bool = False) -> Dict[str, set]:
+    """
+    Source URLs and content hashes already in a vector store.
+
+    Built from the file attributes we set on upload. The first call in a
+    process lists the store; `refresh=True` lists it again and merges in
+    files other workers have uploaded since.
+    """
+    lock = _INGESTED_LOCKS.setdefault(vector_store_id, asyncio.Lock())
+    async with lock:
+        index = _INGESTED.get(vector_store_id)
+        if index is None:
+            index = {"urls": set(), "hashes": set()}
+            await _list_ingested(vector_store_id, index)
+            _INGESTED[vector_store_id] = index
+        elif refresh:
+            await _list_ingested(vector_store_id, index)
+    return index
+
+
+def _log_chunks(vector_store_id: str, content: bytes, name: str, url: str, digest: str, media_type: Optional[str]) -> None:
+    """Record the file's text chunks locally so BM25 can search them."""
+    text = extract_text(content, name, media_type)
+    records = chunk_records(text, name, url, digest, RAG_CHUNK_CHARS, RAG_CHUNK_OVERLAP)
+    if records:
+        _chunk_log(vector_store_id).append(records)
+
+
+async def _ingest_one(
+    vector_store_id: str,
+    url: str,
+    name: str,
+    index: Dict[str, set],
+    media_type: Optional[str] = None,
+) -> Optional[str]:
+    # fetch from Vercel Blob
+    http = await _http()
+    resp = await http.get(url)
+    resp.raise_for_status()
+    content = resp.content
+
+    digest = hashlib.sha256(content).hexdigest()
+    if digest in index["hashes"]:
+        logger.info("⏭️  %s already indexed (same content) - skipping", name)
+        index["urls"].add(url)
+        return None
+    # Claim the hash before awaiting so a concurrent duplicate is skipped.
+    index["hashes"].add(digest)
+
+    try:
+        uploaded = await async_client.files.create(file=(name, content), purpose="assistants")
+        await async_client.vector_stores.files.create_and_poll(
             vector_store_id=vector_store_id,
-            file=bio
+            file_id=uploaded.id,
+            attributes={"source_url": url[:512], "sha256": digest},
         )
-        file_ids.append(uploaded.id)
+    except Exception:
+        index["hashes"].discard(digest)
+        raise
+    index["urls"].add(url)
+
+    if RAG_HYBRID:
+        try:
+            await asyncio.to_thread(_log_chunks, vector_store_id, content, name, url, digest, media_type)
+        except Exception as e:
+            logger.warning("Could not extract %s for lexical search: %s", name, e)
+    return uploaded.id
+
+
+async def _upload_remote(vector_store_id: str, attachments: Iterable[Dict[str, Any]]) -> List[str]:
+    """
+    Upload any blob URLs in attachments to the vector store, concurrently
+    (at most RAG_UPLOAD_CONCURRENCY at a time). Files already in the store,
+    matched by URL or by SHA-256 of the content, are skipped.
+
+    Returns:
+        file_ids of newly uploaded files.
+    """
+    attachments = list(attachments)
+    cached = vector_store_id in _INGESTED
+    index = await _ingested_index(vector_store_id)
+
+    def unseen() -> Dict[str, Dict[str, Any]]:
+        pending: Dict[str, Dict[str, Any]] = {}
+        for a in attachments:
+            url = a.get("url")
+            if url and url not in index["urls"]:
+                pending.setdefault(url, a)
+        return pending
+
+    pending = unseen()
+    if pending and cached:
+        # Our copy may predate uploads by other workers; check the store itself.
+        index = await _ingested_index(vector_store_id, refresh=True)
+        pending = unseen()
+    if not pending:
+        return []
+
+    semaphore = asyncio.Semaphore(RAG_UPLOAD_CONCURRENCY)
+
+    async def bounded(url: str, a: Dict[str, Any]) -> Optional[str]:
+        async with semaphore:
+            return await _ingest_one(vector_store_id, url, a.get("name") or "file", index, a.get("type"))
+
+    results = await asyncio.gather(
+        *(bounded(url, a) for url, a in pending.items()),
+        return_exceptions=True,
+    )
+
+    file_ids: List[str] = []
+    for (url, a), result in zip(pending.items(), results):
+        name = a.get("name") or "file"
+        if isinstance(result, Exception):
+            logger.error("Failed to ingest %s (%s): %s", name, url, result)
+        elif result:
+            file_ids.append(result)
+    logger.info("📎 Ingested %d new file(s) into %s", len(file_ids), vector_store_id)
     return file_ids
 
-def search_store(vector_store_id: str, query: str, max_results: int = 5, rewrite: bool = True) -> Dict[str, Any]:
-    """Run a semantic search over the vector store and return the raw result payload."""
-    return client.vector_stores.search(
+async def _search_remote(vector_store_id: str, query: str, max_results: int = 5, rewrite: bool = True) -> List[SearchHit]:
+    """Run a semantic search over the OpenAI vector store."""
+    results = await async_client.vector_stores.search(
         vector_store_id=vector_store_id,
         query=query,
         max_num_results=max_results,
         rewrite_query=rewrite
     )
-
-def format_results_for_prompt(results) -> str:
-    """
-    Accepts the SyncPage[VectorStoreSearchResponse] returned by
-    client.vector_stores.search(...).
-    Builds a compact, readable string for prompting.
-    """
-    parts: list[str] = []
+    hits: List[SearchHit] = []
     # results.data is a list of VectorStoreSearchResult objects
     for r in results.data:
         fname = getattr(r, "filename", None) or getattr(r, "file_name", None) or "unknown"
-        score = getattr(r, "score", None)
         # each r.content is a list of content parts with .type and .text
-        texts: list[str] = []
+        texts: List[str] = []
         for c in (r.content or []):
             # newer SDK: c.type == "text", c.text is the string
             t = getattr(c, "text", None)
             if t:
                 texts.append(t)
-        text_blob = "\n".join(texts).strip()
-        parts.append(f"### {fname} (score: {score:.3f})\n{text_blob}")
+        hits.append(SearchHit(
+            filename=fname,
+            score=float(getattr(r, "score", 0.0) or 0.0),
+            text="\n".join(texts).strip(),
+            chunk_id=getattr(r, "file_id", None),
+        ))
+    return hits
+
+
+class OpenAIVectorStoreBackend:
+    """RAG backend on OpenAI vector stores (the original behaviour)."""
+
+    name = "openai"
+
+    async def ensure_store(self, chat_id: str, name_prefix: str = "uploads-demo") -> str:
+        return await _ensure_remote_store(chat_id, name_prefix)
+
+    async def ingest(self, store_id: str, attachments: Iterable[Dict[str, Any]]) -> List[str]:
+        return await _upload_remote(store_id, attachments)
+
+    async def search(self, store_id: str, query: str, max_results: int = 5, rewrite: bool = True) -> List[SearchHit]:
+        return await _search_remote(store_id, query, max_results, rewrite)
+
+    def chunk_log(self, store_id: str) -> ChunkLog:
+        return _chunk_log(store_id)
+
 
-    return "\n\n".join(parts) if parts else ""
\ No newline at end of file
+_backend: Optional[Any] = None
+
+
+def get_backend() -> Any:
+    """The retrieval backend selected by RAG_BACKEND (openai | local)."""
+    global _backend
+    if _backend is None:
+        if os.environ.get("RAG_BACKEND", "openai").lower() == "local":
+            from .local_index import LocalVectorIndexBackend
+            _backend = LocalVectorIndexBackend()
+        else:
+            _backend = OpenAIVectorStoreBackend()
+        logger.info("📚 RAG backend: %s", _backend.name)
+    return _backend
+
+
+def set_backend(backend: Any) -> None:
+    """Swap the retrieval backend (e.g. a LocalVectorIndexBackend with a test embedder)."""
+    global _backend
+    _backend = backend
+
+
+async def ensure_vector_store(chat_id: str, name_prefix: str = "uploads-demo") -> str:
+    """Return an existing store id for this chat, or create one."""
+    return await get_backend().ensure_store(chat_id, name_prefix)
+
+
+async def upload_blobs(vector_store_id: str, attachments: Iterable[Dict[str, Any]]) -> List[str]:
+    """Ingest any blob URLs in attachments into the chat's store. Returns new file ids."""
+    return await get_backend().ingest(vector_store_id, attachments)
+
+
+def _lexical_search(store_id: str, query: str, k: int) -> List[SearchHit]:
+    """BM25 over the store's chunk log, indexing any chunks added since the last call."""
+    # The log and the index each lock themselves; positions match because both are append-only.
+    records = get_backend().chunk_log(store_id).records
+    index = _LEXICAL.setdefault(store_id, BM25Index())
+    index.extend_to(records, text=lambda record: record["text"])
+
+    hits: List[SearchHit] = []
+    for position, score in index.search(query, k):
+        record = records[int(position)]
+        hits.append(SearchHit(
+            filename=record.get("filename", "unknown"),
+            score=score,
+            text=record["text"],
+            chunk_id=record.get("id"),
+        ))
+    return hits
+
+
+def _fusion_key(hit: SearchHit) -> str:
+    # Local backends share chunk ids with the chunk log; remote chunks only match on text.
+    return hit.chunk_id if hit.chunk_id and ":" in hit.chunk_id else " ".join(hit.text.split())[:200]
+
+
+async def search_store(
+    vector_store_id: str,
+    query: str,
+    max_results: int = 5,
+    rewrite: bool = True,
+    hybrid: Optional[bool] = None,
+) -> List[SearchHit]:
+    """
+    Search the chat's store.
+
+    With hybrid retrieval (RAG_HYBRID, on by default) the vector backend and
+    the BM25 index are queried in parallel and merged with reciprocal-rank
+    fusion; `max_results` is the budget for the fused list. Fused hits carry
+    the RRF score.
+    """
+    backend = get_backend()
+    if not (RAG_HYBRID if hybrid is None else hybrid):
+        return await backend.search(vector_store_id, query, max_results, rewrite)
+
+    candidates = max(max_results, RAG_FUSION_CANDIDATES)
+    vector_hits, lexical_hits = await asyncio.gather(
+        backend.search(vector_store_id, query, candidates, rewrite),
+        asyncio.to_thread(_lexical_search, vector_store_id, query, candidates),
+        return_exceptions=True,
+    )
+    rankings: List[List[SearchHit]] = []
+    for source, hits in (("vector", vector_hits), ("bm25", lexical_hits)):
+        if isinstance(hits, BaseException):
+            logger.warning("%s retrieval failed: %s", source, hits)
+        else:
+            rankings.append(hits)
+
+    fused = reciprocal_rank_fusion(rankings, key=_fusion_key, limit=max_results)
+    logger.info(
+        "🔎 Hybrid retrieval | vector=%d bm25=%d fused=%d",
+        len(vector_hits) if isinstance(vector_hits, list) else 0,
+        len(lexical_hits) if isinstance(lexical_hits, list) else 0,
+        len(fused),
+    )
+    return [
+        SearchHit(filename=hit.filename, score=score, text=hit.text, chunk_id=hit.chunk_id)
+        for hit, score in fused
+    ]
+
+
+def format_results_for_prompt(hits: List[SearchHit]) -> str:
+    """
+    Builds a compact, readable string for prompting from `search_store` hits.
+    """
+    parts = [f"### {h.filename} (score: {h.score:.3f})\n{h.text}" for h in hits]
+    return "\n\n".join(parts) if parts else ""
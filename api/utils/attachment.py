@@ -1,7 +1,107 @@
+"""
+Chat attachments.
+
+Attachments travel alongside message text as plain dicts -
+``{"name", "type", "url"}`` for blob uploads or ``{"name", "type", "content"}``
+for inline base64 - rather than being spliced into the text and parsed back
+out. Older clients and stored histories still embed
+``[File: name (type) - URL: ...]`` / ``[File: name (type) - Content: ...]``
+markers in message text; `split_file_markers` finds those in a single linear
+scan.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple, Union
+
 from pydantic import BaseModel
 
 
 class ClientAttachment(BaseModel):
     name: str
     contentType: str
-    url: str
\ No newline at end of file
+    url: str
+
+
+MARKER_OPEN = "[File:"
+# Longest "name (type)" header accepted before the " - URL:"/" - Content:" separator.
+_MAX_HEADER_CHARS = 1024
+
+_HEADER_RE = re.compile(r"\s*(.+?)\s*\(([^()]+)\)\s*-\s*(URL|Content):\s*")
+_URL_RE = re.compile(r"\S+")
+# Inline payloads are base64, optionally behind a data URL prefix; never "]" or "[".
+_INLINE_RE = re.compile(r"(?:data:[^,\[\]\s]*,)?[A-Za-z0-9+/=\s]*")
+
+Segment = Union[str, Dict[str, str]]
+
+
+def from_client_attachment(attachment: ClientAttachment) -> Dict[str, str]:
+    """Structured attachment for an AI SDK `experimental_attachments` entry (data URLs become inline content)."""
+    if attachment.url.startswith("data:"):
+        return {"name": attachment.name, "type": attachment.contentType, "content": attachment.url}
+    return {"name": attachment.name, "type": attachment.contentType, "url": attachment.url}
+
+
+def _parse_marker(text: str, start: int) -> Optional[Tuple[Optional[Dict[str, str]], int]]:
+    """
+    Parse the marker opening at `start`.
+
+    Returns (attachment, end index), (None, len(text)) when no "]" follows
+    (so no later marker can close either), or None if the header is malformed.
+    """
+    header_start = start + len(MARKER_OPEN)
+    header = _HEADER_RE.match(text, header_start, min(len(text), header_start + _MAX_HEADER_CHARS))
+    if header is None:
+        return None
+    name, media_type, kind = header.group(1), header.group(2).strip(), header.group(3)
+
+    payload_start = header.end()
+    close = text.find("]", payload_start)
+    if close == -1:
+        return None, len(text)
+    payload = text[payload_start:close]
+    if kind == "URL":
+        if not _URL_RE.fullmatch(payload.strip()):
+            return None
+        return {"name": name, "type": media_type, "url": payload.strip()}, close + 1
+    # Anything but base64 before the "]" means this marker was never closed.
+    if not _INLINE_RE.fullmatch(payload):
+        return None
+    return {"name": name, "type": media_type, "content": payload.strip()}, close + 1
+
+
+def split_file_markers(text: str) -> List[Segment]:
+    """
+    Split message text into plain-text segments and attachment dicts.
+
+    Scans left to right once: each "[File:" is parsed in place and the scan
+    resumes after it, so cost is linear in the text length however large the
+    inline payloads are. Malformed markers are kept as plain text.
+
+    Args:
+        text: Message content, possibly with legacy [File: ...] markers
+
+    Returns:
+        Segments in order; strings for text, dicts for attachments
+    """
+    segments: List[Segment] = []
+    cursor = 0
+    search_from = 0
+    while True:
+        start = text.find(MARKER_OPEN, search_from)
+        if start == -1:
+            break
+        parsed = _parse_marker(text, start)
+        if parsed is None:
+            search_from = start + len(MARKER_OPEN)
+            continue
+        attachment, end = parsed
+        if attachment is None:
+            break
+        if start > cursor:
+            segments.append(text[cursor:start])
+        segments.append(attachment)
+        cursor = search_from = end
+    if cursor < len(text):
+        segments.append(text[cursor:])
+    return segments
+
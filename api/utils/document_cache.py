@@ -0,0 +1,107 @@
+"""
+Cache of text extracted from attached documents.
+
+`to_agent_messages` re-processes every message in the history on every turn,
+so without this each turn re-downloads and re-parses every PDF in the chat.
+Extracted text is keyed by SHA-256 of the document bytes (plus the extraction
+limit); blob URLs map to that hash, with their ETag, so a cached URL is
+served without any network request.
+
+Configuration (environment variables):
+    DOC_TEXT_CACHE_MAX_BYTES   In-memory budget for cached text (default 64 MiB)
+    DOC_TEXT_CACHE_DIR         Optional directory for an on-disk second tier
+    DOC_TEXT_CACHE_REVALIDATE  "1" to revalidate URLs with If-None-Match (default off;
+                               Vercel Blob URLs are immutable)
+"""
+
+import logging
+import os
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentTextCache:
+    """Byte-bounded LRU of extracted text, with an optional on-disk tier."""
+
+    MAX_URLS = 4096
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, disk_dir: Optional[str] = None, revalidate: bool = False):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.revalidate = revalidate
+        self._texts: "OrderedDict[str, str]" = OrderedDict()
+        self._size = 0
+        # url -> (content sha256, etag)
+        self._urls: "OrderedDict[str, Tuple[str, Optional[str]]]" = OrderedDict()
+        self.stats = {"hits": 0, "diskHits": 0, "misses": 0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "DocumentTextCache":
+        return cls(
+            max_bytes=int(os.environ.get("DOC_TEXT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            disk_dir=os.environ.get("DOC_TEXT_CACHE_DIR") or None,
+            revalidate=os.environ.get("DOC_TEXT_CACHE_REVALIDATE") == "1",
+        )
+
+    @staticmethod
+    def _key(sha: str, max_chars: int) -> str:
+        return f"{sha}:{max_chars}"
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key.replace(":", "_") + ".txt")
+
+    def _remember(self, key: str, text: str) -> None:
+        previous = self._texts.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous)
+        # Sized by character count, which tracks the str payload closely enough.
+        self._texts[key] = text
+        self._size += len(text)
+        while self._size > self.max_bytes and len(self._texts) > 1:
+            _, evicted = self._texts.popitem(last=False)
+            self._size -= len(evicted)
+
+    def get(self, sha: str, max_chars: int) -> Optional[str]:
+        key = self._key(sha, max_chars)
+        text = self._texts.get(key)
+        if text is not None:
+            self._texts.move_to_end(key)
+            self.stats["hits"] += 1
+            return text
+        if self.disk_dir and os.path.exists(self._disk_path(key)):
+            with open(self._disk_path(key), encoding="utf-8") as f:
+                text = f.read()
+            self._remember(key, text)
+            self.stats["diskHits"] += 1
+            return text
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, sha: str, max_chars: int, text: str) -> None:
+        key = self._key(sha, max_chars)
+        self._remember(key, text)
+        if self.disk_dir:
+            tmp = self._disk_path(key) + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, self._disk_path(key))
+
+    def url_entry(self, url: str) -> Optional[Tuple[str, Optional[str]]]:
+        """(sha256, etag) recorded for a URL, if it has been fetched before."""
+        entry = self._urls.get(url)
+        if entry is not None:
+            self._urls.move_to_end(url)
+        return entry
+
+    def link_url(self, url: str, sha: str, etag: Optional[str]) -> None:
+        self._urls[url] = (sha, etag)
+        self._urls.move_to_end(url)
+        while len(self._urls) > self.MAX_URLS:
+            self._urls.popitem(last=False)
+
+
+document_cache = DocumentTextCache.from_env()
@@ -0,0 +1,357 @@
+"""
+PDF text extraction in bounded, killable worker processes.
+
+pypdf is pure Python and CPU-bound, so parsing on the event loop thread stalls
+every other chat stream on the worker. Documents are split into page ranges
+that worker processes extract in parallel (at most PDF_EXTRACT_WORKERS at a
+time across all documents); collection stops as soon as `max_chars` is
+reached, and each document gets a wall-clock deadline. Every task runs in its
+own short-lived process, so a task that overruns the deadline (or is no
+longer needed) is killed on its own - extractions for other chats running at
+the same time are not touched. Workers run under an address-space limit so a
+hostile PDF fails with MemoryError in the worker rather than taking the API
+process down. When a limit is hit the pages extracted so far are returned
+with a note.
+
+Documents never sit in memory whole: downloads stream into a spooled temp
+file and base64 uploads are decoded chunk by chunk into one (`spool_url`,
+`spool_base64`), hashing as they go. Workers memory-map the file for
+`PdfReader` and walk pages with `iter_pdf_pages`, so peak memory per upload
+is the pages being parsed rather than several copies of the file.
+
+Configuration (environment variables):
+    PDF_EXTRACT_WORKERS          Concurrent worker processes (default min(4, CPU count))
+    PDF_EXTRACT_PAGES_PER_TASK   Pages per worker task (default 20)
+    PDF_EXTRACT_TIMEOUT_SECONDS  Wall-clock limit per document (default 20)
+    PDF_EXTRACT_MEMORY_MB        Address-space limit per worker, 0 to disable (default 1024)
+    PDF_SPOOL_DIR                Directory for spooled uploads (default system temp dir)
+"""
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import logging
+import mmap
+import multiprocessing
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from pypdf import PdfReader
+
+logger = logging.getLogger(__name__)
+
+PDF_EXTRACT_WORKERS = int(os.environ.get("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+PAGES_PER_TASK = int(os.environ.get("PDF_EXTRACT_PAGES_PER_TASK", "20"))
+PDF_EXTRACT_TIMEOUT_SECONDS = float(os.environ.get("PDF_EXTRACT_TIMEOUT_SECONDS", "20"))
+PDF_EXTRACT_MEMORY_MB = int(os.environ.get("PDF_EXTRACT_MEMORY_MB", "1024"))
+PDF_SPOOL_DIR = os.environ.get("PDF_SPOOL_DIR") or None
+
+# Base64 characters decoded per step (a multiple of 4 so chunks decode independently).
+_B64_CHUNK_CHARS = 4 * 64 * 1024
+_DOWNLOAD_CHUNK_BYTES = 256 * 1024
+_NON_B64_RE = re.compile(rb"[^A-Za-z0-9+/=]")
+
+_slots: Optional[asyncio.Semaphore] = None
+_processes: Set[multiprocessing.process.BaseProcess] = set()
+
+
+class WorkerStopped(RuntimeError):
+    """A worker process exited without a result (killed, or over its memory limit)."""
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+def _limit_worker_memory(memory_mb: int) -> None:
+    if memory_mb <= 0:
+        return
+    try:
+        import resource
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError) as e:
+        # Not available on every platform; extraction still works, unbounded.
+        logger.warning("Could not set PDF worker memory limit: %s", e)
+
+
+@contextmanager
+def _mapped_reader(path: str) -> Iterator[PdfReader]:
+    """PdfReader over a read-only memory map of `path`; pages are paged in by the OS as parsed."""
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield PdfReader(mapped)
+
+
+def iter_pdf_pages(path: str, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """Yield (1-based page number, text) for pages [start, end) of the PDF at `path`, one page at a time."""
+    with _mapped_reader(path) as reader:
+        stop = len(reader.pages) if end is None else min(end, len(reader.pages))
+        for i in range(start, stop):
+            yield i + 1, reader.pages[i].extract_text() or ""
+
+
+def _child_main(conn, memory_mb: int, fn: Callable[..., Any], args: Tuple[Any, ...]) -> None:
+    """Worker process entry point: run `fn(*args)` and send ("ok", result) or ("error", exception)."""
+    _limit_worker_memory(memory_mb)
+    try:
+        message = ("ok", fn(*args))
+    except BaseException as e:
+        message = ("error", e)
+    try:
+        conn.send(message)
+    finally:
+        conn.close()
+
+
+def _count_pages(path: str) -> int:
+    with _mapped_reader(path) as reader:
+        return len(reader.pages)
+
+
+def _extract_page_range(path: str, start: int, end: int, max_chars: int) -> List[Tuple[int, str]]:
+    """(1-based page number, text) for pages [start, end), stopping once `max_chars` is collected."""
+    pages: List[Tuple[int, str]] = []
+    collected = 0
+    for page_number, text in iter_pdf_pages(path, start, end):
+        pages.append((page_number, text))
+        collected += len(text)
+        if collected >= max_chars:
+            break
+    return pages
+
+
+# ---------------------------------------------------------------------------
+# Spooling
+# ---------------------------------------------------------------------------
+
+@dataclass
+class SpooledFile:
+    """A document written to a temp file, with the SHA-256 of its bytes."""
+    path: str
+    sha256: str
+    size: int
+    etag: Optional[str] = None
+
+    def remove(self) -> None:
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _spool_file():
+    return tempfile.NamedTemporaryFile(prefix="attachment-", suffix=".pdf", dir=PDF_SPOOL_DIR, delete=False)
+
+
+def _spool_base64_sync(data: str) -> SpooledFile:
+    start = data.find("base64,")
+    start = start + len("base64,") if start != -1 else 0
+    digest = hashlib.sha256()
+    size = 0
+    carry = b""
+    with _spool_file() as out:
+        try:
+            for offset in range(start, len(data), _B64_CHUNK_CHARS):
+                # Drop whitespace/newlines so every decoded step stays 4-aligned.
+                piece = carry + _NON_B64_RE.sub(b"", data[offset:offset + _B64_CHUNK_CHARS].encode("ascii"))
+                usable = len(piece) - len(piece) % 4
+                carry = piece[usable:]
+                decoded = base64.b64decode(piece[:usable])
+                out.write(decoded)
+                digest.update(decoded)
+                size += len(decoded)
+            if carry:
+                raise binascii.Error("Incorrect padding")
+        except BaseException:
+            out.close()
+            os.unlink(out.name)
+            raise
+    return SpooledFile(path=out.name, sha256=digest.hexdigest(), size=size)
+
+
+async def spool_base64(data: str) -> SpooledFile:
+    """Decode a base64 payload (optionally a data URL) into a temp file in fixed-size chunks."""
+    return await asyncio.to_thread(_spool_base64_sync, data)
+
+
+async def spool_url(url: str, headers: Optional[Dict[str, str]] = None) -> Optional[SpooledFile]:
+    """
+    Stream a download into a temp file.
+
+    Returns:
+        The spooled file, or None when the server answers 304 Not Modified.
+    """
+    # Shared client with the RAG ingestion path.
+    from ..rag_store import _http
+
+    client = await _http()
+    digest = hashlib.sha256()
+    size = 0
+    async with client.stream("GET", url, headers=headers or {}) as response:
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        out = _spool_file()
+        try:
+            with out:
+                async for chunk in response.aiter_bytes(_DOWNLOAD_CHUNK_BYTES):
+                    out.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+        except BaseException:
+            os.unlink(out.name)
+            raise
+        return SpooledFile(path=out.name, sha256=digest.hexdigest(), size=size, etag=response.headers.get("ETag"))
+
+
+# ---------------------------------------------------------------------------
+# Pool
+# ---------------------------------------------------------------------------
+
+def _worker_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(PDF_EXTRACT_WORKERS)
+    return _slots
+
+
+async def _run_isolated(fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run `fn(*args)` in a dedicated worker process and return its result.
+
+    Cancelling the call (e.g. `asyncio.wait_for` timing out) kills that one
+    process, so an overrunning task stops without affecting any other.
+    """
+    async with _worker_slots():
+        ctx = multiprocessing.get_context()
+        receiver, sender = ctx.Pipe(duplex=False)
+        process = ctx.Process(target=_child_main, args=(sender, PDF_EXTRACT_MEMORY_MB, fn, args), daemon=True)
+        process.start()
+        sender.close()
+        _processes.add(process)
+        try:
+            status, value = await asyncio.to_thread(receiver.recv)
+        except EOFError:
+            raise WorkerStopped(f"PDF worker exited with code {process.exitcode}") from None
+        finally:
+            _processes.discard(process)
+            if process.is_alive():
+                # Timed out or cancelled: stop parsing. The recv thread then sees EOF.
+                process.kill()
+            # Reap off the event loop thread.
+            asyncio.get_running_loop().run_in_executor(None, process.join)
+        receiver.close()
+        if status == "error":
+            raise value
+        return value
+
+
+def shutdown_pool() -> None:
+    """Kill any worker processes still running (called on shutdown)."""
+    for process in list(_processes):
+        if process.is_alive():
+            process.kill()
+    _processes.clear()
+
+
+def format_pages(pages: List[Tuple[int, str]], total_pages: int, max_chars: int, note: Optional[str] = None) -> str:
+    """Render extracted pages in the "--- Page N ---" layout used for attachments."""
+    text = ""
+    truncated = False
+    for page_number, page_text in pages:
+        if len(text) >= max_chars:
+            truncated = True
+            break
+        if not page_text:
+            continue
+        if len(text) + len(page_text) > max_chars:
+            remaining = max_chars - len(text)
+            text += page_text[:remaining] + f"\n\n[Content truncated at {remaining} characters on page {page_number}]"
+            truncated = True
+            break
+        text += f"\n--- Page {page_number} ---\n{page_text}"
+
+    result = text.strip()
+    if note:
+        result += f"\n\n[Note: PDF has {total_pages} pages. {note} Only the first {len(result)} characters are shown.]"
+    elif truncated:
+        result += f"\n\n[Note: PDF has {total_pages} pages. Content was truncated to fit context limits. Only the first {len(result)} characters are shown.]"
+    else:
+        result = f"[PDF contains {total_pages} pages, {len(result)} characters]\n\n{result}"
+    return result
+
+
+async def extract_pdf_text(
+    path: str,
+    max_chars: int = 50000,
+    timeout: Optional[float] = None,
+) -> Tuple[str, bool]:
+    """
+    Extract text from a PDF file in worker processes.
+
+    Args:
+        path: PDF on local disk (see `spool_url` / `spool_base64`)
+        max_chars: Stop collecting once this many characters are extracted
+        timeout: Wall-clock limit in seconds (default PDF_EXTRACT_TIMEOUT_SECONDS)
+
+    Returns:
+        (formatted text, complete) - `complete` is False when a time or
+        memory limit cut extraction short, so callers should not cache it.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + (timeout if timeout is not None else PDF_EXTRACT_TIMEOUT_SECONDS)
+
+    def remaining() -> float:
+        return max(deadline - loop.time(), 0.0)
+
+    try:
+        # On timeout wait_for cancels the call, which kills its worker.
+        total_pages = await asyncio.wait_for(_run_isolated(_count_pages, path), remaining())
+    except asyncio.TimeoutError:
+        return "[PDF could not be opened within the extraction time limit]", False
+    except (MemoryError, WorkerStopped):
+        return "[PDF could not be opened: the extraction worker stopped (memory limit)]", False
+
+    ranges = [(start, min(start + PAGES_PER_TASK, total_pages)) for start in range(0, total_pages, PAGES_PER_TASK)]
+    pending = [
+        asyncio.ensure_future(_run_isolated(_extract_page_range, path, start, end, max_chars))
+        for start, end in ranges
+    ]
+
+    pages: List[Tuple[int, str]] = []
+    collected = 0
+    note: Optional[str] = None
+    try:
+        # Consume ranges in page order so the text stays contiguous.
+        for future in pending:
+            try:
+                chunk = await asyncio.wait_for(future, remaining())
+            except asyncio.TimeoutError:
+                # wait_for cancelled the range, which killed its worker.
+                note = "Extraction hit its time limit; later pages were skipped."
+                break
+            except MemoryError:
+                note = "Extraction hit its memory limit; later pages were skipped."
+                break
+            except WorkerStopped:
+                note = "The extraction worker stopped (memory limit); later pages were skipped."
+                break
+            pages.extend(chunk)
+            collected += sum(len(text) for _, text in chunk)
+            if collected >= max_chars:
+                break
+    finally:
+        # Ranges past the cut-off: queued ones never start, running ones are killed.
+        for future in pending:
+            future.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    if note:
+        logger.warning("⏱️ Partial PDF extraction | pages=%d/%d | %s", len(pages), total_pages, note)
+    return format_pages(pages, total_pages, max_chars, note), note is None
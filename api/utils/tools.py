@@ -1,12 +1,19 @@
 from agents import function_tool
 import logging 
+import os
 from typing import Optional, Literal, List, Dict, Any
-import psycopg2
-import psycopg2.extras
-import os 
+
+from ..intake_store import list_intakes, parse_fields
 
 logger = logging.getLogger(__name__)
 
+# Intakes shown to the model per lookup (newest first), and summary characters per intake.
+INTAKE_TOOL_LIMIT = int(os.environ.get("INTAKE_TOOL_LIMIT", "25"))
+INTAKE_TOOL_SUMMARY_CHARS = 300
+
+# Narrow projection: no reasoning, firm or law JSON blobs.
+_INTAKE_TOOL_FIELDS = parse_fields("form,aiScore,aiSummary,analysisStatus")
+
 MatterType = Literal[
     "employment",
     "personal injury",
@@ -16,49 +23,64 @@ MatterType = Literal[
 ]
 
 
-def retrieve_intakes_from_db(category: Optional[MatterType] = None) -> List[Dict[str, Any]]:
+def _clip(text: Any, limit: int) -> str:
+    text = " ".join(str(text or "").split())
+    return text if len(text) <= limit else text[: limit - 3] + "..."
+
+
+def format_intake_rows(rows: List[Dict[str, Any]]) -> str:
+    """One compact line per intake: id | date | name | matter | jurisdiction | score/status | summary."""
+    lines = []
+    for row in rows:
+        submitted = row["submittedAt"].date().isoformat() if row.get("submittedAt") else "-"
+        score = row.get("aiScore")
+        lines.append(" | ".join([
+            row["id"],
+            submitted,
+            row.get("fullName") or "-",
+            row.get("matterType") or "-",
+            row.get("jurisdiction") or "-",
+            f"score {score}" if score is not None else f"analysis {row.get('analysisStatus') or 'n/a'}",
+            _clip(row.get("aiSummary") or row.get("summary"), INTAKE_TOOL_SUMMARY_CHARS),
+        ]))
+    return "\n".join(lines)
+
+
+async def retrieve_intakes_from_db(category: Optional[MatterType] = None) -> str:
     """
     Retrieve intake cases stored in the database.
     
-    This is a regular callable function. Call it directly from tests or API endpoints.
+    This is a regular coroutine function. Await it directly from tests or API endpoints.
     For agent use, import `stored_intake_retrieval_tool` instead (see bottom of file).
 
     Args:
-        category: Optional matter type to filter by. If None, returns all intakes.
+        category: Optional matter type to filter by. If None, returns the newest intakes of any type.
 
     Returns:
-        String representation of list of intake dictionaries from database.
+        The newest intakes (at most INTAKE_TOOL_LIMIT), one compact line each.
     """
     logger.info("🔧 TOOL: stored_intake_retrieval | category=%s", category or "ALL")
     
-    DATABASE_URL = os.environ.get("DATABASE_URL")
-
     try:
-        conn = psycopg2.connect(DATABASE_URL)
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-
-        if category is not None:
-            normalized = category.lower()
-            # Use "matterType" column (from Prisma schema) and quote it for case-sensitivity
-            query = 'SELECT * FROM intakes WHERE LOWER("matterType") = %s ORDER BY "submittedAt" DESC;'
-            cursor.execute(query, (normalized,))
-        else:
-            # Quote column name for case-sensitivity in Postgres
-            query = 'SELECT * FROM intakes ORDER BY "submittedAt" DESC;'
-            cursor.execute(query)
-
-        intakes = cursor.fetchall()
-
-        cursor.close()
-        conn.close()
-        
-        logger.info("✅ Retrieved %d intake(s) from database", len(intakes))
-        return str(intakes)
+        rows, next_cursor = await list_intakes(
+            limit=INTAKE_TOOL_LIMIT,
+            fields=_INTAKE_TOOL_FIELDS,
+            matter_type=category,
+        )
+        logger.info("✅ Retrieved %d intake(s) from database", len(rows))
+        if not rows:
+            return f"No stored intakes{f' for {category}' if category else ''}."
+
+        header = "id | submitted | name | matter type | jurisdiction | score | summary"
+        text = f"{header}\n{format_intake_rows(rows)}"
+        if next_cursor:
+            hint = "" if category else " - filter by matter type to narrow"
+            text += f"\n(Newest {len(rows)} shown; more intakes exist{hint}.)"
+        return text
 
     except Exception as e:
         logger.error("❌ Database error in retrieve_intakes_from_db: %s", str(e), exc_info=True)
-        return []
+        return "Stored intakes are unavailable right now (database error)."
 
 # Create tool wrapper for agents - this is what gets passed to Agent(..., tools=[...])
 stored_intake_retrieval_tool = function_tool(retrieve_intakes_from_db)
-
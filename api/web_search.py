@@ -0,0 +1,358 @@
+"""
+Shared, cached web search for every agent.
+
+The orchestrator, both sub-agents and the intake analyst used to carry their
+own hosted `WebSearchTool`, and hosted searches run inside the model call, so
+the same statute / SOL / firm-directory research for the same jurisdiction
+was repeated on every turn and every intake. Agents now call the
+`web_search` function tool, which goes through one cache:
+
+- Queries are normalized (case, punctuation, stopwords, plurals; word order
+  is kept, so "employer sued employee" and the reverse stay distinct)
+  and the jurisdiction is pulled out into its own key part, so
+  "California employment retaliation" and "employment retaliation laws in CA"
+  share an entry.
+- Entries expire after WEB_SEARCH_CACHE_TTL_SECONDS; the memory backend is
+  size-bounded, the Postgres backend (`web_search_cache` table) is shared by
+  all workers and survives restarts.
+- Identical searches already in flight share one backend call.
+
+Search backends: "openai" runs a Responses API call with the web_search tool
+and returns the summary plus cited URLs; "stub" answers offline from
+WEB_SEARCH_STUB_FILE (JSON object of query -> answer or {answer, sources})
+with a canned fallback; "hosted" restores the per-agent hosted tool with no
+cache.
+
+Configuration (environment variables):
+    WEB_SEARCH_BACKEND             openai | stub | hosted (default openai)
+    WEB_SEARCH_MODEL               Model behind the openai backend (default gpt-4.1-mini)
+    WEB_SEARCH_STUB_FILE           Fixture file for the stub backend (optional)
+    WEB_SEARCH_CACHE_BACKEND       memory | postgres | none (default memory)
+    WEB_SEARCH_CACHE_MAX_ENTRIES   In-process LRU size (default 1024)
+    WEB_SEARCH_CACHE_TTL_SECONDS   Entry lifetime (default 7 days)
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from agents import WebSearchTool, function_tool
+from psycopg.types.json import Jsonb
+
+from .db import connection
+from .jurisdictions import DC_RE, US_STATES, normalize_jurisdiction
+
+logger = logging.getLogger(__name__)
+
+WEB_SEARCH_BACKEND = os.environ.get("WEB_SEARCH_BACKEND", "openai").lower()
+WEB_SEARCH_MODEL = os.environ.get("WEB_SEARCH_MODEL", "gpt-4.1-mini")
+WEB_SEARCH_STUB_FILE = os.environ.get("WEB_SEARCH_STUB_FILE")
+
+# Bump when the search prompt, result shape or query normalization changes.
+SEARCH_VERSION = "3"
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by can could do does for from how i in is it law laws legal me my "
+    "of on or please search should state the to under what when where which who with".split()
+)
+_STATE_NAMES = {code: name for name, code in US_STATES.items()}
+
+
+def _fold(token: str) -> str:
+    # Cheap plural folding: "deadlines" -> "deadline", "statutes" -> "statute".
+    if len(token) > 4 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def normalize_query(query: str, jurisdiction: Optional[str] = None) -> str:
+    """
+    Canonical form of a search query, with the jurisdiction removed (it is
+    keyed separately). Word order is kept: it carries who did what to whom.
+    """
+    text = query.lower()
+    if jurisdiction == "DC":
+        # "Washington DC" would otherwise leave "washington" in the key.
+        text = DC_RE.sub(" ", text)
+    text = re.sub(r"[^\w\s§.-]", " ", text)
+    if jurisdiction in _STATE_NAMES:
+        text = re.sub(rf"\b{re.escape(_STATE_NAMES[jurisdiction])}\b", " ", text)
+    code = (jurisdiction or "").lower()
+    tokens = []
+    for token in text.split():
+        token = token.strip(".-")
+        if not token or token in _STOPWORDS or token == code:
+            continue
+        tokens.append(_fold(token))
+    return " ".join(tokens)
+
+
+def search_cache_key(query: str, jurisdiction: Optional[str]) -> Tuple[str, str, str]:
+    """(key, normalized jurisdiction, normalized query) for a search."""
+    resolved = normalize_jurisdiction(jurisdiction) or normalize_jurisdiction(query) or ""
+    normalized = normalize_query(query, resolved)
+    raw = f"{SEARCH_VERSION}|{resolved}|{normalized}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest(), resolved, normalized
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    """Search result as tool output: the answer followed by its sources."""
+    lines = [str(result.get("answer") or "").strip()]
+    sources = result.get("sources") or []
+    if sources:
+        lines.append("")
+        lines.append("Sources:")
+        lines.extend(f"- {s.get('title') or s.get('url')}: {s.get('url')}" for s in sources)
+    return "\n".join(lines).strip()
+
+
+# ----- Search backends -----
+
+class OpenAISearchBackend:
+    """Responses API call with the hosted web_search tool."""
+
+    def __init__(self, model: str = WEB_SEARCH_MODEL):
+        self.model = model
+        self._client = None
+
+    async def search(self, query: str, jurisdiction: str) -> Dict[str, Any]:
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI()
+        tool: Dict[str, Any] = {"type": "web_search"}
+        if jurisdiction in _STATE_NAMES:
+            tool["user_location"] = {"type": "approximate", "country": "US", "region": _STATE_NAMES[jurisdiction].title()}
+        scope = f" (jurisdiction: {_STATE_NAMES.get(jurisdiction, 'federal').title()})" if jurisdiction else ""
+        response = await self._client.responses.create(
+            model=self.model,
+            tools=[tool],
+            input=(
+                f"Search the web and report the current, specific findings for: {query}{scope}. "
+                "Prefer primary sources (.gov, court sites, official codes). Include statute "
+                "citations, deadlines and names exactly as found."
+            ),
+        )
+        sources: List[Dict[str, str]] = []
+        seen = set()
+        for item in getattr(response, "output", None) or []:
+            for content in getattr(item, "content", None) or []:
+                for annotation in getattr(content, "annotations", None) or []:
+                    url = getattr(annotation, "url", None)
+                    if getattr(annotation, "type", "") == "url_citation" and url and url not in seen:
+                        seen.add(url)
+                        sources.append({"title": getattr(annotation, "title", "") or url, "url": url})
+        return {"answer": response.output_text, "sources": sources}
+
+
+class StubSearchBackend:
+    """Offline backend for tests and local runs: fixture answers, else a canned reply."""
+
+    def __init__(self, fixture_path: Optional[str] = WEB_SEARCH_STUB_FILE):
+        self.fixtures: Dict[str, Any] = {}
+        if fixture_path:
+            with open(fixture_path, encoding="utf-8") as f:
+                self.fixtures = {
+                    search_cache_key(query, None)[0]: value for query, value in json.load(f).items()
+                }
+
+    async def search(self, query: str, jurisdiction: str) -> Dict[str, Any]:
+        fixture = self.fixtures.get(search_cache_key(query, jurisdiction or None)[0])
+        if isinstance(fixture, dict):
+            return {"answer": fixture.get("answer", ""), "sources": fixture.get("sources", [])}
+        if fixture is not None:
+            return {"answer": str(fixture), "sources": []}
+        return {
+            "answer": f"[offline search stub] No results for {query!r} (jurisdiction: {jurisdiction or 'unspecified'}).",
+            "sources": [],
+        }
+
+
+# ----- Cache backends -----
+
+class MemorySearchCache:
+    """In-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: float, jurisdiction: str, query: str, original_query: str) -> None:
+        self._entries[key] = (time.time() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class PostgresSearchCache:
+    """Shared cache in the `web_search_cache` table (survives restarts, shared by workers)."""
+
+    # Purge expired rows every N writes instead of on a timer.
+    PURGE_EVERY = 100
+
+    def __init__(self):
+        self._writes = 0
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        async with connection() as conn:
+            cursor = await conn.execute(
+                'SELECT result FROM web_search_cache WHERE key = %s AND "expiresAt" > NOW()',
+                (key,),
+            )
+            row = await cursor.fetchone()
+        return row["result"] if row else None
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: float, jurisdiction: str, query: str, original_query: str) -> None:
+        # `query` is the normalized key text; the original wording is kept for the
+        # knowledge-pack builder, which classifies matter types from phrases.
+        async with connection() as conn:
+            await conn.execute('''
+                INSERT INTO web_search_cache (key, jurisdiction, query, "originalQuery", result, "createdAt", "expiresAt")
+                VALUES (%s, %s, %s, %s, %s, NOW(), NOW() + make_interval(secs => %s))
+                ON CONFLICT (key) DO UPDATE
+                SET "originalQuery" = EXCLUDED."originalQuery", result = EXCLUDED.result,
+                    "createdAt" = EXCLUDED."createdAt", "expiresAt" = EXCLUDED."expiresAt"
+            ''', (key, jurisdiction, query, original_query, Jsonb(value), ttl))
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                await conn.execute('DELETE FROM web_search_cache WHERE "expiresAt" <= NOW()')
+
+
+class WebSearch:
+    """Search front-end: key derivation, caching, single-flight and hit/miss metrics."""
+
+    def __init__(self, backend: Any, cache: Optional[Any], ttl_seconds: float):
+        self.backend = backend
+        self.cache = cache
+        self.ttl_seconds = ttl_seconds
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+        self._inflight: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+
+    @classmethod
+    def from_env(cls) -> "WebSearch":
+        backend: Any = StubSearchBackend() if WEB_SEARCH_BACKEND == "stub" else OpenAISearchBackend()
+        kind = os.environ.get("WEB_SEARCH_CACHE_BACKEND", "memory").lower()
+        if kind == "none":
+            cache: Optional[Any] = None
+        elif kind == "postgres":
+            cache = PostgresSearchCache()
+        else:
+            cache = MemorySearchCache(int(os.environ.get("WEB_SEARCH_CACHE_MAX_ENTRIES", "1024")))
+        return cls(
+            backend,
+            cache,
+            ttl_seconds=float(os.environ.get("WEB_SEARCH_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "searchBackend": WEB_SEARCH_BACKEND,
+            "cacheBackend": type(self.cache).__name__ if self.cache is not None else None,
+            "hitRate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+    async def search(self, query: str, jurisdiction: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Search result for `query`, from the cache when an equivalent search
+        for the same jurisdiction ran recently.
+
+        Returns:
+            Dict with "answer" (text) and "sources" (list of {title, url})
+        """
+        key, resolved, normalized = search_cache_key(query, jurisdiction)
+
+        if self.cache is not None:
+            try:
+                cached = await self.cache.get(key)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error("Web search cache read failed: %s", str(e), exc_info=True)
+                cached = None
+            if cached is not None:
+                self.stats["hits"] += 1
+                logger.info("🎯 Web search cache hit | jurisdiction=%s query=%r", resolved or "-", normalized)
+                return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(inflight)
+
+        self.stats["misses"] += 1
+        future: "asyncio.Future[Dict[str, Any]]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        started = time.perf_counter()
+        try:
+            result = await self.backend.search(query, resolved)
+            future.set_result(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        logger.info(
+            "🌐 Web search | jurisdiction=%s query=%r sources=%d duration=%.2fs",
+            resolved or "-", normalized, len(result.get("sources") or []), time.perf_counter() - started,
+        )
+
+        if self.cache is not None and str(result.get("answer") or "").strip():
+            try:
+                await self.cache.set(key, result, self.ttl_seconds, resolved, normalized, query)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error("Web search cache write failed: %s", str(e), exc_info=True)
+        return result
+
+
+web_search_client = WebSearch.from_env()
+
+
+@function_tool
+async def web_search(query: str, jurisdiction: Optional[str] = None) -> str:
+    """
+    Search the web for current legal information: statutes, statutes of
+    limitation, agency filing deadlines, case law and law firms.
+
+    Args:
+        query: What to search for, e.g. "employment retaliation statute of limitations"
+        jurisdiction: US state (name or two-letter code) or "federal", if the question is jurisdiction-specific
+
+    Returns:
+        Summary of the findings followed by source URLs
+    """
+    logger.info("🔧 TOOL: web_search | jurisdiction=%s query=%r", jurisdiction or "-", query)
+    try:
+        result = await web_search_client.search(query, jurisdiction)
+    except Exception as e:
+        logger.error("❌ Web search failed: %s", str(e), exc_info=True)
+        return f"Web search failed: {e}"
+    return format_result(result)
+
+
+def agent_search_tool() -> Any:
+    """Search tool to attach to an agent: the cached `web_search`, or the hosted tool when WEB_SEARCH_BACKEND=hosted."""
+    if WEB_SEARCH_BACKEND == "hosted":
+        return WebSearchTool()
+    return web_search
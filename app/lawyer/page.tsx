@@ -7,6 +7,7 @@ import { Button } from "@/components/ui/button";
 import { toast } from "sonner";
 import { LawyerChat } from "@/components/lawyer-chat";
 import { cn } from "@/lib/utils";
+import { fetchAllIntakes } from "@/lib/intakes";
 
 export default function LawyerPage() {
   const [intakeRecords, setIntakeRecords] = React.useState<IntakeRecord[]>([]);
@@ -24,21 +25,9 @@ export default function LawyerPage() {
     const loadIntakes = async () => {
       setIsLoadingIntakes(true);
       try {
-        const response = await fetch(`${backendUrl}/api/intakes`);
-        if (response.ok) {
-          const intakes = await response.json();
-          console.log("Loaded intakes:", intakes);
-          if (Array.isArray(intakes)) {
-            const validIntakes = intakes.filter(intake => intake && intake.form);
-            setIntakeRecords(validIntakes);
-          } else {
-            console.warn("Intakes data is not an array:", intakes);
-            setIntakeRecords([]);
-          }
-        } else {
-          console.error("Failed to load intakes:", response.status);
-          setIntakeRecords([]);
-        }
+        const intakes = await fetchAllIntakes(backendUrl);
+        console.log("Loaded intakes:", intakes.length);
+        setIntakeRecords(intakes);
       } catch (error) {
         console.error("Error loading intakes:", error);
         setIntakeRecords([]);
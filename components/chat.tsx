@@ -12,6 +12,7 @@ import { toast } from "sonner";
 import { Button } from "@/components/ui/button";
 import { Textarea } from "@/components/ui/textarea";
 import { cn } from "@/lib/utils";
+import { fetchAllIntakes } from "@/lib/intakes";
 import { motion } from "framer-motion";
 import { IntakePanel } from "@/components/intake-panel";
 import { OpenIntakesPanel } from "@/components/open-intakes-panel";
@@ -62,22 +63,9 @@ export function Chat() {
     const loadIntakes = async () => {
       setIsLoadingIntakes(true);
       try {
-        const response = await fetch(`${backendUrl}/api/intakes`);
-        if (response.ok) {
-          const intakes = await response.json();
-          console.log("Loaded intakes:", intakes); // Debug log
-          // Validate data
-          if (Array.isArray(intakes)) {
-            const validIntakes = intakes.filter(intake => intake && intake.form);
-            setIntakeRecords(validIntakes);
-          } else {
-            console.warn("Intakes data is not an array:", intakes);
-            setIntakeRecords([]);
-          }
-        } else {
-          console.error("Failed to load intakes:", response.status);
-          setIntakeRecords([]);
-        }
+        const intakes = await fetchAllIntakes(backendUrl);
+        console.log("Loaded intakes:", intakes.length);
+        setIntakeRecords(intakes);
       } catch (error) {
         console.error("Error loading intakes:", error);
         setIntakeRecords([]);
@@ -115,6 +103,10 @@ export function Chat() {
     openPanel("openIntakes");
   };
 
+  const handleIntakeUpdated = (record: IntakeRecord) => {
+    setIntakeRecords((prev) => prev.map((existing) => (existing.id === record.id ? record : existing)));
+  };
+
   const handleDeleteIntake = (id: string) => {
     setIntakeRecords((prev) => prev.filter((record) => record.id !== id));
   };
@@ -300,7 +292,7 @@ export function Chat() {
 
           <div className="flex-1 overflow-y-auto">
             {splitScreenMode === "intake" && (
-              <IntakePanel onIntakeSubmitted={handleIntakeSubmitted} />
+              <IntakePanel onIntakeSubmitted={handleIntakeSubmitted} onIntakeUpdated={handleIntakeUpdated} />
             )}
             {splitScreenMode === "openIntakes" && (
               <OpenIntakesPanel
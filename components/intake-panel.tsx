@@ -4,10 +4,16 @@ import { Button } from "@/components/ui/button";
 import { Textarea } from "@/components/ui/textarea";
 import { IntakeRecord } from "@/types/intake";
 
+// Analysis runs in the background after submit; poll until it settles.
+const ANALYSIS_POLL_INTERVAL_MS = 3000;
+const ANALYSIS_POLL_MAX_ATTEMPTS = 100;
+
 function IntakePanel({
   onIntakeSubmitted,
+  onIntakeUpdated,
 }: {
   onIntakeSubmitted: (record: IntakeRecord) => void;
+  onIntakeUpdated?: (record: IntakeRecord) => void;
 }) {
   const [formData, setFormData] = React.useState({
     fullName: "",
@@ -18,6 +24,7 @@ function IntakePanel({
     summary: "",
     goals: "",
     urgency: "",
+    incidentDate: "",
   });
   const [shareWithMarketplace, setShareWithMarketplace] = React.useState(true);
   const [consent, setConsent] = React.useState(false);
@@ -41,6 +48,56 @@ function IntakePanel({
     ? "http://127.0.0.1:8000"
     : process.env.RAILWAY_URL || "https://law-ai-production-01cd.up.railway.app";
 
+  const analysisPending =
+    submittedIntake?.analysisStatus === "pending" || submittedIntake?.analysisStatus === "running";
+  const analysisFailed = submittedIntake?.analysisStatus === "failed";
+
+  React.useEffect(() => {
+    if (!submittedIntake || !analysisPending) {
+      return;
+    }
+    const intakeId = submittedIntake.id;
+    let cancelled = false;
+    let attempts = 0;
+    let timer: ReturnType<typeof setTimeout>;
+
+    const poll = async () => {
+      attempts += 1;
+      try {
+        const response = await fetch(`${backendUrl}/api/intakes/${intakeId}/analysis`);
+        if (response.ok) {
+          const status = await response.json();
+          if (cancelled) return;
+          if (status.status === "completed" && status.intake) {
+            const record: IntakeRecord = status.intake;
+            setSubmittedIntake(record);
+            onIntakeUpdated?.(record);
+            if (record.aiScore != null) {
+              toast.success(`AI Case Strength Score: ${record.aiScore}/100`, { duration: 5000 });
+            }
+            return;
+          }
+          if (status.status === "failed") {
+            setSubmittedIntake((prev) => (prev && prev.id === intakeId ? { ...prev, analysisStatus: "failed" } : prev));
+            return;
+          }
+        }
+      } catch (error) {
+        console.error("Error polling intake analysis:", error);
+      }
+      if (!cancelled && attempts < ANALYSIS_POLL_MAX_ATTEMPTS) {
+        timer = setTimeout(poll, ANALYSIS_POLL_INTERVAL_MS);
+      }
+    };
+
+    timer = setTimeout(poll, ANALYSIS_POLL_INTERVAL_MS);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [submittedIntake?.id, analysisPending, backendUrl]);
+
   const handleSubmit: React.FormEventHandler<HTMLFormElement> = async (event) => {
     event.preventDefault();
     setIsSubmitting(true);
@@ -69,16 +126,17 @@ function IntakePanel({
       onIntakeSubmitted(record);
       
       // Show appropriate toast based on AI analysis
-      if (record.aiScore !== undefined) {
+      if (record.aiScore != null) {
         toast.success(
           `Intake submitted! AI Case Strength Score: ${record.aiScore}/100`,
           { duration: 5000 }
         );
       } else {
+        const running = record.analysisStatus === "pending" || record.analysisStatus === "running";
         toast.success(
-          shareWithMarketplace
+          (shareWithMarketplace
             ? "Your intake is ready to share with matched firms."
-            : "Your intake has been saved."
+            : "Your intake has been saved.") + (running ? " AI analysis is running." : "")
         );
       }
       
@@ -92,6 +150,7 @@ function IntakePanel({
         summary: "",
         goals: "",
         urgency: "",
+        incidentDate: "",
       });
       setConsent(false);
       setShareWithMarketplace(true);
@@ -172,7 +231,16 @@ function IntakePanel({
                 className="w-full rounded-md border border-input bg-background px-3 py-2 text-sm shadow-sm focus-visible:outline-none focus-visible:ring-2 focus-visible:ring-primary/60"
               />
             </label>
-            <label className="flex flex-col gap-2 md:col-span-2">
+            <label className="flex flex-col gap-2">
+              <span className="text-sm font-medium text-foreground">Incident date</span>
+              <input
+                type="date"
+                value={formData.incidentDate}
+                onChange={handleChange("incidentDate")}
+                className="w-full rounded-md border border-input bg-background px-3 py-2 text-sm shadow-sm focus-visible:outline-none focus-visible:ring-2 focus-visible:ring-primary/60"
+              />
+            </label>
+            <label className="flex flex-col gap-2">
               <span className="text-sm font-medium text-foreground">Matter type</span>
               <select
                 value={formData.matterType}
@@ -266,10 +334,22 @@ function IntakePanel({
               </p>
             )}
           </div>
+          <div>
+            {analysisPending && (
+              <p className="text-sm text-muted-foreground">
+                Analyzing your case&hellip; the AI assessment will appear here in a minute or two.
+              </p>
+            )}
+            {analysisFailed && (
+              <p className="text-sm text-destructive">
+                The AI assessment could not be completed. Your intake was still saved.
+              </p>
+            )}
+          </div>
         </form>
 
         {/* AI Assessment Results */}
-        {submittedIntake && submittedIntake.aiScore !== undefined && (
+        {submittedIntake && submittedIntake.aiScore != null && (
           <div className="mt-8 space-y-6 rounded-lg border-2 border-primary/20 bg-primary/5 p-6">
             <div className="space-y-2">
               <h3 className="text-2xl font-bold text-foreground flex items-center gap-2">
@@ -0,0 +1,27 @@
+import { IntakeRecord } from "@/types/intake";
+
+// Largest page the backend serves (MAX_PAGE_SIZE in api/intake_store.py).
+const INTAKE_PAGE_SIZE = 500;
+
+// GET /api/intakes is paginated; follow X-Next-Cursor until the last page.
+export async function fetchAllIntakes(backendUrl: string): Promise<IntakeRecord[]> {
+  const records: IntakeRecord[] = [];
+  let cursor: string | null = null;
+  do {
+    const params = new URLSearchParams({ limit: String(INTAKE_PAGE_SIZE) });
+    if (cursor) {
+      params.set("cursor", cursor);
+    }
+    const response = await fetch(`${backendUrl}/api/intakes?${params.toString()}`);
+    if (!response.ok) {
+      throw new Error(`Failed to load intakes: ${response.status}`);
+    }
+    const page = await response.json();
+    if (!Array.isArray(page)) {
+      throw new Error("Intakes data is not an array");
+    }
+    records.push(...page.filter((intake) => intake && intake.form));
+    cursor = response.headers.get("X-Next-Cursor");
+  } while (cursor);
+  return records;
+}
@@ -0,0 +1,11 @@
+-- CreateIndex
+CREATE INDEX "intakes_submittedAt_id_idx" ON "intakes"("submittedAt" DESC, "id" DESC);
+
+-- CreateIndex
+CREATE INDEX "intakes_matterType_submittedAt_id_idx" ON "intakes"("matterType", "submittedAt" DESC, "id" DESC);
+
+-- CreateIndex
+CREATE INDEX "intakes_jurisdiction_submittedAt_id_idx" ON "intakes"("jurisdiction", "submittedAt" DESC, "id" DESC);
+
+-- CreateIndex
+CREATE INDEX "intakes_aiScore_idx" ON "intakes"("aiScore");
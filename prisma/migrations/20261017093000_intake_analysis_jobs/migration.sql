@@ -0,0 +1,8 @@
+-- AlterTable
+ALTER TABLE "intakes" ADD COLUMN "analysisStatus" TEXT NOT NULL DEFAULT 'completed',
+ADD COLUMN "analysisAttempts" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN "analysisError" TEXT,
+ADD COLUMN "analysisUpdatedAt" TIMESTAMP(3);
+
+-- CreateIndex
+CREATE INDEX "intakes_analysisStatus_idx" ON "intakes"("analysisStatus");
@@ -0,0 +1,12 @@
+-- CreateTable
+CREATE TABLE "intake_analysis_cache" (
+    "key" TEXT NOT NULL,
+    "analysis" JSONB NOT NULL,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "expiresAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "intake_analysis_cache_pkey" PRIMARY KEY ("key")
+);
+
+-- CreateIndex
+CREATE INDEX "intake_analysis_cache_expiresAt_idx" ON "intake_analysis_cache"("expiresAt");
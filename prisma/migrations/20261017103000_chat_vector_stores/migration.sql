@@ -0,0 +1,15 @@
+-- CreateTable
+CREATE TABLE "chat_vector_stores" (
+    "chatId" TEXT NOT NULL,
+    "vectorStoreId" TEXT NOT NULL,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "lastUsedAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT "chat_vector_stores_pkey" PRIMARY KEY ("chatId")
+);
+
+-- CreateIndex
+CREATE UNIQUE INDEX "chat_vector_stores_vectorStoreId_key" ON "chat_vector_stores"("vectorStoreId");
+
+-- CreateIndex
+CREATE INDEX "chat_vector_stores_lastUsedAt_idx" ON "chat_vector_stores"("lastUsedAt");
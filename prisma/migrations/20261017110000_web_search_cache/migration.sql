@@ -0,0 +1,17 @@
+-- CreateTable
+CREATE TABLE "web_search_cache" (
+    "key" TEXT NOT NULL,
+    "jurisdiction" TEXT NOT NULL,
+    "query" TEXT NOT NULL,
+    "result" JSONB NOT NULL,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "expiresAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "web_search_cache_pkey" PRIMARY KEY ("key")
+);
+
+-- CreateIndex
+CREATE INDEX "web_search_cache_expiresAt_idx" ON "web_search_cache"("expiresAt");
+
+-- CreateIndex
+CREATE INDEX "web_search_cache_jurisdiction_idx" ON "web_search_cache"("jurisdiction");
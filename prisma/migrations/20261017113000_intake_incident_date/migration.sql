@@ -0,0 +1,5 @@
+-- AlterTable
+ALTER TABLE "intakes" ADD COLUMN "incidentDate" DATE;
+
+-- CreateIndex
+CREATE INDEX "intakes_incidentDate_idx" ON "intakes"("incidentDate");
@@ -0,0 +1,2 @@
+-- AlterTable
+ALTER TABLE "web_search_cache" ADD COLUMN "originalQuery" TEXT;
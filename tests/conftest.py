@@ -0,0 +1,4 @@
+import os
+
+# Modules that build an AsyncOpenAI client at import time need a key; no test calls the API.
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
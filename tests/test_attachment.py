@@ -0,0 +1,60 @@
+import time
+
+from api.utils.attachment import ClientAttachment, from_client_attachment, split_file_markers
+
+
+def test_plain_text_passes_through():
+    assert split_file_markers("no markers here") == ["no markers here"]
+    assert split_file_markers("") == []
+
+
+def test_url_and_inline_markers_split_in_order():
+    text = (
+        "See [File: contract v2.pdf (application/pdf) - URL: https://blob.example/c.pdf] and "
+        "[File: scan.png (image/png) - Content: data:image/png;base64,iVBORw0KGgo=] thanks"
+    )
+    assert split_file_markers(text) == [
+        "See ",
+        {"name": "contract v2.pdf", "type": "application/pdf", "url": "https://blob.example/c.pdf"},
+        " and ",
+        {"name": "scan.png", "type": "image/png", "content": "data:image/png;base64,iVBORw0KGgo="},
+        " thanks",
+    ]
+
+
+def test_malformed_markers_stay_text():
+    no_type = "[File: notes.txt - URL: https://x/y] tail"
+    assert split_file_markers(no_type) == [no_type]
+    spaced_url = "[File: a.txt (text/plain) - URL: two words] tail"
+    assert split_file_markers(spaced_url) == [spaced_url]
+
+
+def test_unclosed_inline_marker_does_not_swallow_next_marker():
+    text = (
+        "[File: a.txt (text/plain) - Content: abc user typed this "
+        "[File: b.txt (text/plain) - URL: https://x/b]"
+    )
+    segments = split_file_markers(text)
+    assert segments[-1] == {"name": "b.txt", "type": "text/plain", "url": "https://x/b"}
+    assert isinstance(segments[0], str) and segments[0].startswith("[File: a.txt")
+
+
+def test_unterminated_marker_ends_scan():
+    text = "before [File: a.txt (text/plain) - URL: https://x/a"
+    assert split_file_markers(text) == [text]
+
+
+def test_many_large_markers_scan_linearly():
+    payload = "A" * 200_000
+    text = "".join(f"[File: f{n}.bin (application/octet-stream) - Content: {payload}] " for n in range(20))
+    started = time.perf_counter()
+    segments = split_file_markers(text)
+    assert time.perf_counter() - started < 2
+    assert sum(isinstance(s, dict) for s in segments) == 20
+
+
+def test_from_client_attachment_inlines_data_urls():
+    blob = ClientAttachment(name="a.pdf", contentType="application/pdf", url="https://blob/a.pdf")
+    inline = ClientAttachment(name="b.txt", contentType="text/plain", url="data:text/plain;base64,aGk=")
+    assert from_client_attachment(blob) == {"name": "a.pdf", "type": "application/pdf", "url": "https://blob/a.pdf"}
+    assert from_client_attachment(inline)["content"] == "data:text/plain;base64,aGk="
@@ -0,0 +1,61 @@
+import threading
+
+from api.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def test_tokenize_keeps_identifiers_and_drops_stopwords():
+    assert tokenize("What is Labor Code 1102.5 and 12940-h of the U.S.C?") == [
+        "labor", "code", "1102.5", "12940-h", "u.s.c",
+    ]
+
+
+def test_search_ranks_exact_identifier_first():
+    index = BM25Index()
+    index.add_many([
+        ("a", "Retaliation claims under Labor Code section 1102.5 protect whistleblowers."),
+        ("b", "Section 1102 covers political activity of employees."),
+        ("c", "Wage statements must list hours worked."),
+    ])
+    hits = index.search("1102.5 retaliation", k=2)
+    assert hits[0][0] == "a"
+    assert all(doc_id != "c" for doc_id, _ in hits)
+
+
+def test_search_empty_index_and_unknown_terms():
+    index = BM25Index()
+    assert index.search("anything") == []
+    index.add("a", "wage theft")
+    assert index.search("unrelated") == []
+
+
+def test_extend_to_indexes_only_new_items_once():
+    records = [{"text": f"document {n} wage"} for n in range(200)]
+    index = BM25Index()
+    threads = [
+        threading.Thread(target=index.extend_to, args=(records,), kwargs={"text": lambda r: r["text"]})
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(index) == 200
+    assert index.doc_ids == [str(n) for n in range(200)]
+
+    records.append({"text": "late arrival"})
+    index.extend_to(records, text=lambda r: r["text"])
+    assert index.search("late arrival", k=1)[0][0] == "200"
+
+
+def test_rrf_rewards_agreement_and_dedupes_by_key():
+    dense = [{"id": "x", "src": "dense"}, {"id": "y", "src": "dense"}]
+    lexical = [{"id": "y", "src": "lexical"}, {"id": "z", "src": "lexical"}]
+    fused = reciprocal_rank_fusion([dense, lexical], key=lambda item: item["id"], limit=2)
+    assert [item["id"] for item, _ in fused] == ["y", "x"]
+    # The first list's item represents a key seen in both lists.
+    assert fused[0][0]["src"] == "dense"
+    assert fused[0][1] == 1 / 62 + 1 / 61
+
+
+def test_rrf_empty():
+    assert reciprocal_rank_fusion([[], []]) == []
@@ -0,0 +1,51 @@
+from api.context_assembler import assemble_context, count_tokens
+from api.rag_chunks import SearchHit
+
+FILLER = " ".join(f"The employer kept record number {n} on file for audit." for n in range(60))
+
+
+def _hit(filename, score, text, n=0):
+    return SearchHit(filename=filename, score=score, text=text, chunk_id=f"{filename}:{n}")
+
+
+def test_orders_by_score_and_reports_sources():
+    context, report = assemble_context(
+        [_hit("low.pdf", 0.2, "Low ranked note."), _hit("high.pdf", 0.9, "High ranked note.")],
+        budget=500,
+    )
+    assert context.index("high.pdf") < context.index("low.pdf")
+    assert report.included == 2
+    assert set(report.by_source) == {"low.pdf", "high.pdf"}
+    assert report.used == sum(report.by_source.values())
+
+
+def test_stays_within_budget_and_truncates_at_sentences():
+    hits = [_hit("a.pdf", 0.9, FILLER, 0), _hit("b.pdf", 0.8, FILLER + " More.", 1)]
+    context, report = assemble_context(hits, budget=120)
+    assert report.used <= 120
+    assert count_tokens(context) <= 120
+    assert report.truncated == 1
+    assert report.over_budget == 1
+    assert context.rstrip().endswith(".")
+
+
+def test_drops_exact_repeats_and_inlined_duplicates():
+    inlined = "Attachment text: " + FILLER
+    hits = [
+        _hit("a.pdf", 0.9, FILLER, 0),
+        _hit("a.pdf", 0.8, "Unrelated wage statement details for the claimant.", 1),
+        _hit("b.pdf", 0.7, "Unrelated wage statement details for the claimant.", 2),
+    ]
+    context, report = assemble_context(hits, inlined_texts=[inlined], budget=2000)
+    assert report.duplicates == 1
+    assert report.included == 1
+    assert context.count("Unrelated wage statement") == 1
+    assert report.inlined_tokens == count_tokens(inlined)
+
+
+def test_zero_budget_and_no_hits():
+    assert assemble_context([], budget=100)[0] == ""
+    context, report = assemble_context([_hit("a.pdf", 1.0, "Short.")], budget=0)
+    assert context == ""
+    assert report.over_budget == 1
+    assert report.as_dict()["overBudget"] == 1
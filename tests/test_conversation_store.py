@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import pytest
+
+from api.chat_agents.conversation_store import ConversationStore, UnknownConversationError, message_hash
+
+
+def _msg(role, content, attachments=None):
+    return {"role": role, "content": content, "attachments": attachments or []}
+
+
+class Recorder:
+    """Converter that records which messages it was asked to convert."""
+
+    def __init__(self, uncacheable=()):
+        self.calls = []
+        self.uncacheable = set(uncacheable)
+
+    async def __call__(self, message):
+        self.calls.append(message["content"])
+        return {"role": message["role"], "content": message["content"].upper()}, message["content"] not in self.uncacheable
+
+
+def _agent_messages(store, conversation, convert):
+    return asyncio.run(store.agent_messages(conversation, convert))
+
+
+def test_message_hash_covers_role_content_and_attachments():
+    base = _msg("user", "hi")
+    assert message_hash(base) == message_hash(dict(base))
+    assert message_hash(base) != message_hash(_msg("assistant", "hi"))
+    assert message_hash(base) != message_hash(_msg("user", "hi", [{"name": "a.pdf", "url": "u"}]))
+    assert message_hash({"role": "user", "content": "hi"}) == message_hash(base)
+
+
+def test_only_new_or_edited_messages_are_converted():
+    store, convert = ConversationStore(), Recorder()
+    conversation = store.replace("chat", [_msg("user", "one"), _msg("assistant", "two")])
+    assert _agent_messages(store, conversation, convert) == [
+        {"role": "user", "content": "ONE"}, {"role": "assistant", "content": "TWO"},
+    ]
+
+    conversation = store.replace("chat", [_msg("user", "one"), _msg("assistant", "edited"), _msg("user", "three")])
+    _agent_messages(store, conversation, convert)
+    assert convert.calls == ["one", "two", "edited", "three"]
+    assert store.stats == {"converted": 4, "reused": 1}
+
+    # A shorter history (regenerated reply) drops the stale tail.
+    conversation = store.replace("chat", [_msg("user", "one")])
+    assert _agent_messages(store, conversation, convert) == [{"role": "user", "content": "ONE"}]
+    assert len(conversation.converted) == 1
+
+
+def test_returned_list_is_a_copy():
+    store, convert = ConversationStore(), Recorder()
+    conversation = store.replace("chat", [_msg("user", "one")])
+    _agent_messages(store, conversation, convert).append({"role": "user", "content": "extra"})
+    assert len(_agent_messages(store, conversation, convert)) == 1
+
+
+def test_uncacheable_conversions_are_retried():
+    store, convert = ConversationStore(), Recorder(uncacheable={"scan"})
+    conversation = store.replace("chat", [_msg("user", "scan"), _msg("user", "text")])
+    _agent_messages(store, conversation, convert)
+    _agent_messages(store, conversation, convert)
+    assert convert.calls == ["scan", "text", "scan"]
+
+
+def test_delta_extends_known_chat_and_records_reply():
+    store, convert = ConversationStore(), Recorder()
+    store.replace("chat", [_msg("user", "one")])
+    store.append_reply("chat", "answer")
+    store.append_reply("chat", "")
+    conversation = store.extend("chat", [_msg("user", "two")])
+    assert [m["content"] for m in conversation.messages] == ["one", "answer", "two"]
+    assert [m["content"] for m in _agent_messages(store, conversation, convert)] == ["ONE", "ANSWER", "TWO"]
+
+    with pytest.raises(UnknownConversationError):
+        store.extend("other", [_msg("user", "hi")])
+    store.append_reply("other", "ignored")
+    assert store.get("other") is None
+
+
+def test_lru_bound_and_idle_expiry(monkeypatch):
+    store = ConversationStore(max_chats=2, ttl_seconds=60)
+    for chat_id in ("a", "b"):
+        store.replace(chat_id, [])
+    store.get("a")
+    store.replace("c", [])
+    assert store.get("b") is None
+    assert store.get("a") is not None
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+    assert store.get("a") is None
+    with pytest.raises(UnknownConversationError):
+        store.extend("c", [])
@@ -0,0 +1,118 @@
+from datetime import date, datetime
+
+import pytest
+
+from api.deadlines import (
+    APPROACHING,
+    EXPIRED,
+    OPEN,
+    PENDING_TRIGGER,
+    URGENT,
+    add_period,
+    compute_deadlines,
+    format_deadlines,
+    parse_date,
+    sweep_deadlines,
+)
+
+TODAY = date(2026, 10, 17)
+
+
+@pytest.mark.parametrize("start, period, expected", [
+    (date(2024, 2, 29), {"years": 1}, date(2025, 2, 28)),
+    (date(2024, 2, 29), {"years": 4}, date(2028, 2, 29)),
+    (date(2024, 1, 31), {"months": 1}, date(2024, 2, 29)),
+    (date(2023, 1, 31), {"months": 1}, date(2023, 2, 28)),
+    (date(2025, 8, 31), {"months": 6}, date(2026, 2, 28)),
+    (date(2025, 11, 15), {"months": 14}, date(2027, 1, 15)),
+    (date(2025, 12, 31), {"days": 1}, date(2026, 1, 1)),
+    (date(2024, 11, 1), {"years": 2}, date(2026, 11, 1)),
+])
+def test_add_period(start, period, expected):
+    assert add_period(start, **period) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2025-03-05", date(2025, 3, 5)),
+    ("2025-03-05T14:30:00", date(2025, 3, 5)),
+    ("03/05/2025", date(2025, 3, 5)),
+    ("3/5/25", date(2025, 3, 5)),
+    ("March 5, 2025", date(2025, 3, 5)),
+    ("Mar 5, 2025", date(2025, 3, 5)),
+    (datetime(2025, 3, 5, 9), date(2025, 3, 5)),
+    ("last spring", None),
+    ("", None),
+    (None, None),
+])
+def test_parse_date(value, expected):
+    assert parse_date(value) == expected
+
+
+def _by_id(deadlines):
+    return {d.rule.id: d for d in deadlines}
+
+
+def test_compute_deadlines_statuses_and_order():
+    deadlines = compute_deadlines("2024-11-01", "Los Angeles, CA", "personal injury", today=TODAY)
+    assert [d.rule.id for d in deadlines] == ["gov-claim", "pi-suit", "ftca-claim", "med-mal"]
+    found = _by_id(deadlines)
+    assert (found["gov-claim"].status, found["gov-claim"].days_remaining) == (EXPIRED, -534)
+    assert (found["pi-suit"].due, found["pi-suit"].status, found["pi-suit"].days_remaining) == (date(2026, 11, 1), URGENT, 15)
+    assert found["med-mal"].status == OPEN
+
+
+@pytest.mark.parametrize("today, status", [
+    (date(2026, 11, 1), URGENT),
+    (date(2026, 11, 2), EXPIRED),
+    (date(2026, 10, 2), URGENT),
+    (date(2026, 10, 1), APPROACHING),
+    (date(2026, 8, 3), APPROACHING),
+    (date(2026, 8, 2), OPEN),
+])
+def test_status_boundaries(today, status):
+    assert _by_id(compute_deadlines("2024-11-01", "CA", "personal injury", today=today))["pi-suit"].status == status
+
+
+def test_non_incident_triggers_and_missing_dates_are_pending():
+    employment = compute_deadlines("2026-06-01", "Ohio", "employment", today=TODAY)
+    assert employment[-1].rule.id == "eeoc-suit"
+    assert employment[-1].status == PENDING_TRIGGER and employment[-1].due is None
+    assert {d.status for d in compute_deadlines(None, "CA", "personal injury", today=TODAY)} == {PENDING_TRIGGER}
+    assert compute_deadlines("2026-06-01", "CA", "unknown matter", today=TODAY) == []
+
+
+def test_format_deadlines():
+    text = format_deadlines(compute_deadlines("2024-11-01", "CA", "personal injury", today=TODAY))
+    lines = text.splitlines()
+    assert lines[0].startswith("- ") and "EXPIRED 2025-05-01 (534 days ago)" in lines[0]
+    assert "[only if public entity defendant]" in lines[0]
+    assert "2026-11-01 (15 days left, urgent)" in lines[1]
+    pending = format_deadlines(compute_deadlines(None, "federal", "employment", today=TODAY))
+    assert "90 days from right to sue" in pending
+
+
+def _intake(intake_id, incident, matter="personal injury", jurisdiction="CA"):
+    return {"id": intake_id, "fullName": "Pat Doe", "jurisdiction": jurisdiction, "matterType": matter, "incidentDate": incident}
+
+
+def test_sweep_excludes_conditional_rules_from_hits():
+    intakes = [
+        _intake("due-soon", datetime(2024, 11, 1)),
+        # Only the conditional government claim falls in the window.
+        _intake("conditional-only", "2026-06-01"),
+        _intake("no-date", None),
+    ]
+    flagged = sweep_deadlines(intakes, within_days=90, today=TODAY)
+    assert [item["id"] for item in flagged] == ["due-soon"]
+    item = flagged[0]
+    assert item["incidentDate"] == "2024-11-01" and item["nextDue"] == "2026-11-01"
+    assert [d["id"] for d in item["deadlines"]] == ["pi-suit"]
+    assert [d["id"] for d in item["conditionalDeadlines"]] == ["ftca-claim"]
+
+
+def test_sweep_expired_and_ordering():
+    intakes = [_intake("later", "2024-12-20"), _intake("old", "2020-01-01"), _intake("sooner", "2024-11-01")]
+    assert [i["id"] for i in sweep_deadlines(intakes, within_days=90, today=TODAY)] == ["sooner", "later"]
+    with_expired = sweep_deadlines(intakes, within_days=90, include_expired=True, today=TODAY)
+    assert [i["id"] for i in with_expired] == ["old", "sooner", "later"]
+    assert with_expired[0]["deadlines"][0]["status"] == EXPIRED
@@ -0,0 +1,67 @@
+import json
+import time
+
+import pytest
+
+from api.chat_agents.response_cache import REPLAY_CHUNK_CHARS, ResponseCache, replay_frames
+from api.chat_agents.router import FAQ, ORCHESTRATOR, Route, match_faq
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Tell me about Yasser!", "tell me about yasser"),
+    ("tell me about yasser please", "tell me about yasser"),
+    ("How can I reduce hallucinations??", "how can i reduce hallucinations"),
+    ("why hire yasser", "why hire yasser"),
+    ("why not hire yasser", None),
+    ("don't hire yasser", None),
+    ("who is yasser", None),
+    ("how do I reduce my rent", None),
+    ("", None),
+])
+def test_match_faq(text, expected):
+    assert match_faq(text) == expected
+
+
+def test_key_only_for_first_turn_faq_without_attachments():
+    route = Route(FAQ, "faq prompt", faq="why hire yasser")
+    opener = [{"role": "user", "content": "Why hire Yasser?", "attachments": []}]
+    assert ResponseCache.key_for(route, opener, "") == ("why hire yasser", "default")
+    assert ResponseCache.key_for(route, opener, "lawyer") == ("why hire yasser", "lawyer")
+    assert ResponseCache.key_for(route, opener * 2, "default") is None
+    attached = [dict(opener[0], attachments=[{"name": "a.pdf"}])]
+    assert ResponseCache.key_for(route, attached, "default") is None
+    assert ResponseCache.key_for(Route(ORCHESTRATOR, "x"), opener, "default") is None
+
+
+def test_version_change_invalidates_entry():
+    cache = ResponseCache(ttl_seconds=60, max_entries=8)
+    key = ("why hire yasser", "default")
+    cache.put(key, "v1", "Because.")
+    assert cache.get(key, "v1") == "Because."
+    assert cache.get(key, "v2") is None
+    assert cache.get(key, "v1") is None
+    assert cache.stats == {"hits": 1, "misses": 1, "invalidated": 1}
+
+
+def test_blank_answers_ttl_and_lru(monkeypatch):
+    cache = ResponseCache(ttl_seconds=60, max_entries=2)
+    cache.put(("a", "default"), "v", "   ")
+    assert cache.get(("a", "default"), "v") is None
+    for prompt in "abc":
+        cache.put((prompt, "default"), "v", prompt)
+    assert cache.get(("a", "default"), "v") is None
+    assert cache.get(("c", "default"), "v") == "c"
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+    assert cache.get(("c", "default"), "v") is None
+
+
+def test_replay_frames_round_trip():
+    text = "é\"quoted\"\n" + "x" * (REPLAY_CHUNK_CHARS * 2)
+    frames = list(replay_frames(text))
+    assert len(frames) == 4
+    assert all(frame.endswith("\n") for frame in frames)
+    assert "".join(json.loads(frame[2:]) for frame in frames[:-1]) == text
+    assert frames[-1].startswith("e:")
+    assert json.loads(frames[-1][2:])["finishReason"] == "stop"
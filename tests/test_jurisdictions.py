@@ -0,0 +1,26 @@
+import pytest
+
+from api.jurisdictions import FEDERAL, normalize_jurisdiction
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("CA", "CA"),
+    ("n.y.", "NY"),
+    ("us", FEDERAL),
+    ("San Diego, California", "CA"),
+    ("Austin, TX", "TX"),
+    ("Charleston, West Virginia", "WV"),
+    ("Richmond, Virginia", "VA"),
+    ("Seattle, Washington", "WA"),
+    ("Washington DC", "DC"),
+    ("Washington, D.C.", "DC"),
+    ("dc", "DC"),
+    ("District of Columbia", "DC"),
+    ("Title VII claim", FEDERAL),
+    ("Dc metro", None),
+    ("Meet me in or near the office", None),
+    ("", None),
+    (None, None),
+])
+def test_normalize_jurisdiction(value, expected):
+    assert normalize_jurisdiction(value) == expected
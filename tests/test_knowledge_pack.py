@@ -0,0 +1,99 @@
+import json
+import os
+
+from api.knowledge_pack import KnowledgePack, build_pack, format_entry, format_period
+
+PACK = {
+    "version": "v1",
+    "entries": [
+        {
+            "jurisdiction": "US", "matterType": "employment", "statutes": [],
+            "deadlines": [{"id": "eeoc-charge", "label": "Federal EEOC"}, {"id": "flsa-wages", "label": "FLSA"}],
+            "notes": ["federal note"], "sources": [{"url": "https://eeoc.gov"}],
+        },
+        {
+            "jurisdiction": "CA", "matterType": "employment", "statutes": [],
+            "deadlines": [{"id": "eeoc-charge", "label": "CA EEOC"}, {"id": "feha-crd", "label": "FEHA"}],
+            "notes": ["state note"], "sources": [{"url": "https://eeoc.gov"}, {"url": "https://calcivilrights.ca.gov"}],
+        },
+        {"jurisdiction": "US", "matterType": "immigration law", "statutes": [], "deadlines": [], "notes": [], "sources": []},
+    ],
+}
+
+
+def _pack(tmp_path, pack=PACK):
+    path = tmp_path / "pack.json"
+    path.write_text(json.dumps(pack))
+    return KnowledgePack(str(path))
+
+
+def test_state_entry_merges_federal_without_duplicate_deadlines(tmp_path):
+    entry = _pack(tmp_path).lookup("San Francisco, California", "Employment")
+    assert entry["jurisdiction"] == "CA" and entry["covered"]
+    assert [d["label"] for d in entry["deadlines"]] == ["CA EEOC", "FEHA", "FLSA"]
+    assert entry["notes"] == ["state note", "federal note"]
+    assert [s["url"] for s in entry["sources"]] == ["https://eeoc.gov", "https://calcivilrights.ca.gov"]
+
+
+def test_coverage_flag(tmp_path):
+    pack = _pack(tmp_path)
+    ohio = pack.lookup("Ohio", "employment")
+    assert ohio["jurisdiction"] == "OH" and not ohio["covered"]
+    assert "federal rules only" in format_entry(ohio, include_deadlines=False)
+    # Federal-only areas and explicit federal lookups count as covered.
+    assert pack.lookup("OH", "immigration law")["covered"]
+    assert pack.lookup("federal", "employment")["covered"]
+    assert pack.lookup("Nowhere", "employment")["jurisdiction"] == "US"
+    assert pack.lookup("CA", "family law") is None
+
+
+def test_reloads_when_file_changes_and_keeps_last_good_pack(tmp_path):
+    pack = _pack(tmp_path)
+    assert pack.lookup("CA", "employment") is not None
+    path = tmp_path / "pack.json"
+    path.write_text(json.dumps({"version": "v2", "entries": []}))
+    os.utime(path, (1, 1))
+    assert pack.lookup("CA", "employment") is None and pack.version == "v2"
+    path.write_text("{ half written")
+    os.utime(path, (2, 2))
+    assert pack.version == "v2"
+
+
+def test_build_pack_classifies_by_original_query():
+    original = "Family law rules for moving out of state with children in California"
+    research = [
+        {"jurisdiction": "CA", "query": "family rule moving out children",
+         "originalQuery": original, "result": {"answer": "Move-away orders...", "sources": [{"url": "https://courts.ca.gov"}]}},
+        # Same search twice, an empty answer and an unknown matter type add nothing.
+        {"jurisdiction": "CA", "query": "x", "originalQuery": original, "result": {"answer": "Again"}},
+        {"jurisdiction": "CA", "query": "custody", "result": {"answer": "  "}},
+        {"jurisdiction": "CA", "query": "zoning variance", "result": {"answer": "Zoning..."}},
+    ]
+    built = build_pack({"entries": []}, research)
+    assert [(e["jurisdiction"], e["matterType"]) for e in built["entries"]] == [("CA", "family law")]
+    entry = built["entries"][0]
+    assert [r["query"] for r in entry["research"]] == [original]
+    assert entry["sources"] == [{"url": "https://courts.ca.gov"}]
+
+    # Without originalQuery the normalized key text has no matter-type phrase.
+    assert build_pack({"entries": []}, [dict(research[0], originalQuery=None)])["entries"] == []
+
+
+def test_build_pack_caps_research_and_versions_by_content():
+    research = [
+        {"jurisdiction": "TX", "query": f"wrongful termination question {n}", "result": {"answer": "a" * 2000}}
+        for n in range(8)
+    ]
+    first = build_pack(PACK, research, max_research=3)
+    tx = next(e for e in first["entries"] if e["jurisdiction"] == "TX")
+    assert len(tx["research"]) == 3
+    assert len(tx["research"][0]["summary"]) == 800
+    assert first["entries"][0]["jurisdiction"] == "US"
+    assert all("research" not in e for e in first["entries"] if e["jurisdiction"] != "TX")
+    assert build_pack(PACK, research, max_research=3)["version"] == first["version"]
+    assert build_pack(PACK, research[:1])["version"] != first["version"]
+
+
+def test_format_period():
+    assert format_period({"years": 1, "months": 6}) == "1 year 6 months"
+    assert format_period({"days": 180}) == "180 days"
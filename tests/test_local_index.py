@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from api import local_index
+from api.local_index import LocalIndex, LocalVectorIndexBackend, hashing_embedder
+
+
+def _embed(texts):
+    return asyncio.run(hashing_embedder()(texts))
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    vectors = _embed(["wage theft claim", "wage theft claim", ""])
+    assert np.allclose(vectors[0], vectors[1])
+    assert np.isclose(np.linalg.norm(vectors[0]), 1.0)
+    assert not vectors[2].any()
+
+
+def test_append_counts_rows_written_by_another_instance(tmp_path):
+    first, second = LocalIndex(str(tmp_path)), LocalIndex(str(tmp_path))
+    first.append(_embed(["alpha", "beta"]), [{"id": "0", "text": "alpha"}, {"id": "1", "text": "beta"}])
+    assert second.matrix.shape[0] == 2
+    second.append(_embed(["gamma"]), [{"id": "2", "text": "gamma"}])
+    first.append(_embed(["wage theft"]), [{"id": "3", "text": "wage theft"}])
+
+    assert first.meta["count"] == 4
+    second.refresh()
+    assert second.matrix.shape[0] == 4
+    assert len(second.chunks) == 4
+    hit = second.top_k(_embed(["wage theft"])[0], 1)[0]
+    assert hit.text == "wage theft"
+
+
+def test_append_rejects_dimension_change(tmp_path):
+    index = LocalIndex(str(tmp_path))
+    index.append(np.ones((1, 4), dtype=np.float32), [{"id": "0", "text": "a"}])
+    with pytest.raises(ValueError):
+        index.append(np.ones((1, 8), dtype=np.float32), [{"id": "1", "text": "b"}])
+
+
+def test_ingest_skips_duplicate_content(tmp_path, monkeypatch):
+    class Response:
+        def __init__(self, content):
+            self.content = content
+
+        def raise_for_status(self):
+            pass
+
+    class Client:
+        async def get(self, url):
+            await asyncio.sleep(0)
+            return Response(b"same body" if url.startswith("dup") else f"document {url}".encode())
+
+    async def http():
+        return Client()
+
+    monkeypatch.setattr(local_index, "_http", http)
+    backend = LocalVectorIndexBackend(root=str(tmp_path), embedder=hashing_embedder())
+
+    async def run():
+        store = await backend.ensure_store("chat-1")
+        attachments = [{"url": u, "name": f"{u}.txt", "type": "text/plain"} for u in ("a", "b", "dup1", "dup2", "a")]
+        added = await backend.ingest(store, attachments)
+        again = await backend.ingest(store, attachments)
+        hits = await backend.search(store, "document b", 1)
+        return added, again, hits
+
+    added, again, hits = asyncio.run(run())
+    assert len(added) == 3
+    assert again == []
+    assert hits[0].filename == "b.txt"
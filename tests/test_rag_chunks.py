@@ -0,0 +1,58 @@
+import threading
+
+from api.rag_chunks import ChunkLog, chunk_records, chunk_text
+
+
+def test_chunk_text_respects_size_and_overlap():
+    text = " ".join(f"Sentence number {n} about the employer." for n in range(200))
+    chunks = chunk_text(text, size=300, overlap=50)
+    assert len(chunks) > 1
+    assert all(len(c) <= 300 for c in chunks)
+    # Consecutive chunks share text and never open mid-word.
+    for previous, current in zip(chunks, chunks[1:]):
+        assert current.split()[0] in previous
+        assert text.find(current[:20]) != -1
+
+
+def test_chunk_text_empty():
+    assert chunk_text("   \t ") == []
+
+
+def test_chunk_records_ids_use_hash_then_filename():
+    records = chunk_records("alpha beta", "a.txt", url="u", sha256="abc")
+    assert records == [{"id": "abc:0", "filename": "a.txt", "text": "alpha beta", "url": "u", "sha256": "abc"}]
+    assert chunk_records("alpha", "a.txt")[0]["id"] == "a.txt:0"
+
+
+def test_chunk_log_picks_up_rows_from_other_writers(tmp_path):
+    writer, reader = ChunkLog(str(tmp_path)), ChunkLog(str(tmp_path))
+    writer.append([{"id": 0, "text": "a"}])
+    assert [r["id"] for r in reader.records] == [0]
+    writer.append([{"id": 1, "text": "b"}])
+    reader.append([{"id": 2, "text": "c"}])
+    assert [r["id"] for r in reader.records] == [0, 1, 2]
+    assert [r["id"] for r in writer.records] == [0, 1, 2]
+
+
+def test_chunk_log_ignores_partial_trailing_line(tmp_path):
+    log = ChunkLog(str(tmp_path))
+    log.append([{"id": 0, "text": "a"}])
+    with open(log.path, "ab") as f:
+        f.write(b'{"id": 1, "te')
+    reader = ChunkLog(str(tmp_path))
+    assert [r["id"] for r in reader.records] == [0]
+    with open(log.path, "ab") as f:
+        f.write(b'xt": "b"}\n')
+    assert [r["id"] for r in reader.records] == [0, 1]
+
+
+def test_chunk_log_concurrent_catch_up_reads_each_row_once(tmp_path):
+    ChunkLog(str(tmp_path)).append([{"id": n, "text": "x"} for n in range(500)])
+    for _ in range(10):
+        reader = ChunkLog(str(tmp_path))
+        threads = [threading.Thread(target=lambda: reader.records) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert [r["id"] for r in reader.records] == list(range(500))
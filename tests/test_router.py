@@ -0,0 +1,84 @@
+import asyncio
+import datetime as dt
+
+import pytest
+
+from api.chat_agents import router
+from api.chat_agents.router import FAQ, INTAKE_DB, LAWYER, ORCHESTRATOR, PLAINTIFF, route_turn
+from api.utils import tools
+
+
+def _turn(content, attachments=None):
+    return [{"role": "user", "content": content, "attachments": attachments or []}]
+
+
+@pytest.mark.parametrize("content, mode, target", [
+    ("Tell me about Yasser", "default", FAQ),
+    ("Why should I hire yasser for this?", "default", ORCHESTRATOR),
+    ("My boss fired me after I complained, can I sue?", "default", PLAINTIFF),
+    ("Draft a memo on the elements for my client's motion", "default", LAWYER),
+    ("thanks, that helps me", "default", ORCHESTRATOR),
+    ("Summarize the statute of limitations issues here", "lawyer", LAWYER),
+    ("Show me the highest-scoring employment intakes", "lawyer", INTAKE_DB),
+    ("Which intake looks strongest?", "lawyer", ORCHESTRATOR),
+    ("Show me the highest-scoring intakes", "default", ORCHESTRATOR),
+])
+def test_route_turn(content, mode, target):
+    assert route_turn(_turn(content), mode).target == target
+
+
+def test_attachments_and_non_user_turns_go_to_orchestrator():
+    route = route_turn(_turn("Rank these intakes", [{"name": "a.pdf", "url": "u"}]), "lawyer")
+    assert route.target == ORCHESTRATOR
+    assert route_turn([{"role": "assistant", "content": "hi"}], "default").target == ORCHESTRATOR
+    assert route_turn([], "default").target == ORCHESTRATOR
+
+
+def test_intake_db_route_carries_matter_type_and_lawyer_agent():
+    route = route_turn(_turn("List the wrongful termination intakes"), "lawyer")
+    assert route.category == "employment"
+    assert route.agent_name == LAWYER
+    assert route_turn(_turn("list all intakes"), "lawyer").category is None
+
+
+def test_disabled_router(monkeypatch):
+    monkeypatch.setattr(router, "ROUTER_ENABLED", False)
+    assert route_turn(_turn("Tell me about Yasser"), "default").reason == "disabled"
+
+
+def test_intake_lookup_is_paged_and_compact(monkeypatch):
+    calls = []
+
+    async def list_intakes(**kwargs):
+        calls.append(kwargs)
+        row = {
+            "id": "in_1", "submittedAt": dt.datetime(2026, 10, 1, 12), "fullName": "Ana Ruiz",
+            "matterType": "employment", "jurisdiction": "CA", "aiScore": None,
+            "analysisStatus": "pending", "aiSummary": "word " * 200,
+        }
+        return [row], "cursor"
+
+    monkeypatch.setattr(tools, "list_intakes", list_intakes)
+    text = asyncio.run(tools.retrieve_intakes_from_db())
+    assert calls[0]["limit"] == tools.INTAKE_TOOL_LIMIT
+    assert calls[0]["matter_type"] is None
+    line = text.splitlines()[1]
+    assert line.startswith("in_1 | 2026-10-01 | Ana Ruiz | employment | CA | analysis pending | word")
+    assert line.endswith("...") and len(line.split(" | ")[-1]) == tools.INTAKE_TOOL_SUMMARY_CHARS
+    assert "filter by matter type" in text
+
+    text = asyncio.run(tools.retrieve_intakes_from_db("employment"))
+    assert "more intakes exist." in text and "filter by" not in text
+
+
+def test_intake_lookup_reports_empty_and_errors(monkeypatch):
+    async def empty(**kwargs):
+        return [], None
+
+    async def broken(**kwargs):
+        raise RuntimeError("connection refused")
+
+    monkeypatch.setattr(tools, "list_intakes", empty)
+    assert asyncio.run(tools.retrieve_intakes_from_db("family law")) == "No stored intakes for family law."
+    monkeypatch.setattr(tools, "list_intakes", broken)
+    assert "unavailable" in asyncio.run(tools.retrieve_intakes_from_db())
@@ -0,0 +1,72 @@
+import asyncio
+
+from api.web_search import MemorySearchCache, WebSearch, normalize_query, search_cache_key
+
+
+def test_normalize_query_keeps_word_order_and_folds_plurals():
+    assert normalize_query("Employer sued by employee") == "employer sued employee"
+    assert normalize_query("employee sued by employer") != normalize_query("employer sued by employee")
+    assert normalize_query("What are the filing deadlines?") == "filing deadline"
+    assert normalize_query("Labor Code § 1102.5 claims") == "labor code § 1102.5 claim"
+
+
+def test_jurisdiction_is_keyed_separately():
+    key_a, resolved_a, query_a = search_cache_key("California employment retaliation", None)
+    key_b, resolved_b, query_b = search_cache_key("employment retaliation laws in CA", None)
+    assert (resolved_a, query_a) == (resolved_b, query_b) == ("CA", "employment retaliation")
+    assert key_a == key_b
+    assert search_cache_key("employment retaliation", "NY")[0] != key_a
+    assert search_cache_key("Washington DC wage theft", None)[1:] == ("DC", "wage theft")
+    assert search_cache_key("wage theft in Washington, D.C.", None)[0] == search_cache_key("DC wage theft", None)[0]
+
+
+class CountingBackend:
+    def __init__(self, answer="Answer."):
+        self.calls = 0
+        self.answer = answer
+
+    async def search(self, query, jurisdiction):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return {"answer": self.answer, "sources": [{"title": "Code", "url": "https://leginfo.ca.gov"}]}
+
+
+def test_equivalent_searches_share_cache_and_inflight_call():
+    backend = CountingBackend()
+    search = WebSearch(backend, MemorySearchCache(), ttl_seconds=60)
+
+    async def run():
+        await asyncio.gather(
+            search.search("California employment retaliation"),
+            search.search("employment retaliation laws in CA"),
+        )
+        return await search.search("Employment retaliation", "california")
+
+    result = asyncio.run(run())
+    assert backend.calls == 1
+    assert result["answer"] == "Answer."
+    assert search.stats == {"hits": 1, "misses": 1, "coalesced": 1, "errors": 0}
+
+
+def test_blank_answers_are_not_cached():
+    backend = CountingBackend(answer="  ")
+    search = WebSearch(backend, MemorySearchCache(), ttl_seconds=60)
+
+    async def run():
+        await search.search("wage theft", "CA")
+        await search.search("wage theft", "CA")
+
+    asyncio.run(run())
+    assert backend.calls == 2
+
+
+def test_memory_cache_expiry_and_bound():
+    cache = MemorySearchCache(max_entries=1)
+
+    async def run():
+        await cache.set("a", {"answer": "a"}, 60, "CA", "q", "q")
+        await cache.set("b", {"answer": "b"}, 60, "CA", "q", "q")
+        await cache.set("c", {"answer": "c"}, -1, "CA", "q", "q")
+        return await cache.get("a"), await cache.get("b"), await cache.get("c")
+
+    assert asyncio.run(run()) == (None, None, None)
@@ -35,6 +35,7 @@ export type IntakeRecord = {
     summary: string;
     goals: string;
     urgency: string;
+    incidentDate?: string | null;
   };
   // AI Assessment
   aiSummary?: string;
@@ -44,4 +45,6 @@ export type IntakeRecord = {
   aiWarnings?: string[];
   recommendedFirms?: RecommendedFirm[];
   applicableLaws?: ApplicableLaw[];
+  // Background analysis job state
+  analysisStatus?: "pending" | "running" | "completed" | "failed";
 };